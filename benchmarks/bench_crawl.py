@@ -0,0 +1,91 @@
+"""
+スタブサーバーを相手にしたクロール全体（API取得＋動画URL解決＋保存）のベンチマーク
+
+dmm_x_poster.devtools.dmm_stub をローカルで起動し、遅延・エラー率を与えた状態で
+取り込みパイプライン（ingest_pages）でクロールして、スループットと障害時の挙動（リトライ・打ち切り）を計測する。
+DMMには一切接続しない。
+
+使い方:
+    python benchmarks/bench_crawl.py [--items N] [--latency MS] [--error-rate P] [--workers N,N,...]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import argparse
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.db.models import db, Product, Image  # noqa: E402
+from dmm_x_poster.devtools.dmm_stub import DMMStubServer  # noqa: E402
+from dmm_x_poster.services.dmm_api import DMMAPIService  # noqa: E402
+from dmm_x_poster.services.rate_limiter import rate_limiter  # noqa: E402
+
+
+def run(server, workers, probe, tmp):
+    """1条件分のクロールを実行して結果を表示"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, f'crawl-{workers}-{probe}.db')}",
+        DMM_API_BASE_URL=server.api_url,
+        DMM_LITEVIDEO_BASE_URL=server.base_url,
+        DMM_SCRAPE_WORKERS=workers,
+        DMM_SCRAPE_PER_HOST=workers,
+        DMM_PROBE_VIDEO_URLS=probe,
+        DMM_API_BACKOFF_BASE=0.05,
+        RATE_LIMIT_ENABLED=False,
+    )
+    db.init_app(app)
+    rate_limiter.init_app(app)
+    service = DMMAPIService()
+    service.init_app(app)
+
+    before = dict(server.counts)
+    with app.app_context():
+        db.create_all()
+        state = {}
+        start = time.perf_counter()
+        saved = service.ingest_pages(service.crawl_items(sort='date', checkpoint=False, state=state))
+        elapsed = time.perf_counter() - start
+        movies = Image.query.filter_by(image_type='movie').count()
+        assert Product.query.count() == saved
+
+    counts = {key: server.counts[key] - before[key] for key in before}
+    print(f"workers={workers:<3} probe={'on ' if probe else 'off'} "
+          f"{saved:>6} products {movies:>6} videos {elapsed:7.2f}s "
+          f"{saved / elapsed:8.1f} items/s  stopped={state.get('stopped')}  "
+          f"api={counts['api']} pages={counts['page']} head={counts['video']} "
+          f"503={counts['errors']} 429={counts['throttled']}")
+    for name, stage in service.last_ingest_report['stages'].items():
+        print(f"    {name:<8} {stage['items']:>6} items {stage['busy_seconds']:7.2f}s busy "
+              f"max queue {stage['max_queue_depth'] if stage['max_queue_depth'] is not None else '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000, help='カタログの商品数')
+    parser.add_argument('--latency', type=float, default=30, help='平均遅延（ミリ秒）')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='503を返す確率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='429を返す確率')
+    parser.add_argument('--page-kb', type=int, default=150, help='商品ページのサイズ（KB）')
+    parser.add_argument('--workers', default='1,4,16', help='動画URL解決の並列数（カンマ区切り）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    server = DMMStubServer(
+        catalog_size=args.items, latency=args.latency / 1000, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, page_kb=args.page_kb
+    )
+    print(f"stub: {args.items} items, latency {args.latency:.0f}ms, "
+          f"503 {args.error_rate:.0%}, 429 {args.throttle_rate:.0%}, page {args.page_kb}KB")
+    with server, tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(w) for w in args.workers.split(',')):
+            for probe in (False, True):
+                run(server, workers, probe, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+コネクションプール有無によるHTTPSハンドシェイクコストのベンチマーク
+
+ローカルに自己署名証明書のHTTPSサーバーを立て、
+毎回 requests.get を呼ぶ場合と共有HTTPClientを使う場合の所要時間と
+サーバー側で受け付けたTCP接続数（=TLSハンドシェイク数）を比較する。
+
+使い方:
+    python benchmarks/bench_http_pool.py [リクエスト数]
+"""
+import os
+import sys
+import ssl
+import time
+import tempfile
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.services.http_client import HTTPClient  # noqa: E402
+
+BODY = b'{"result": {"status": 200, "items": []}}'
+
+
+class CountingServer(ThreadingHTTPServer):
+    """受け付けた接続数を数えるHTTPサーバー"""
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+        with self._lock:
+            self.connections += 1
+        return request
+
+
+class Handler(BaseHTTPRequestHandler):
+    """keep-alive対応の固定レスポンスハンドラ"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_certificate(directory):
+    """opensslで自己署名証明書を生成"""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+        '-keyout', key, '-out', cert, '-days', '1',
+        '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def start_server(cert, key):
+    """HTTPSサーバーをバックグラウンドで起動"""
+    server = CountingServer(('127.0.0.1', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(label, server, fetch, url, count):
+    """指定の取得関数でcount回リクエストし結果を表示"""
+    before = server.connections
+    start = time.perf_counter()
+    for _ in range(count):
+        response = fetch(url)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    handshakes = server.connections - before
+    print(f"{label:<22} {count:>5} req  {elapsed:8.3f}s  "
+          f"{elapsed / count * 1000:7.2f} ms/req  handshakes={handshakes}")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_certificate(tmp)
+        server = start_server(cert, key)
+        url = f"https://localhost:{server.server_address[1]}/affiliate/v3/ItemList"
+
+        client = HTTPClient()
+
+        baseline = run('requests.get', server, lambda u: requests.get(u, verify=cert), url, count)
+        pooled = run('HTTPClient (pooled)', server, lambda u: client.get(u, verify=cert), url, count)
+        print(f"speedup: {baseline / pooled:.1f}x")
+
+        client.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+商品一括保存（save_items_to_db）のベンチマーク
+
+一時ファイルのSQLiteに対して、1件ずつ存在確認・flushする従来方式と
+INクエリ＋一括INSERTによる現在の方式で合成アイテムを保存し、所要時間を比較する。
+商品ページのスクレイピングは計測対象外のため無効化している。
+
+使い方:
+    python benchmarks/bench_ingest.py [アイテム数]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+from datetime import datetime
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.config import JST  # noqa: E402
+from dmm_x_poster.db.models import db, Product, Image  # noqa: E402
+from dmm_x_poster.services.dmm_api import DMMAPIService  # noqa: E402
+
+
+def make_items(count, prefix):
+    """APIレスポンス形式の合成アイテムを生成"""
+    return [
+        {
+            'content_id': f'{prefix}{i:06d}',
+            'title': f'ベンチマーク商品 {i}',
+            'URL': f'https://www.dmm.co.jp/digital/videoa/-/detail/=/cid={prefix}{i:06d}/',
+            'date': '2024-01-01 10:00:00',
+            'imageURL': {'large': f'https://pics.dmm.co.jp/{prefix}{i:06d}pl.jpg'},
+            'sampleImageURL': {'sample_l': {'image': [
+                f'https://pics.dmm.co.jp/{prefix}{i:06d}jp-{n}.jpg' for n in range(1, 11)
+            ]}},
+            'iteminfo': {
+                'actress': [{'name': f'女優{i % 500}'}],
+                'genre': [{'name': 'ジャンルA'}, {'name': f'ジャンル{i % 40}'}],
+                'maker': [{'name': f'メーカー{i % 30}'}],
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_save(items):
+    """従来方式: 1件ずつ存在確認・flushして保存"""
+    saved = 0
+    for item in items:
+        if Product.query.filter_by(dmm_product_id=item['content_id']).first():
+            continue
+        product = Product(
+            dmm_product_id=item['content_id'],
+            title=item['title'],
+            actresses=json.dumps([a['name'] for a in item['iteminfo']['actress']], ensure_ascii=False),
+            url=item['URL'],
+            package_image_url=item['imageURL']['large'],
+            maker=item['iteminfo']['maker'][0]['name'],
+            genres=json.dumps([g['name'] for g in item['iteminfo']['genre']], ensure_ascii=False),
+            fetched_at=datetime.now(JST)
+        )
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Image(product_id=product.id, image_url=item['imageURL']['large'], image_type='package'))
+        for url in item['sampleImageURL']['sample_l']['image']:
+            db.session.add(Image(product_id=product.id, image_url=url, image_type='sample'))
+        saved += 1
+    db.session.commit()
+    return saved
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        db.init_app(app)
+
+        service = DMMAPIService()
+        service.init_app(app)
+        # スクレイピングは計測対象外
+        service.extract_video_url_from_page = lambda url: None
+
+        with app.app_context():
+            db.create_all()
+
+            start = time.perf_counter()
+            saved = legacy_save(make_items(count, 'legacy'))
+            legacy = time.perf_counter() - start
+            print(f"legacy per-item   {saved:>6} products  {legacy:8.2f}s")
+
+            start = time.perf_counter()
+            saved = service.save_items_to_db(make_items(count, 'bulk'))
+            bulk = time.perf_counter() - start
+            print(f"bulk insert       {saved:>6} products  {bulk:8.2f}s")
+
+            # 全件既存の再投入（重複判定のみのコスト）
+            start = time.perf_counter()
+            service.save_items_to_db(make_items(count, 'bulk'))
+            print(f"bulk re-run (dup) {0:>6} products  {time.perf_counter() - start:8.2f}s")
+
+            print(f"speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
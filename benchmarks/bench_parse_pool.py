@@ -0,0 +1,86 @@
+"""
+商品ページ解析のプロセスプールのスケーリングベンチマーク
+
+スレッドプールからページを投入し（ダウンロード済みの状態を想定）、
+呼び出し元スレッドでの解析とプロセス数1..Nのプロセスプールでの解析の
+スループットを比較する。コーパスを指定しない場合は合成HTMLを使用する。
+動画URLの痕跡がないページは高速パスで即座に終わるため、--soup-ratioで
+BeautifulSoupへのフォールバックが発生するページの割合を調整できる。
+
+使い方:
+    python benchmarks/bench_parse_pool.py [--corpus DIR] [--pages N] [--processes 1,2,4] [--threads N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_video_parser import load_corpus  # noqa: E402
+from dmm_x_poster.services.parse_pool import ParsePool  # noqa: E402
+
+
+def fallback_page(content):
+    """高速パスで見つからずBeautifulSoupの解析が必要になるページに変換"""
+    marker = b'https://cc3001.dmm.co.jp/litevideo/'
+    if marker in content:
+        return content
+    return content.replace(b'</body>', b'<p data-note="litevideo">sample</p></body>')
+
+
+def run(label, pool, corpus, threads):
+    """スレッドプールから全ページを解析してスループットを表示"""
+    # プロセスの起動時間を計測に含めない
+    pool.extract(corpus[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(pool.extract, corpus))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {len(corpus) / elapsed:8.1f} pages/s  {elapsed:7.2f}s")
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='保存済みHTMLのディレクトリ')
+    parser.add_argument('--pages', type=int, default=200, help='使用するページ数')
+    parser.add_argument('--processes', help='プロセス数（カンマ区切り、既定は1からCPUコア数まで倍々）')
+    parser.add_argument('--threads', type=int, default=8, help='ページを投入するスレッド数')
+    parser.add_argument('--soup-ratio', type=float, default=0.5,
+                        help='BeautifulSoupへのフォールバックが必要なページの割合（合成HTMLのみ）')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.pages)
+    if not args.corpus:
+        rng = random.Random(7)
+        corpus = [fallback_page(c) if rng.random() < args.soup_ratio else c for c in corpus]
+
+    if args.processes:
+        counts = [int(n) for n in args.processes.split(',')]
+    else:
+        counts = []
+        n = 1
+        while n < (os.cpu_count() or 1):
+            counts.append(n)
+            n *= 2
+        counts.append(os.cpu_count() or 1)
+    print(f"corpus: {len(corpus)} pages, cpu cores: {os.cpu_count()}, feeder threads: {args.threads}")
+
+    inline = ParsePool(processes=0)
+    baseline, expected = run('inline', inline, corpus, args.threads)
+    for count in counts:
+        pool = ParsePool(processes=count)
+        try:
+            elapsed, results = run(f'{count} processes', pool, corpus, args.threads)
+        finally:
+            pool.close()
+        mismatches = sum(1 for a, b in zip(expected, results) if a != b)
+        print(f"{'':<14} speedup {baseline / elapsed:5.2f}x  mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+商品一覧（products.html）のテンプレート描画のベンチマーク（女優・ジャンルのJSONデコードの比較）
+
+インメモリSQLiteに商品を保存して1ページ分（既定20件）を読み込み、
+次の2つの構成で商品一覧の描画時間と、1ページあたりのjson.loadsの回数を比較する。
+DBの読み込みは計測に含めない。
+
+    before  呼び出しのたびにJSON文字列をデコードするget_actresses_list/get_genres_listと、
+            カードごとにget_actresses_list()を4回呼ぶ以前のテンプレート
+    after   読み込み時に一度だけデコードしたリストを返すJSONList列と現在のテンプレート
+
+使い方:
+    python benchmarks/bench_product_grid.py [--per-page N] [--actresses N] [--repeat N]
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.app import create_app  # noqa: E402
+from dmm_x_poster.config import Config  # noqa: E402
+from dmm_x_poster.db.models import db, Product  # noqa: E402
+
+
+class BenchConfig(Config):
+    """ベンチマーク用の設定"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    HTTP_CACHE_ENABLED = False
+
+
+def legacy_template(app):
+    """カードごとにget_actresses_list()を繰り返し呼んでいた以前のproducts.htmlを再現"""
+    source, _, _ = app.jinja_loader.get_source(app.jinja_env, 'products.html')
+    source = re.sub(r'[ \t]*\{% set actresses = product\.get_actresses_list\(\) %\}\n', '', source)
+    return source.replace('actresses', 'product.get_actresses_list()')
+
+
+def legacy_getters(decodes):
+    """呼び出しのたびにJSON文字列をデコードする以前のget_*_listを生成"""
+    def getter(column):
+        def get_list(self):
+            raw = self.legacy_json[column]
+            if raw:
+                decodes[0] += 1
+                return json.loads(raw)
+            return []
+        return get_list
+    return getter('actresses'), getter('genres')
+
+
+def measure(render, repeat):
+    """1ページの描画時間の中央値（ミリ秒）を計測"""
+    render()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--per-page', type=int, default=20, help='1ページの商品数')
+    parser.add_argument('--actresses', type=int, default=4, help='1商品あたりの女優数')
+    parser.add_argument('--genres', type=int, default=8, help='1商品あたりのジャンル数')
+    parser.add_argument('--repeat', type=int, default=500, help='描画の繰り返し回数')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        for index in range(args.per_page):
+            db.session.add(Product(
+                dmm_product_id=f'bench{index:04d}',
+                title=f'ベンチマーク商品{index}',
+                url=f'https://example.com/{index}',
+                actresses=[f'女優{index}-{n}' for n in range(args.actresses)],
+                genres=[f'ジャンル{n}' for n in range(args.genres)],
+                maker='メーカー',
+            ))
+        db.session.commit()
+
+    with app.test_request_context('/products'):
+        products = Product.query.order_by(Product.fetched_at.desc()).paginate(page=1, per_page=args.per_page)
+        for product in products.items:
+            product.legacy_json = {
+                'actresses': json.dumps(product.actresses, ensure_ascii=False),
+                'genres': json.dumps(product.genres, ensure_ascii=False),
+            }
+        context = {'products': products, 'keyword': '', 'sort': 'newest', 'release_status': 'all',
+                   'genres_str': '', 'actress_str': '', 'favorite_only': False}
+        # render_templateと同じ変数（request・url_forなど）を加え、テンプレートは一度だけコンパイルする
+        app.update_template_context(context)
+        legacy = app.jinja_env.from_string(legacy_template(app))
+        current = app.jinja_env.get_template('products.html')
+
+        decodes = [0]
+        get_actresses, get_genres = legacy_getters(decodes)
+        with patch.object(Product, 'get_actresses_list', get_actresses), \
+                patch.object(Product, 'get_genres_list', get_genres):
+            before = measure(lambda: legacy.render(context), args.repeat)
+            decodes[0] = 0
+            legacy.render(context)
+            before_decodes = decodes[0]
+
+        after = measure(lambda: current.render(context), args.repeat)
+
+    print(f"{args.per_page} products/page, {args.actresses} actresses, {args.genres} genres, repeat={args.repeat}")
+    print(f"before  {before:7.3f}ms/page  json.loads {before_decodes}/page")
+    print(f"after   {after:7.3f}ms/page  json.loads 0/page (decoded once when loaded)")
+    print(f"speedup {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
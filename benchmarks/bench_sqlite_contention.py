@@ -0,0 +1,165 @@
+"""
+SQLiteの同時アクセスのベンチマーク（読み込みスレッドと書き込みスレッドの競合）
+
+一時SQLiteファイルに商品を保存し、読み込みスレッド（トップページ相当のクエリ）と
+書き込みスレッド（投稿の記録に相当する、トランザクションを一定時間保持する更新）を
+同時に動かして、次の3つの構成でスループット・読み込みの遅延・ロックエラー数を比較する。
+
+    default  ロールバックジャーナル（journal_mode=DELETE, synchronous=FULL）
+    wal      WAL・synchronous=NORMAL・キャッシュ/mmap拡大（アプリケーションの既定）
+    writer   WAL＋単一書き込みスレッド（DB_SINGLE_WRITER=true）
+
+使い方:
+    python benchmarks/bench_sqlite_contention.py [--readers N] [--writers N] [--seconds S] [--hold-ms MS]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import tempfile
+import argparse
+import threading
+
+from flask import Flask
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.config import JST  # noqa: E402
+from dmm_x_poster.db.models import db, Product, Post  # noqa: E402
+from dmm_x_poster.db.sqlite import configure_sqlite  # noqa: E402
+from dmm_x_poster.services.db_writer import DBWriter  # noqa: E402
+
+MODES = {
+    'default': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+                'SQLITE_CACHE_SIZE_KB': 2000, 'SQLITE_MMAP_SIZE': 0},
+    'wal': {},
+    'writer': {'DB_SINGLE_WRITER': True},
+}
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def record_post(product_id, hold):
+    """投稿の記録に相当する書き込み（トランザクションをholdの間保持する）"""
+    from datetime import datetime
+    now = datetime.now(JST)
+    db.session.execute(update(Product).where(Product.id == product_id).values(posted=True, last_posted_at=now))
+    db.session.execute(insert(Post), [{'product_id': product_id, 'post_text': 'bench', 'status': 'posted',
+                                       'scheduled_at': now, 'posted_at': now}])
+    time.sleep(hold)
+
+
+def run(mode, args, tmp):
+    """1構成分の計測を実行して結果を表示"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tmp, f'{mode}.db')}",
+        SQLALCHEMY_ENGINE_OPTIONS={'pool_size': args.readers + args.writers, 'max_overflow': 0},
+        SQLITE_BUSY_TIMEOUT=args.busy_timeout,
+        **MODES[mode]
+    )
+    db.init_app(app)
+    configure_sqlite(app)
+    writer = DBWriter(app)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Product), [
+            {'dmm_product_id': f'bench{i:06d}', 'title': f'商品{i}', 'url': f'https://example.com/{i}'}
+            for i in range(args.products)
+        ])
+        db.session.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'reads': [], 'writes': 0, 'errors': 0}
+    hold = args.hold_ms / 1000
+
+    def reader():
+        latencies = []
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.session.execute(select(Product.id, Product.title)
+                                       .order_by(Product.fetched_at.desc()).limit(10)).all()
+                    db.session.execute(select(Post.id).where(Post.status == 'posted')
+                                       .order_by(Post.posted_at.desc()).limit(5)).all()
+                    db.session.rollback()
+                except OperationalError:
+                    db.session.rollback()
+                    with lock:
+                        results['errors'] += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        with lock:
+            results['reads'].extend(latencies)
+
+    def write_once(rng):
+        product_id = rng.randint(1, args.products)
+        if writer.enabled:
+            writer.run(record_post, product_id, hold)
+        else:
+            with app.app_context():
+                record_post(product_id, hold)
+                db.session.commit()
+
+    def writer_loop(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            try:
+                write_once(rng)
+            except OperationalError:
+                with lock:
+                    results['errors'] += 1
+                continue
+            with lock:
+                results['writes'] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer_loop, args=(seed,)) for seed in range(args.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writer.close()
+    with app.app_context():
+        db.engine.dispose()
+
+    reads = results['reads']
+    print(f"{mode:<8} reads {len(reads) / elapsed:8.1f}/s  p50 {percentile(reads, 0.5) * 1000:6.2f}ms  "
+          f"p99 {percentile(reads, 0.99) * 1000:7.2f}ms  writes {results['writes'] / elapsed:6.1f}/s  "
+          f"locked errors {results['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=4, help='読み込みスレッド数')
+    parser.add_argument('--writers', type=int, default=4, help='書き込みスレッド数')
+    parser.add_argument('--seconds', type=float, default=5, help='1構成あたりの計測時間（秒）')
+    parser.add_argument('--hold-ms', type=float, default=20, help='書き込みトランザクションを保持するミリ秒')
+    parser.add_argument('--busy-timeout', type=int, default=5000, help='SQLITE_BUSY_TIMEOUT（ミリ秒）')
+    parser.add_argument('--products', type=int, default=5000, help='商品数')
+    parser.add_argument('--modes', default=','.join(MODES), help='計測する構成（カンマ区切り）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    print(f"readers={args.readers} writers={args.writers} hold={args.hold_ms}ms busy_timeout={args.busy_timeout}ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes.split(','):
+            run(mode, args, tmp)
+
+
+if __name__ == '__main__':
+    main()
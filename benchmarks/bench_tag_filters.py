@@ -0,0 +1,125 @@
+"""
+女優・ジャンルによる絞り込みのベンチマーク（JSON列のLIKE検索と正規化テーブルの索引検索の比較）
+
+一時SQLiteファイルに合成した商品（既定10万件）を保存し、/productsと同じ条件の
+絞り込みをLIKE '%名前%' と Product.tagged_with（関連テーブルの索引）で実行して、
+1クエリあたりの時間・件数（部分一致による誤一致を含む）・実行計画を表示する。
+関連テーブルの作成にかかった時間も併せて表示する。
+
+使い方:
+    python benchmarks/bench_tag_filters.py [--products N] [--actresses N] [--genres N] [--repeat N]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+
+from flask import Flask
+from sqlalchemy import insert, select, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.db.models import db, Product, sync_product_tags  # noqa: E402
+
+# 1回のINSERTで保存する商品数
+BATCH = 5000
+
+
+def populate(args, rng):
+    """合成した商品を保存（関連テーブルの作成時間を分けて計測）"""
+    now = time.perf_counter
+    insert_time = tag_time = 0.0
+    for start in range(0, args.products, BATCH):
+        rows = []
+        for index in range(start, min(start + BATCH, args.products)):
+            actresses = rng.sample(range(1, args.actresses + 1), rng.randint(1, 3))
+            genres = rng.sample(range(1, args.genres + 1), rng.randint(2, 6))
+            rows.append({
+                'dmm_product_id': f'bench{index:07d}',
+                'title': f'ベンチマーク商品{index}',
+                'url': f'https://example.com/{index}',
+                'actresses': json.dumps([f'女優{n}' for n in actresses], ensure_ascii=False),
+                'genres': json.dumps([f'ジャンル{n}' for n in genres], ensure_ascii=False),
+                'maker': f'メーカー{rng.randint(1, 200)}',
+            })
+        started = now()
+        result = db.session.execute(insert(Product).returning(Product.id, Product.dmm_product_id), rows)
+        ids = {row.dmm_product_id: row.id for row in result}
+        insert_time += now() - started
+
+        started = now()
+        sync_product_tags(db.session.connection(), [
+            {'id': ids[row['dmm_product_id']], 'actresses': row['actresses'],
+             'genres': row['genres'], 'maker': row['maker']}
+            for row in rows
+        ], replace=False)
+        tag_time += now() - started
+        db.session.commit()
+    return insert_time, tag_time
+
+
+def measure(label, make_query, repeat):
+    """同じクエリを繰り返して1回あたりの時間と件数を取得"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count = make_query().count()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"    {label:<8} {elapsed * 1000:8.2f} ms/query  {count:>6} products")
+    return elapsed
+
+
+def explain(query):
+    """SQLiteの実行計画を1行にまとめて取得"""
+    statement = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')).all()
+    return ' / '.join(row[-1] for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100000, help='商品数')
+    parser.add_argument('--actresses', type=int, default=5000, help='女優の種類数')
+    parser.add_argument('--genres', type=int, default=300, help='ジャンルの種類数')
+    parser.add_argument('--repeat', type=int, default=5, help='各クエリの繰り返し回数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'tags.db')}"
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            insert_time, tag_time = populate(args, random.Random(11))
+            print(f"{args.products} products: insert {insert_time:.2f}s, tag tables {tag_time:.2f}s")
+
+            # 部分一致で別の名前にも一致する名前（"女優1"は"女優10"や"女優123"にも一致する）
+            cases = [
+                ('actress', 'actresses', ['女優1']),
+                ('actress', 'actresses', [f'女優{args.actresses // 2}']),
+                ('genre', 'genres', ['ジャンル7']),
+                ('genre', 'genres', ['ジャンル3', f'ジャンル{args.genres // 2}']),
+            ]
+            for kind, column, names in cases:
+                print(f"{kind} = {', '.join(names)}")
+                like = lambda: Product.query.filter(  # noqa: E731
+                    *[getattr(Product, column).like(f'%{name}%') for name in names])
+                tagged = lambda: Product.query.filter(  # noqa: E731
+                    *[Product.tagged_with(kind, name) for name in names])
+                like_time = measure('LIKE', like, args.repeat)
+                tagged_time = measure('indexed', tagged, args.repeat)
+                print(f"    speedup {like_time / tagged_time:6.1f}x")
+                print(f"    plan LIKE:    {explain(like())}")
+                print(f"    plan indexed: {explain(tagged())}")
+
+            latest = select(Product.id).where(Product.tagged_with('actress', '女優1')) \
+                .order_by(Product.fetched_at.desc()).limit(20)
+            started = time.perf_counter()
+            db.session.execute(latest).all()
+            print(f"first page of 女優1 ordered by fetched_at: {(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+商品ページからの動画URL抽出パーサーのベンチマーク
+
+保存済みのHTMLコーパス（*.html）に対して、BeautifulSoupによる全体パースと
+正規表現による高速パスを実行し、1ページあたりのCPU時間とメモリ確保量を比較する。
+コーパスを指定しない場合は商品ページを模した合成HTMLを生成して使用する。
+
+使い方:
+    python benchmarks/bench_video_parser.py [--corpus DIR] [--pages N]
+
+コーパスの記録例:
+    curl -s -b age_check_done=1 -o corpus/ssis00001.html \
+        'https://www.dmm.co.jp/digital/videoa/-/detail/=/cid=ssis00001/'
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from dmm_x_poster.services.video_extractor import (  # noqa: E402
+    extract_video_url, find_video_url_soup, to_dm_w_url
+)
+
+
+def synthetic_page(index, rng):
+    """商品ページを模したHTMLを生成（約150KB、scriptを多数含む）"""
+    cid = f'abcd{index:05d}'
+    video = f'https://cc3001.dmm.co.jp/litevideo/freepv/a/abc/{cid}/{cid}_mhb_w.mp4'
+    scripts = ''.join(
+        f'<script type="text/javascript">var cfg{n} = {{"id": {n}, "v": "{"x" * rng.randint(200, 2000)}"}};</script>'
+        for n in range(40)
+    )
+    body = ''.join(
+        f'<div class="item"><a href="/digital/videoa/-/detail/=/cid=x{n}/">関連作品{n}</a>'
+        f'<img src="https://pics.dmm.co.jp/x{n}.jpg" alt="関連{n}"></div>'
+        for n in range(600)
+    )
+    jsonld = ''
+    kind = index % 3
+    if kind == 0:
+        jsonld = json.dumps({
+            '@context': 'http://schema.org', '@type': 'Product', 'name': f'商品{index}',
+            'subjectOf': {'@type': 'VideoObject', 'contentUrl': video},
+        }, ensure_ascii=False)
+    elif kind == 1:
+        scripts += f'<script>player.init({{"src": "{video}"}});</script>'
+    # kind == 2 は動画なし
+    return (
+        f'<!DOCTYPE html><html><head><title>{cid}</title>{scripts}'
+        f'<script type="application/ld+json">{jsonld or "{}"}</script></head>'
+        f'<body>{body}</body></html>'
+    ).encode('utf-8')
+
+
+def load_corpus(directory, pages):
+    """コーパスを読み込み（未指定時は合成ページ）"""
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, '*.html')))[:pages]
+        if not paths:
+            sys.exit(f"No *.html files found in {directory}")
+        corpus = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                corpus.append(f.read())
+        return corpus
+    rng = random.Random(42)
+    return [synthetic_page(i, rng) for i in range(pages)]
+
+
+def legacy_parse(content):
+    """従来方式: 全体をデコードしてBeautifulSoupでパース"""
+    video_url = find_video_url_soup(content.decode('utf-8', errors='replace'))
+    return to_dm_w_url(video_url) if video_url else None
+
+
+def measure(label, parse, corpus):
+    """CPU時間とメモリ確保量を計測"""
+    results = []
+    start = time.process_time()
+    for content in corpus:
+        results.append(parse(content))
+    cpu = time.process_time() - start
+
+    tracemalloc.start()
+    peaks = []
+    for content in corpus:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        parse(content)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    n = len(corpus)
+    print(f"{label:<14} {cpu / n * 1000:8.2f} ms/page CPU  "
+          f"peak alloc {sum(peaks) / n / 1024:9.1f} KiB/page (max {max(peaks) / 1024:.1f} KiB)")
+    return cpu, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='保存済みHTMLのディレクトリ')
+    parser.add_argument('--pages', type=int, default=60, help='使用するページ数')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.pages)
+    total = sum(len(c) for c in corpus)
+    print(f"corpus: {len(corpus)} pages, {total / len(corpus) / 1024:.1f} KiB/page average")
+
+    legacy_cpu, legacy_results = measure('BeautifulSoup', legacy_parse, corpus)
+    fast_cpu, fast_results = measure('fast path', extract_video_url, corpus)
+
+    mismatches = sum(1 for a, b in zip(legacy_results, fast_results) if a != b)
+    print(f"speedup: {legacy_cpu / fast_cpu:.1f}x  mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,11 +12,16 @@ from datetime import datetime
 
 from dmm_x_poster.config import JST
 from dmm_x_poster.config import Config
-from dmm_x_poster.db.models import db, Product, Image, Post, PostImage, Setting
-from dmm_x_poster.services.dmm_api import dmm_api_service
+from dmm_x_poster.db.models import db, Product, Image, Post, PostImage, Setting, SavedSearch, search_products
+from dmm_x_poster.db.sqlite import configure_sqlite, engine_options
+from dmm_x_poster.services.db_writer import db_writer
+from dmm_x_poster.services.dmm_api import dmm_api_service, DMMAPIError, parse_content_ids
 from dmm_x_poster.services.twitter_api import twitter_api_service
 from dmm_x_poster.services.image_downloader import image_downloader_service
 from dmm_x_poster.services.scheduler import scheduler_service
+from dmm_x_poster.services.video_enrichment import video_enrichment_service
+from dmm_x_poster.services.catalog import catalog_service, CATALOG_KINDS
+from dmm_x_poster.services.rate_limiter import rate_limiter
 
 # ロギング設定
 logging.basicConfig(
@@ -29,6 +34,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 保存済み検索による新着取得のジョブID（画面からの実行でも同じジョブを起動する）
+FETCH_PRODUCTS_JOB_ID = 'fetch_products'
+
 # アプリケーション初期化時に設定テーブルを初期化
 def init_settings(app):
     """設定テーブルの初期化"""
@@ -46,6 +54,17 @@ def init_settings(app):
         # テーブルが存在しない場合など、初期化中にエラーが発生した場合はログを残す
         logger.warning(f"Settings initialization skipped: {e}")
 
+
+def catalog_needs_initial_refresh(app):
+    """カタログが空のため、更新の周期を待たずに取得すべきかどうか"""
+    try:
+        with app.app_context():
+            return catalog_service.is_empty()
+    except Exception as e:
+        # テーブルが存在しない場合などは通常の周期に任せる
+        logger.warning(f"Catalog check skipped: {e}")
+        return False
+
 def create_app(config_class: Optional[Any] = None) -> Flask:
     """アプリケーションファクトリ関数
 
@@ -62,16 +81,22 @@ def create_app(config_class: Optional[Any] = None) -> Flask:
         config_class = Config
     
     app.config.from_object(config_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
     
     # データベース初期化
     db.init_app(app)
+    configure_sqlite(app)
     migrate = Migrate(app, db)
+    db_writer.init_app(app)
     
     # サービス初期化
+    rate_limiter.init_app(app)
     dmm_api_service.init_app(app)
     twitter_api_service.init_app(app)
     image_downloader_service.init_app(app)
     scheduler_service.init_app(app)
+    video_enrichment_service.init_app(app)
+    catalog_service.init_app(app)
     
     # 静的ファイルディレクトリを確認・作成
     images_dir = Path(app.root_path) / app.config.get('IMAGES_FOLDER', 'static/images')
@@ -95,7 +120,8 @@ def create_app(config_class: Optional[Any] = None) -> Flask:
         func=lambda: fetch_new_products(app),
         trigger='cron',
         hour=3,  # 毎日3時
-        id='fetch_products'
+        id=FETCH_PRODUCTS_JOB_ID,
+        max_instances=1
     )
     
     # 毎日実行: 投稿スケジュールを作成
@@ -106,7 +132,45 @@ def create_app(config_class: Optional[Any] = None) -> Flask:
         id='schedule_posts'
     )
     
+    # 定期実行: 動画URL抽出キューを処理
+    scheduler.add_job(
+        func=lambda: enrich_videos(app),
+        trigger='interval',
+        seconds=app.config.get('VIDEO_ENRICHMENT_INTERVAL', 60),
+        id=video_enrichment_service.JOB_ID,
+        max_instances=1,
+        coalesce=True
+    )
+    video_enrichment_service.attach_scheduler(scheduler)
+    
+    # 定期実行: ジャンル・女優IDカタログを更新
+    scheduler.add_job(
+        func=lambda: refresh_catalog(app),
+        trigger='interval',
+        hours=app.config.get('DMM_CATALOG_REFRESH_HOURS', 24),
+        id=catalog_service.JOB_ID,
+        max_instances=1,
+        coalesce=True
+    )
+    # カタログが空の場合（初回デプロイ時など）は名前からIDを解決できないため、起動直後に取得する
+    if catalog_needs_initial_refresh(app):
+        scheduler.modify_job(catalog_service.JOB_ID, next_run_time=datetime.now(JST))
+    
+    # 定期実行: 商品ページキャッシュの古いエントリを削除
+    scheduler.add_job(
+        func=lambda: purge_http_cache(app),
+        trigger='interval',
+        hours=app.config.get('HTTP_CACHE_PURGE_HOURS', 6),
+        id='purge_http_cache',
+        max_instances=1,
+        coalesce=True
+    )
+    
     scheduler.start()
+    app.extensions['scheduler'] = scheduler
+    
+    # テンプレートでジャンル・女優IDを名前に変換
+    app.jinja_env.globals['catalog_names'] = catalog_service.names_for
     
     # ルート定義を含める
     register_routes(app)
@@ -165,9 +229,14 @@ def register_routes(app: Flask) -> None:
         # フラッシュメッセージがあれば取得
         success_message = request.args.get('success')
         
+        # 定期取得の保存済み検索
+        saved_searches = SavedSearch.query.order_by(SavedSearch.id).all()
+        
         return render_template(
             'settings.html',
             settings=settings_dict,
+            saved_searches=saved_searches,
+            catalog_counts={kind: catalog_service.count(kind) for kind in CATALOG_KINDS},
             success_message=success_message
         )
 
@@ -180,6 +249,98 @@ def register_routes(app: Flask) -> None:
         
         flash('設定を更新しました', 'success')
         return redirect(url_for('settings', success='設定を保存しました'))
+    
+    @app.route('/saved_searches', methods=['POST'])
+    def create_saved_search():
+        """定期取得の保存済み検索を追加"""
+        name = request.form.get('name', '').strip()
+        if not name:
+            flash('検索条件の名前を入力してください', 'warning')
+            return redirect(url_for('settings'))
+        
+        genre_ids, unknown_genres = catalog_service.resolve_terms('genre', request.form.get('genre_ids', ''))
+        actress_ids, unknown_actresses = catalog_service.resolve_terms('actress', request.form.get('actress_ids', ''))
+        if unknown_genres or unknown_actresses:
+            flash(f"カタログにない名前があります: {', '.join(unknown_genres + unknown_actresses)}", 'warning')
+            return redirect(url_for('settings'))
+        
+        search = SavedSearch(
+            name=name,
+            floor=request.form.get('floor', 'videoa'),
+            sort=request.form.get('sort', 'date'),
+            genre_ids=','.join(genre_ids),
+            actress_ids=','.join(actress_ids),
+            release_status=request.form.get('release_status', 'released'),
+            hits=request.form.get('hits', 100, type=int),
+            enabled=True
+        )
+        db.session.add(search)
+        db.session.commit()
+        
+        flash(f'検索条件「{name}」を保存しました', 'success')
+        return redirect(url_for('settings'))
+    
+    @app.route('/saved_searches/<int:search_id>/toggle', methods=['POST'])
+    def toggle_saved_search(search_id):
+        """保存済み検索の有効・無効を切り替え"""
+        search = db.session.get(SavedSearch, search_id)
+        if not search:
+            abort(404)
+        search.enabled = not search.enabled
+        db.session.commit()
+        return redirect(url_for('settings'))
+    
+    @app.route('/saved_searches/<int:search_id>/delete', methods=['POST'])
+    def delete_saved_search(search_id):
+        """保存済み検索を削除"""
+        search = db.session.get(SavedSearch, search_id)
+        if not search:
+            abort(404)
+        db.session.delete(search)
+        db.session.commit()
+        flash(f'検索条件「{search.name}」を削除しました', 'success')
+        return redirect(url_for('settings'))
+    
+    @app.route('/catalog/refresh', methods=['POST'])
+    def refresh_catalog_now():
+        """ジャンル・女優IDカタログを今すぐ更新
+        
+        女優一覧は最大でDMM_CATALOG_ACTRESS_MAX_PAGESページ取得するため、リクエスト内では実行せず
+        定期更新のジョブを次の周期を待たずに起動する。
+        """
+        try:
+            app.extensions['scheduler'].modify_job(catalog_service.JOB_ID, next_run_time=datetime.now(JST))
+        except Exception as e:
+            logger.error(f"Could not start catalog refresh: {e}")
+            flash(f"カタログの更新を開始できませんでした: {e}", 'danger')
+        else:
+            flash("カタログの更新を開始しました。完了後に件数が反映されます", 'success')
+        return redirect(url_for('settings'))
+    
+    @app.route('/api/catalog/suggest')
+    def api_catalog_suggest():
+        """ジャンル・女優名の入力候補API"""
+        kind = request.args.get('kind', 'genre')
+        if kind not in CATALOG_KINDS:
+            return jsonify({'error': f'kind must be one of {", ".join(CATALOG_KINDS)}'}), 400
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        return jsonify(catalog_service.suggest(kind, request.args.get('q', ''), limit))
+    
+    @app.route('/saved_searches/run', methods=['POST'])
+    def run_saved_searches():
+        """有効な保存済み検索を今すぐ実行
+        
+        取得には最大でDMM_CRAWL_TIME_BUDGETかかるため、リクエスト内では実行せず
+        定期取得のジョブを次の周期を待たずに起動する（実行中の場合は重ねて実行しない）。
+        """
+        try:
+            app.extensions['scheduler'].modify_job(FETCH_PRODUCTS_JOB_ID, next_run_time=datetime.now(JST))
+        except Exception as e:
+            logger.error(f"Could not start saved searches: {e}")
+            flash(f"保存済み検索を開始できませんでした: {e}", 'danger')
+        else:
+            flash("保存済み検索の実行を開始しました。取得した商品は完了後に一覧に表示されます", 'success')
+        return redirect(url_for('settings'))
 
 
     @app.route('/products')
@@ -193,8 +354,10 @@ def register_routes(app: Flask) -> None:
         
         # キーワード検索
         keyword = request.args.get('keyword', '')
+        rank = None
         if keyword:
-            query = query.filter(Product.title.like(f'%{keyword}%'))
+            # タイトル・女優・ジャンル・メーカーを全文検索インデックスで検索
+            query, rank = search_products(query, keyword)
         
         # 発売状況によるフィルター
         release_status = request.args.get('release_status', 'all')
@@ -215,21 +378,23 @@ def register_routes(app: Flask) -> None:
         genres_str = request.args.get('genres', '')
         if genres_str:
             genres_list = [genre.strip() for genre in genres_str.split(',') if genre.strip()]
-            # 複数ジャンルでAND検索
+            # 複数ジャンルでAND検索（関連テーブルの索引で完全一致）
             for genre in genres_list:
-                query = query.filter(Product.genres.like(f'%{genre}%'))
+                query = query.filter(Product.tagged_with('genre', genre))
         
         # 女優名によるフィルター（新機能）
         actress_str = request.args.get('actress', '')
         if actress_str:
             actresses_list = [actress.strip() for actress in actress_str.split(',') if actress.strip()]
-            # 複数女優でAND検索
+            # 複数女優でAND検索（関連テーブルの索引で完全一致）
             for actress in actresses_list:
-                query = query.filter(Product.actresses.like(f'%{actress}%'))
+                query = query.filter(Product.tagged_with('actress', actress))
         
-        # 並び替え
-        sort = request.args.get('sort', 'latest')
-        if sort == 'latest':
+        # 並び替え（キーワード検索時は関連度順が既定）
+        sort = request.args.get('sort') or ('relevance' if rank is not None else 'latest')
+        if sort == 'relevance' and rank is not None:
+            query = query.order_by(rank, Product.fetched_at.desc())
+        elif sort in ('latest', 'relevance'):
             query = query.order_by(Product.fetched_at.desc())
         elif sort == 'title':
             query = query.order_by(Product.title)
@@ -260,28 +425,32 @@ def register_routes(app: Flask) -> None:
         
         # キーワード検索
         keyword = request.args.get('keyword', '')
+        rank = None
         if keyword:
-            query = query.filter(Product.title.like(f'%{keyword}%'))
+            # タイトル・女優・ジャンル・メーカーを全文検索インデックスで検索
+            query, rank = search_products(query, keyword)
         
         # ジャンルによるフィルター
         genres_str = request.args.get('genres', '')
         if genres_str:
             genres_list = [genre.strip() for genre in genres_str.split(',') if genre.strip()]
-            # 複数ジャンルでAND検索
+            # 複数ジャンルでAND検索（関連テーブルの索引で完全一致）
             for genre in genres_list:
-                query = query.filter(Product.genres.like(f'%{genre}%'))
+                query = query.filter(Product.tagged_with('genre', genre))
         
         # 女優名によるフィルター（新機能）
         actress_str = request.args.get('actress', '')
         if actress_str:
             actresses_list = [actress.strip() for actress in actress_str.split(',') if actress.strip()]
-            # 複数女優でAND検索
+            # 複数女優でAND検索（関連テーブルの索引で完全一致）
             for actress in actresses_list:
-                query = query.filter(Product.actresses.like(f'%{actress}%'))
+                query = query.filter(Product.tagged_with('actress', actress))
         
-        # 並び替え
-        sort = request.args.get('sort', 'latest')
-        if sort == 'latest':
+        # 並び替え（キーワード検索時は関連度順が既定）
+        sort = request.args.get('sort') or ('relevance' if rank is not None else 'latest')
+        if sort == 'relevance' and rank is not None:
+            query = query.order_by(rank, Product.fetched_at.desc())
+        elif sort in ('latest', 'relevance'):
             query = query.order_by(Product.fetched_at.desc())
         elif sort == 'title':
             query = query.order_by(Product.title)
@@ -310,11 +479,15 @@ def register_routes(app: Flask) -> None:
         images = Image.query.filter_by(product_id=product_id).all()
         selected_images = [img for img in images if img.selected]
         
+        # 動画URLが未取得ならキューの先頭に移動
+        video_pending = video_enrichment_service.prioritize(product_id)
+        
         return render_template(
             'product_detail.html',
             product=product,
             images=images,
-            selected_images=selected_images
+            selected_images=selected_images,
+            video_pending=video_pending
         )
     
     @app.route('/products/<int:product_id>/select_images', methods=['POST'])
@@ -473,13 +646,13 @@ def register_routes(app: Flask) -> None:
         sort = request.form.get('sort', 'date')  # 追加：並び順
         offset = request.form.get('offset', 1, type=int)  # 追加：取得開始位置
         
-        # ジャンルIDリスト取得
-        genre_ids_str = request.form.get('genre_ids', '')
-        genre_ids = [id.strip() for id in genre_ids_str.split(',') if id.strip()]
-        
-        # 女優IDリスト取得
-        actress_ids_str = request.form.get('actress_ids', '')
-        actress_ids = [id.strip() for id in actress_ids_str.split(',') if id.strip()]
+        # ジャンル・女優の名前（またはID）をカタログでIDに変換
+        genre_ids, unknown_genres = catalog_service.resolve_terms('genre', request.form.get('genre_ids', ''))
+        actress_ids, unknown_actresses = catalog_service.resolve_terms('actress', request.form.get('actress_ids', ''))
+        if unknown_genres or unknown_actresses:
+            flash(f"カタログにない名前があります: {', '.join(unknown_genres + unknown_actresses)}。"
+                  f"IDで指定するか、設定画面でカタログを更新してください。", 'warning')
+            return redirect(url_for('index'))
         
         # APIパラメータの準備
         kwargs = {
@@ -501,6 +674,10 @@ def register_routes(app: Flask) -> None:
             kwargs['gte_date'] = today
         # allの場合はフィルターなし
         
+        # メモ化された検索結果を使わず再取得
+        if request.form.get('force_refresh'):
+            kwargs['force_refresh'] = True
+        
         # ジャンルIDの処理
         if genre_ids:
             kwargs['article_genre'] = genre_ids
@@ -510,11 +687,47 @@ def register_routes(app: Flask) -> None:
             kwargs['article_actress'] = actress_ids
         
         logger.info(f"Fetching items with parameters: {kwargs}")
-        count = dmm_api_service.fetch_and_save_new_items(**kwargs)
+        try:
+            # 既存商品の更新モード
+            if request.form.get('refresh'):
+                counts = dmm_api_service.fetch_and_refresh_items(**kwargs)
+                flash(f"{counts['inserted']}件を追加、{counts['updated']}件を更新しました"
+                      f"（変更なし{counts['unchanged']}件）", 'success')
+                return redirect(url_for('index'))
+            count = dmm_api_service.fetch_and_save_new_items(**kwargs)
+        except DMMAPIError as e:
+            flash(f'DMM APIからの取得に失敗しました（{e}）。時間をおいて再度お試しください。', 'danger')
+            return redirect(url_for('index'))
         
         flash(f'{count}件の新しい商品を取得しました', 'success')
         return redirect(url_for('index'))
     
+    @app.route('/fetch_by_ids', methods=['POST'])
+    def fetch_by_ids():
+        """content_idを指定して商品を取得（手動）"""
+        content_ids = parse_content_ids(request.form.get('content_ids', ''))
+        floor = request.form.get('floor', 'videoa')
+        limit = app.config.get('DMM_FETCH_BY_IDS_MAX', 200)
+        
+        if not content_ids:
+            flash('content_idを入力してください', 'warning')
+            return redirect(url_for('index'))
+        if len(content_ids) > limit:
+            flash(f'一度に指定できるcontent_idは{limit}件までです', 'warning')
+            return redirect(url_for('index'))
+        
+        summary = dmm_api_service.fetch_items_by_content_ids(
+            content_ids, floor=floor, force_refresh=bool(request.form.get('force_refresh'))
+        )
+        
+        message = f"{summary['saved']}件を取得しました（保存済み{summary['skipped']}件）"
+        if summary['not_found']:
+            message += f"。見つからなかったID: {', '.join(summary['not_found'])}"
+        if summary['failed']:
+            message += f"。取得に失敗したID: {', '.join(summary['failed'])}"
+        flash(message, 'warning' if summary['failed'] or summary['not_found'] else 'success')
+        return redirect(url_for('index'))
+    
     @app.route('/products/<int:product_id>/toggle_favorite', methods=['POST'])
     def toggle_favorite(product_id):
         """商品のお気に入り状態を切り替え"""
@@ -612,6 +825,56 @@ def register_routes(app: Flask) -> None:
         
         return jsonify({'success': True})
     
+    @app.route('/api/fetch_by_ids', methods=['POST'])
+    def api_fetch_by_ids():
+        """content_idを指定して商品を取得するAPI"""
+        data = request.json or {}
+        content_ids = data.get('content_ids', [])
+        if isinstance(content_ids, list):
+            content_ids = ','.join(str(content_id) for content_id in content_ids)
+        content_ids = parse_content_ids(content_ids)
+        limit = app.config.get('DMM_FETCH_BY_IDS_MAX', 200)
+        
+        if not content_ids:
+            return jsonify({'success': False, 'error': 'content_ids is required'}), 400
+        if len(content_ids) > limit:
+            return jsonify({'success': False, 'error': f'Too many content_ids (max {limit})'}), 400
+        
+        summary = dmm_api_service.fetch_items_by_content_ids(
+            content_ids, floor=data.get('floor', 'videoa'), force_refresh=bool(data.get('force_refresh'))
+        )
+        return jsonify(dict(summary, success=True))
+    
+    @app.route('/api/metrics/rate_limits')
+    def api_rate_limit_metrics():
+        """外部通信のホストごとのレート・同時実行数を返すAPI"""
+        return jsonify(rate_limiter.metrics())
+    
+    @app.route('/api/metrics/search_cache')
+    def api_search_cache_metrics():
+        """検索結果メモ化のヒット・ミス数を返すAPI"""
+        return jsonify(dmm_api_service.search_cache.stats())
+    
+    @app.route('/api/metrics/dmm_api')
+    def api_dmm_api_metrics():
+        """DMM API呼び出しのサーキットブレーカーの状態を返すAPI"""
+        return jsonify(dmm_api_service.breaker.metrics())
+    
+    @app.route('/api/metrics/product_pages')
+    def api_product_page_metrics():
+        """商品ページの読み込みバイト数と早期終了の回数を返すAPI"""
+        return jsonify(dmm_api_service.page_stats)
+    
+    @app.route('/api/metrics/ingest')
+    def api_ingest_metrics():
+        """直近の取り込みパイプラインの段ごとの統計を返すAPI"""
+        return jsonify(dmm_api_service.last_ingest_report or {})
+    
+    @app.route('/api/metrics/db_writer')
+    def api_db_writer_metrics():
+        """単一書き込みスレッドの処理件数と待ち行列の深さを返すAPI"""
+        return jsonify(db_writer.report())
+    
     @app.route('/api/extract_jsonld')
     def api_extract_jsonld():
         """商品ページからJSONLDを抽出するAPI"""
@@ -620,13 +883,11 @@ def register_routes(app: Flask) -> None:
             return jsonify({'error': 'URL parameter is required'})
         
         try:
-            import requests
             from bs4 import BeautifulSoup
             import json
             
-            # ページを取得
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
+            # ページ全体を取得（商品ページキャッシュを共有、途中で読むのをやめない）
+            response = dmm_api_service.fetch_product_page(url, stream=False)
             
             # HTMLをパース
             soup = BeautifulSoup(response.text, 'lxml')
@@ -680,8 +941,34 @@ def fetch_new_products(app: Flask) -> None:
     """新しい商品を取得"""
     with app.app_context():
         logger.info("Fetching new products...")
-        count = dmm_api_service.fetch_and_save_new_items()
-        logger.info(f"Fetched {count} new products")
+        # 保存済み検索ごとに前回取得済みの最新商品より新しいものだけを並列に取得
+        summary = dmm_api_service.fetch_saved_searches(
+            max_pages=app.config.get('DMM_CRAWL_MAX_PAGES'),
+            time_budget=app.config.get('DMM_CRAWL_TIME_BUDGET')
+        )
+        logger.info(f"Fetched {summary['saved']} new products from {summary['searches']} saved searches")
+
+
+def enrich_videos(app: Flask) -> None:
+    """動画URL抽出キューを処理"""
+    with app.app_context():
+        count = video_enrichment_service.process_batch()
+        if count:
+            logger.info(f"Added video URLs to {count} products")
+
+
+def refresh_catalog(app: Flask) -> None:
+    """ジャンル・女優IDカタログを更新"""
+    with app.app_context():
+        counts = catalog_service.refresh()
+        logger.info(f"Refreshed catalog: {counts}")
+
+
+def purge_http_cache(app: Flask) -> None:
+    """商品ページキャッシュの古いエントリを削除"""
+    with app.app_context():
+        if dmm_api_service.cache:
+            dmm_api_service.cache.purge_expired()
 
 
 def schedule_posts(app: Flask) -> None:
@@ -17,10 +17,105 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # DBコネクションプール（Webリクエスト・スケジューラのスレッド・取り込みのスレッドで共有）
+    # ファイルのSQLiteとSQLite以外のDBにだけ適用する（インメモリSQLiteはプールの大きさを持たない）
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))  # 接続が空くのを待つ秒数
+    
+    # SQLiteの接続ごとの設定（WALで読み込みと書き込みを並行させる）
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))             # ロック解除を待つミリ秒
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))      # 接続ごとのページキャッシュ
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))      # メモリマップで読むバイト数（0で無効）
+    
+    # バックグラウンドの書き込みを1つのスレッドに集めて短いトランザクションで順に実行
+    DB_SINGLE_WRITER = os.environ.get('DB_SINGLE_WRITER', 'false').lower() == 'true'
+    DB_WRITER_QUEUE_SIZE = int(os.environ.get('DB_WRITER_QUEUE_SIZE', 1000))  # 待ち行列の上限（埋まると依頼側が待つ）
+    DB_WRITER_TIMEOUT = float(os.environ.get('DB_WRITER_TIMEOUT', 120))       # 依頼した書き込みの完了を待つ秒数
     
     # DMM API設定
     DMM_API_ID = os.environ.get('DMM_API_ID')
     DMM_AFFILIATE_ID = os.environ.get('DMM_AFFILIATE_ID')
+    # 接続先の差し替え（オフラインの負荷試験でdevtools.dmm_stubを使う場合に指定）
+    DMM_API_BASE_URL = os.environ.get('DMM_API_BASE_URL')
+    DMM_LITEVIDEO_BASE_URL = os.environ.get('DMM_LITEVIDEO_BASE_URL')
+    
+    # DMM向けHTTPコネクションプール設定
+    DMM_HTTP_POOL_CONNECTIONS = int(os.environ.get('DMM_HTTP_POOL_CONNECTIONS', 10))  # プールを保持するホスト数
+    DMM_HTTP_POOL_MAXSIZE = int(os.environ.get('DMM_HTTP_POOL_MAXSIZE', 10))          # ホストごとの最大接続数
+    # 接続数が上限に達したとき空きを待つかどうか（falseでは上限を超えた接続は使い捨て）
+    DMM_HTTP_POOL_BLOCK = os.environ.get('DMM_HTTP_POOL_BLOCK', 'false').lower() == 'true'
+    DMM_HTTP_CONNECT_TIMEOUT = float(os.environ.get('DMM_HTTP_CONNECT_TIMEOUT', 5))
+    DMM_HTTP_READ_TIMEOUT = float(os.environ.get('DMM_HTTP_READ_TIMEOUT', 15))
+    DMM_HTTP_KEEPALIVE = os.environ.get('DMM_HTTP_KEEPALIVE', 'true').lower() == 'true'
+    
+    # 動画URL抽出のバックグラウンド処理（trueで商品を先に保存して動画URLは後から追加、falseで保存時に抽出）
+    DMM_DEFER_VIDEO_EXTRACTION = os.environ.get('DMM_DEFER_VIDEO_EXTRACTION', 'false').lower() == 'true'
+    VIDEO_ENRICHMENT_INTERVAL = int(os.environ.get('VIDEO_ENRICHMENT_INTERVAL', 60))          # 秒
+    VIDEO_ENRICHMENT_BATCH_SIZE = int(os.environ.get('VIDEO_ENRICHMENT_BATCH_SIZE', 50))      # 1回に処理するタスク数
+    VIDEO_ENRICHMENT_MAX_ATTEMPTS = int(os.environ.get('VIDEO_ENRICHMENT_MAX_ATTEMPTS', 3))   # 失敗扱いにする試行回数
+    
+    # 動画URLをcontent_idから導出してHEADで確認（trueで見つからない場合のみ商品ページを取得、falseで常に商品ページから抽出）
+    DMM_PROBE_VIDEO_URLS = os.environ.get('DMM_PROBE_VIDEO_URLS', 'false').lower() == 'true'
+    
+    # API検索を並列に実行する数（保存済み検索・content_id指定の取得）
+    DMM_SEARCH_WORKERS = int(os.environ.get('DMM_SEARCH_WORKERS', 4))
+    
+    # ジャンル・女優IDカタログ（名前からIDへの変換と入力候補に使用）
+    DMM_CATALOG_FLOOR_ID = int(os.environ.get('DMM_CATALOG_FLOOR_ID', 43))                      # ジャンルを取得するフロア（43: ビデオ/一般）
+    DMM_CATALOG_ACTRESS_MAX_PAGES = int(os.environ.get('DMM_CATALOG_ACTRESS_MAX_PAGES', 100))    # 女優の取得ページ数（1ページ100件）
+    DMM_CATALOG_REFRESH_HOURS = int(os.environ.get('DMM_CATALOG_REFRESH_HOURS', 24))             # APIから再取得する間隔
+    DMM_CATALOG_RELOAD_INTERVAL = int(os.environ.get('DMM_CATALOG_RELOAD_INTERVAL', 300))        # DBから索引を読み直す間隔（秒）
+    
+    # content_id指定取得で一度に指定できる件数
+    DMM_FETCH_BY_IDS_MAX = int(os.environ.get('DMM_FETCH_BY_IDS_MAX', 200))
+    
+    # 検索結果のメモ化（同じ条件の再検索でAPIを呼ばない）
+    DMM_SEARCH_CACHE_TTL = int(os.environ.get('DMM_SEARCH_CACHE_TTL', 300))    # 秒
+    DMM_SEARCH_CACHE_SIZE = int(os.environ.get('DMM_SEARCH_CACHE_SIZE', 256))  # 保持する検索条件の数
+    
+    # DMM API呼び出しのリトライとサーキットブレーカー
+    DMM_API_RETRIES = int(os.environ.get('DMM_API_RETRIES', 3))                       # 再試行回数
+    DMM_API_BACKOFF_BASE = float(os.environ.get('DMM_API_BACKOFF_BASE', 0.5))         # 秒
+    DMM_API_BACKOFF_MAX = float(os.environ.get('DMM_API_BACKOFF_MAX', 8))             # 秒
+    DMM_API_BREAKER_THRESHOLD = int(os.environ.get('DMM_API_BREAKER_THRESHOLD', 5))   # 遮断する連続失敗回数
+    DMM_API_BREAKER_RESET = float(os.environ.get('DMM_API_BREAKER_RESET', 60))        # 遮断を解除するまでの秒数
+    
+    # 外部通信のホストごとのレート制限（AIMDで同時実行数を自動調整）
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_HOSTS = {}  # {'ホスト名': (秒間リクエスト数, バースト, 最大同時実行数)} で既定値を上書き
+    
+    # 商品ページの永続HTTPキャッシュ（全ワーカーで共有）
+    HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+    HTTP_CACHE_PATH = os.environ.get('HTTP_CACHE_PATH')  # 未指定時はinstance/http_cache.db
+    HTTP_CACHE_FRESH_TTL = int(os.environ.get('HTTP_CACHE_FRESH_TTL', 6 * 3600))         # 再検証なしで使う期間（秒）
+    HTTP_CACHE_NEGATIVE_TTL = int(os.environ.get('HTTP_CACHE_NEGATIVE_TTL', 24 * 3600))  # 「動画なし」を記憶する期間（秒）
+    HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 7 * 24 * 3600))       # 取得から削除までの期間（秒）
+    HTTP_CACHE_MAX_ENTRIES = int(os.environ.get('HTTP_CACHE_MAX_ENTRIES', 20000))       # 保存するページ数の上限
+    HTTP_CACHE_PURGE_HOURS = int(os.environ.get('HTTP_CACHE_PURGE_HOURS', 6))           # 古いエントリを削除する間隔（時間）
+    
+    # 商品ページからの動画URL抽出の並列度
+    DMM_SCRAPE_WORKERS = int(os.environ.get('DMM_SCRAPE_WORKERS', 8))    # スレッドプールの大きさ
+    DMM_SCRAPE_PER_HOST = int(os.environ.get('DMM_SCRAPE_PER_HOST', 4))  # ホストごとの同時接続数
+    
+    # 商品ページを分割して読み、動画URLが見つかった時点で接続を閉じる
+    DMM_STREAM_PAGES = os.environ.get('DMM_STREAM_PAGES', 'false').lower() == 'true'
+    DMM_STREAM_BYTE_BUDGET = int(os.environ.get('DMM_STREAM_BYTE_BUDGET', 1024 * 1024))  # 1ページで読み込む最大バイト数
+    
+    # 商品ページの解析を行うプロセス数（0で無効、autoでCPUコア数）
+    DMM_PARSE_PROCESSES = os.environ.get('DMM_PARSE_PROCESSES', '0')
+    DMM_PARSE_MAX_TASKS_PER_CHILD = int(os.environ.get('DMM_PARSE_MAX_TASKS_PER_CHILD', 0)) or None  # ワーカーを作り直すまでの解析数
+    
+    # 商品の一括保存でコミットする件数
+    DMM_INGEST_CHUNK_SIZE = int(os.environ.get('DMM_INGEST_CHUNK_SIZE', 500))
+    # 取り込みパイプラインの段の間に溜めるページ数（上限に達すると上流の段が待つ）
+    DMM_INGEST_QUEUE_SIZE = int(os.environ.get('DMM_INGEST_QUEUE_SIZE', 4))
+    
+    # 定期取得ジョブのクロール上限（1回の実行あたり）
+    DMM_CRAWL_MAX_PAGES = int(os.environ.get('DMM_CRAWL_MAX_PAGES', 20))
+    DMM_CRAWL_TIME_BUDGET = int(os.environ.get('DMM_CRAWL_TIME_BUDGET', 1800))  # 秒
     
     # Twitter API設定
     TWITTER_API_KEY = os.environ.get('TWITTER_API_KEY')
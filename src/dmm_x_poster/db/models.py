@@ -2,26 +2,71 @@
 データベースモデル定義
 """
 import json
+import sqlite3
 import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import bindparam, delete, event, insert, inspect, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.types import TypeDecorator
 from dmm_x_poster.config import JST
 
 db = SQLAlchemy()
 Base = declarative_base()
 
+# INクエリ1回あたりのパラメータ数（SQLiteの変数上限対策）
+TAG_CHUNK = 500
+
+
+class JSONList(TypeDecorator):
+    """リストをJSON文字列としてTEXT列に保存する型
+    
+    読み込み時に一度だけデコードしてリストとして保持する。全文検索・LIKE検索が
+    保存された文字列をそのまま使うため、日本語はエスケープせずに保存する。
+    文字列を渡した場合はJSON文字列（またはLIKEのパターン）としてそのまま書き込む。
+    """
+    impl = db.Text
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(list(value), ensure_ascii=False)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else _decode_json_list(value)
+
+
+def _decode_json_list(value):
+    """JSON文字列（またはリスト）をリストに変換（空の場合は空のリスト）"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
 class Product(db.Model):
     """商品テーブル"""
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_fetched_at', 'fetched_at'),  # 新着順の一覧
+        db.Index('ix_products_release_date', 'release_date'),  # 発売日順・発売状況の絞り込み
+        db.Index('ix_products_posted', 'posted'),  # 未投稿商品のスケジュール登録
+        db.Index('ix_products_is_favorite_fetched_at', 'is_favorite', 'fetched_at'),  # お気に入り一覧
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     dmm_product_id = db.Column(db.String(50), unique=True, nullable=False)
     title = db.Column(db.Text, nullable=False)
-    actresses = db.Column(db.Text)  # JSON形式
+    actresses = db.Column(JSONList)  # 女優名のリスト
     url = db.Column(db.Text, nullable=False)
     package_image_url = db.Column(db.Text)
     maker = db.Column(db.Text)
-    genres = db.Column(db.Text)  # JSON形式
+    maker_id = db.Column(db.Integer, db.ForeignKey('makers.id', name='fk_products_maker_id_makers'), index=True)
+    genres = db.Column(JSONList)  # ジャンル名のリスト
     release_date = db.Column(db.Date)
     fetched_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(JST))
     posted = db.Column(db.Boolean, default=False)
@@ -31,18 +76,32 @@ class Product(db.Model):
     # リレーションシップ
     images = db.relationship('Image', backref='product', lazy='dynamic', cascade='all, delete-orphan')
     posts = db.relationship('Post', backref='product', lazy='dynamic', cascade='all, delete-orphan')
+    video_task = db.relationship('VideoEnrichmentTask', backref='product', uselist=False, cascade='all, delete-orphan')
     
     def get_actresses_list(self):
-        """女優名のリストを取得"""
-        if self.actresses:
-            return json.loads(self.actresses)
-        return []
+        """女優名のリストを取得（デコード済みの値をそのまま返すため変更しないこと）"""
+        return self.actresses or []
     
     def get_genres_list(self):
-        """ジャンルのリストを取得"""
-        if self.genres:
-            return json.loads(self.genres)
-        return []
+        """ジャンルのリストを取得（デコード済みの値をそのまま返すため変更しないこと）"""
+        return self.genres or []
+    
+    @classmethod
+    def tagged_with(cls, kind, name):
+        """指定した女優・ジャンル（完全一致）の商品に絞り込む条件を生成
+        
+        正規化テーブルの索引を使うため、LIKEによる部分一致のような全件走査や誤一致が起きない。
+        
+        Args:
+            kind (str): 'actress' または 'genre'
+            name (str): 女優名・ジャンル名
+        """
+        name_model, link_model, column, _ = TAG_TABLES[kind]
+        return cls.id.in_(
+            select(link_model.product_id)
+            .join(name_model, getattr(link_model, column) == name_model.id)
+            .where(name_model.name == name)
+        )
     
     def get_selected_images(self, limit=4):
         """選択された画像を順序通りに取得"""
@@ -52,9 +111,20 @@ class Product(db.Model):
         ).order_by(Image.selection_order).limit(limit).all()
 
 
+@event.listens_for(Product.actresses, 'set', retval=True)
+@event.listens_for(Product.genres, 'set', retval=True)
+def _decode_assigned_list(target, value, oldvalue, initiator):
+    """JSON文字列を代入した場合も代入時に一度だけデコードしてリストとして保持"""
+    return None if value is None else _decode_json_list(value)
+
+
 class Image(db.Model):
     """画像テーブル"""
     __tablename__ = 'images'
+    __table_args__ = (
+        # 商品ごとの画像・選択済み画像の取得（product_idだけの検索にも使う）
+        db.Index('ix_images_product_id_selected_selection_order', 'product_id', 'selected', 'selection_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -73,6 +143,11 @@ class Image(db.Model):
 class Post(db.Model):
     """投稿テーブル"""
     __tablename__ = 'posts'
+    __table_args__ = (
+        db.Index('ix_posts_status_scheduled_at', 'status', 'scheduled_at'),  # 予定投稿の処理・次の投稿時刻
+        db.Index('ix_posts_status_posted_at', 'status', 'posted_at'),  # 最近の投稿
+        db.Index('ix_posts_product_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -98,12 +173,376 @@ class Post(db.Model):
 class PostImage(db.Model):
     """投稿画像関連テーブル"""
     __tablename__ = 'post_images'
+    __table_args__ = (
+        db.Index('ix_post_images_post_id_display_order', 'post_id', 'display_order'),  # 投稿の画像を表示順に取得
+        db.Index('ix_post_images_image_id', 'image_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
     image_id = db.Column(db.Integer, db.ForeignKey('images.id'), nullable=False)
     display_order = db.Column(db.Integer, nullable=False)
 
+class VideoEnrichmentTask(db.Model):
+    """動画URL抽出待ちキューテーブル"""
+    __tablename__ = 'video_enrichment_tasks'
+    __table_args__ = (
+        db.Index('ix_video_enrichment_tasks_status_priority', 'status', 'priority', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), unique=True, nullable=False)
+    page_url = db.Column(db.Text, nullable=False)  # 動画URLを抽出する商品ページ
+    priority = db.Column(db.Integer, default=0, nullable=False)  # 大きいほど先に処理
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(JST))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(JST))
+
+
+class SavedSearch(db.Model):
+    """定期取得で実行する保存済み検索条件テーブル"""
+    __tablename__ = 'saved_searches'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    floor = db.Column(db.String(20), default='videoa', nullable=False)
+    sort = db.Column(db.String(20), default='date', nullable=False)
+    genre_ids = db.Column(db.Text)  # カンマ区切り
+    actress_ids = db.Column(db.Text)  # カンマ区切り
+    release_status = db.Column(db.String(20), default='released', nullable=False)  # released, preorder, all
+    hits = db.Column(db.Integer, default=100, nullable=False)
+    enabled = db.Column(db.Boolean, default=True, nullable=False)
+    last_run_at = db.Column(db.DateTime)
+    last_result = db.Column(db.Text)  # JSON形式
+    created_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(JST))
+    
+    def get_genre_ids(self):
+        """ジャンルIDのリストを取得"""
+        return [id.strip() for id in (self.genre_ids or '').split(',') if id.strip()]
+    
+    def get_actress_ids(self):
+        """女優IDのリストを取得"""
+        return [id.strip() for id in (self.actress_ids or '').split(',') if id.strip()]
+    
+    def get_last_result(self):
+        """前回実行結果を取得"""
+        if self.last_result:
+            return json.loads(self.last_result)
+        return {}
+    
+    def to_search_kwargs(self, today=None):
+        """DMMAPIServiceの検索オプションに変換
+        
+        Args:
+            today (str): 発売ステータスの基準日（YYYY-MM-DDT00:00:00形式、省略時は今日）
+        """
+        today = today or datetime.datetime.now(JST).strftime('%Y-%m-%dT00:00:00')
+        kwargs = {
+            'floor': self.floor,
+            'sort': self.sort,
+            'hits': self.hits,
+        }
+        if self.release_status == 'released':
+            kwargs['lte_date'] = today
+        elif self.release_status == 'preorder':
+            kwargs['gte_date'] = today
+        if self.get_genre_ids():
+            kwargs['article_genre'] = self.get_genre_ids()
+        elif self.get_actress_ids():
+            kwargs['article_actress'] = self.get_actress_ids()
+        return kwargs
+
+
+class CatalogEntry(db.Model):
+    """DMMのジャンル・女優のIDと名前の対応テーブル"""
+    __tablename__ = 'catalog_entries'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'dmm_id', name='uq_catalog_entries_kind_dmm_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # genre, actress
+    dmm_id = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.Text, nullable=False)
+    ruby = db.Column(db.Text)  # 読み仮名
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(JST))
+
+
+class Actress(db.Model):
+    """女優名テーブル"""
+    __tablename__ = 'actresses'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+
+
+class Genre(db.Model):
+    """ジャンル名テーブル"""
+    __tablename__ = 'genres'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+
+
+class Maker(db.Model):
+    """メーカー名テーブル"""
+    __tablename__ = 'makers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+
+
+class ProductActress(db.Model):
+    """商品と女優の関連テーブル"""
+    __tablename__ = 'product_actresses'
+    __table_args__ = (
+        db.Index('ix_product_actresses_actress_id_product_id', 'actress_id', 'product_id'),
+    )
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    actress_id = db.Column(db.Integer, db.ForeignKey('actresses.id', ondelete='CASCADE'), primary_key=True)
+
+
+class ProductGenre(db.Model):
+    """商品とジャンルの関連テーブル"""
+    __tablename__ = 'product_genres'
+    __table_args__ = (
+        db.Index('ix_product_genres_genre_id_product_id', 'genre_id', 'product_id'),
+    )
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    genre_id = db.Column(db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True)
+
+
+# 種別 -> (名前テーブル, 関連テーブル, 関連テーブルの列名, 商品テーブルのJSON列名)
+TAG_TABLES = {
+    'actress': (Actress, ProductActress, 'actress_id', 'actresses'),
+    'genre': (Genre, ProductGenre, 'genre_id', 'genres'),
+}
+# 正規化テーブルに反映する商品テーブルの列
+TAG_COLUMNS = ('actresses', 'genres', 'maker')
+
+
+def _decode_names(value):
+    """JSON文字列（またはリスト）から重複と空文字を除いた名前のリストを取得"""
+    return list(dict.fromkeys(name for name in _decode_json_list(value) if name))
+
+
+def _ensure_names(connection, model, names):
+    """名前テーブルに未登録の名前を追加し、名前 -> IDの辞書を取得"""
+    names = list(names)
+    ids = {}
+    for start in range(0, len(names), TAG_CHUNK):
+        chunk = names[start:start + TAG_CHUNK]
+        ids.update(connection.execute(select(model.name, model.id).where(model.name.in_(chunk))).all())
+        missing = [name for name in chunk if name not in ids]
+        if not missing:
+            continue
+        if connection.dialect.name == 'sqlite':
+            stmt = sqlite_insert(model).on_conflict_do_nothing(index_elements=['name'])
+        elif connection.dialect.name == 'postgresql':
+            stmt = postgresql_insert(model).on_conflict_do_nothing(index_elements=['name'])
+        else:
+            stmt = insert(model)
+        connection.execute(stmt, [{'name': name} for name in missing])
+        ids.update(connection.execute(select(model.name, model.id).where(model.name.in_(missing))).all())
+    return ids
+
+
+def sync_product_tags(connection, rows, replace=True):
+    """商品の女優・ジャンル・メーカーを正規化テーブルに反映
+    
+    Args:
+        connection: 実行に使う接続（セッションの場合はsession.connection()）
+        rows (list): 'id'と、反映する列（actresses, genres, maker）の値を持つ辞書のリスト。
+            含まれない列は変更しない
+        replace (bool): 既存の関連を削除してから追加する（新規の商品ではFalseでよい）
+    
+    Returns:
+        dict: 商品ID -> メーカーID（makerを含む行のみ）
+    """
+    rows = [row for row in rows if row.get('id') is not None]
+    for name_model, link_model, column, key in TAG_TABLES.values():
+        targets = {row['id']: _decode_names(row[key]) for row in rows if key in row}
+        if not targets:
+            continue
+        ids = _ensure_names(connection, name_model, {name for names in targets.values() for name in names})
+        if replace:
+            product_ids = list(targets)
+            for start in range(0, len(product_ids), TAG_CHUNK):
+                chunk = product_ids[start:start + TAG_CHUNK]
+                connection.execute(delete(link_model).where(link_model.product_id.in_(chunk)))
+        links = [
+            {'product_id': product_id, column: ids[name]}
+            for product_id, names in targets.items() for name in names
+        ]
+        if links:
+            connection.execute(insert(link_model), links)
+    
+    makers = {row['id']: row['maker'] or None for row in rows if 'maker' in row}
+    if not makers:
+        return {}
+    ids = _ensure_names(connection, Maker, {name for name in makers.values() if name})
+    maker_ids = {product_id: ids.get(name) for product_id, name in makers.items()}
+    table = Product.__table__
+    connection.execute(
+        table.update().where(table.c.id == bindparam('product_id')).values(maker_id=bindparam('maker_id')),
+        [{'product_id': product_id, 'maker_id': maker_id} for product_id, maker_id in maker_ids.items()]
+    )
+    return maker_ids
+
+
+def delete_product_tags(connection, product_ids):
+    """削除した商品の関連を削除（SQLiteでは外部キーの連鎖削除が無効なため）"""
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), TAG_CHUNK):
+        chunk = product_ids[start:start + TAG_CHUNK]
+        for link_model in (ProductActress, ProductGenre):
+            connection.execute(delete(link_model).where(link_model.product_id.in_(chunk)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_flushed_products(session, flush_context):
+    """ORM経由で追加・変更・削除した商品を正規化テーブルに反映
+    
+    一括INSERT・UPDATEの経路はフラッシュを通らないため、呼び出し側でsync_product_tagsを使う。
+    """
+    rows = []
+    products = {}
+    for obj in session.new:
+        if isinstance(obj, Product):
+            rows.append({'id': obj.id, **{key: getattr(obj, key) for key in TAG_COLUMNS}})
+            products[obj.id] = obj
+    for obj in session.dirty:
+        if isinstance(obj, Product) and obj not in session.deleted:
+            state = inspect(obj)
+            changed = {key: getattr(obj, key) for key in TAG_COLUMNS if state.attrs[key].history.has_changes()}
+            if changed:
+                rows.append(dict(changed, id=obj.id))
+                products[obj.id] = obj
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Product)]
+    if not rows and not deleted:
+        return
+    
+    connection = session.connection()
+    if deleted:
+        delete_product_tags(connection, deleted)
+    new_ids = {obj.id for obj in session.new if isinstance(obj, Product)}
+    maker_ids = sync_product_tags(connection, [row for row in rows if row['id'] in new_ids], replace=False)
+    maker_ids.update(sync_product_tags(connection, [row for row in rows if row['id'] not in new_ids]))
+    for product_id, maker_id in maker_ids.items():
+        set_committed_value(products[product_id], 'maker_id', maker_id)
+
+
+# 商品の全文検索インデックス（SQLite FTS5のtrigramトークナイザ）
+PRODUCT_FTS_TABLE = 'products_fts'
+# 全文検索の対象列と関連度の重み（タイトルの一致を優先する）
+PRODUCT_FTS_COLUMNS = ('title', 'actresses', 'genres', 'maker')
+PRODUCT_FTS_WEIGHTS = (4.0, 2.0, 1.0, 1.0)
+# trigramトークナイザで索引を引ける最短の語の長さ
+FTS_MIN_TERM_LENGTH = 3
+# trigramトークナイザが使えるSQLiteのバージョン
+FTS_TRIGRAM_SQLITE_VERSION = (3, 34, 0)
+
+_FTS_COLUMN_LIST = ', '.join(PRODUCT_FTS_COLUMNS)
+_FTS_NEW_VALUES = ', '.join(f'new.{column}' for column in PRODUCT_FTS_COLUMNS)
+_FTS_OLD_VALUES = ', '.join(f'old.{column}' for column in PRODUCT_FTS_COLUMNS)
+# 商品テーブルを外部コンテンツとする索引と、INSERT・DELETE・UPDATEで索引を更新するトリガー
+# （一括INSERT・UPDATEの経路でも同期される）
+PRODUCT_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCT_FTS_TABLE} USING fts5("
+    f"{_FTS_COLUMN_LIST}, content='products', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_ai AFTER INSERT ON products BEGIN "
+    f"INSERT INTO {PRODUCT_FTS_TABLE}(rowid, {_FTS_COLUMN_LIST}) VALUES (new.id, {_FTS_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_ad AFTER DELETE ON products BEGIN "
+    f"INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, {_FTS_COLUMN_LIST}) "
+    f"VALUES ('delete', old.id, {_FTS_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {PRODUCT_FTS_TABLE}_au AFTER UPDATE OF {_FTS_COLUMN_LIST} ON products BEGIN "
+    f"INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, {_FTS_COLUMN_LIST}) "
+    f"VALUES ('delete', old.id, {_FTS_OLD_VALUES}); "
+    f"INSERT INTO {PRODUCT_FTS_TABLE}(rowid, {_FTS_COLUMN_LIST}) VALUES (new.id, {_FTS_NEW_VALUES}); END",
+)
+
+
+def product_search_supported(connection):
+    """全文検索インデックスを作成できるデータベースかどうか"""
+    return connection.dialect.name == 'sqlite' and sqlite3.sqlite_version_info >= FTS_TRIGRAM_SQLITE_VERSION
+
+
+def product_search_available(connection):
+    """全文検索インデックスが作成済みかどうか"""
+    if not product_search_supported(connection):
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': PRODUCT_FTS_TABLE}
+    ).first() is not None
+
+
+def create_product_search_index(connection):
+    """全文検索インデックスとトリガーを作成し、新規に作成した場合は保存済み商品から索引を構築
+    
+    Returns:
+        bool: 新規に作成した場合True
+    """
+    created = not product_search_available(connection)
+    for statement in PRODUCT_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if created:
+        connection.exec_driver_sql(f"INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}) VALUES ('rebuild')")
+    return created
+
+
+@event.listens_for(Product.__table__, 'after_create')
+def _create_product_search_index(target, connection, **kw):
+    """create_allで商品テーブルと一緒に全文検索インデックスを作成"""
+    if product_search_supported(connection):
+        create_product_search_index(connection)
+
+
+@event.listens_for(Product.__table__, 'before_drop')
+def _drop_product_search_index(target, connection, **kw):
+    """drop_allで商品テーブルと一緒に全文検索インデックスを削除（トリガーはテーブルと一緒に消える）"""
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {PRODUCT_FTS_TABLE}")
+
+
+def search_products(query, keyword):
+    """キーワード（空白区切りでAND検索）で商品を絞り込む
+    
+    タイトル・女優・ジャンル・メーカーを対象に、3文字以上の語は全文検索インデックスで、
+    それより短い語と全文検索インデックスのないデータベースではLIKEで検索する。
+    
+    Args:
+        query: 商品のクエリ
+        keyword (str): 検索キーワード
+    
+    Returns:
+        tuple: (絞り込んだクエリ, 関連度の列（小さいほど関連が高い。全文検索を使わない場合はNone）)
+    """
+    terms = keyword.split()
+    indexed = [term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+    rank = None
+    if indexed and product_search_available(db.session.connection()):
+        weights = ', '.join(str(weight) for weight in PRODUCT_FTS_WEIGHTS)
+        hits = text(
+            f"SELECT rowid AS product_id, bm25({PRODUCT_FTS_TABLE}, {weights}) AS rank "
+            f"FROM {PRODUCT_FTS_TABLE} WHERE {PRODUCT_FTS_TABLE} MATCH :match"
+        ).bindparams(
+            # 各語をフレーズとして扱い、FTS5の演算子として解釈させない
+            match=' AND '.join('"{}"'.format(term.replace('"', '""')) for term in indexed)
+        ).columns(product_id=db.Integer, rank=db.Float).subquery('product_search')
+        query = query.join(hits, Product.id == hits.c.product_id)
+        rank = hits.c.rank
+        terms = [term for term in terms if term not in indexed]
+    
+    for term in terms:
+        query = query.filter(or_(*[getattr(Product, column).like(f'%{term}%') for column in PRODUCT_FTS_COLUMNS]))
+    return query, rank
+
+
 class Setting(db.Model):
     """システム設定テーブル"""
     __tablename__ = 'settings'
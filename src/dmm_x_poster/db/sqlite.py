@@ -0,0 +1,103 @@
+"""
+SQLiteの接続設定モジュール
+
+Webリクエスト・スケジューラのスレッド・取り込みのスレッドが同じSQLiteファイルに
+書き込むため、接続ごとにWAL・busy_timeoutなどのPRAGMAを設定して
+「database is locked」で止まらないようにする。
+"""
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from dmm_x_poster.db.models import db
+
+logger = logging.getLogger(__name__)
+
+# synchronousに指定できる値
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+# journal_modeに指定できる値
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+
+
+def engine_options(config):
+    """DBのURLに合わせてSQLALCHEMY_ENGINE_OPTIONSを生成
+
+    pool_size・max_overflow・pool_timeoutはQueuePoolを使うエンジン（ファイルのSQLiteと
+    SQLite以外のDB）にだけ設定する。インメモリSQLiteはSingletonThreadPool/StaticPoolを
+    使うため、指定するとcreate_engineがTypeErrorになる。
+
+    Returns:
+        dict: エンジンのオプション（SQLALCHEMY_ENGINE_OPTIONSで指定した値を優先）
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(config.get('SQLALCHEMY_DATABASE_URI') or 'sqlite://')
+    if url.get_backend_name() == 'sqlite' and (
+            url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'):
+        return options
+    options.setdefault('pool_size', int(config.get('DB_POOL_SIZE', 5)))
+    options.setdefault('max_overflow', int(config.get('DB_MAX_OVERFLOW', 10)))
+    options.setdefault('pool_timeout', float(config.get('DB_POOL_TIMEOUT', 30)))
+    return options
+
+
+def sqlite_pragmas(config):
+    """設定値から接続ごとに実行するPRAGMAの一覧を生成
+
+    Returns:
+        list: (PRAGMA名, 値)のリスト（journal_modeはデータベース単位のため先頭）
+    """
+    journal_mode = str(config.get('SQLITE_JOURNAL_MODE', 'WAL')).upper()
+    synchronous = str(config.get('SQLITE_SYNCHRONOUS', 'NORMAL')).upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {journal_mode}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {synchronous}")
+    return [
+        ('journal_mode', journal_mode),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        ('synchronous', synchronous),
+        # 負の値はKiB単位の指定
+        ('cache_size', -int(config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+    ]
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """DB-APIの接続にPRAGMAを設定
+
+    Returns:
+        str: 有効になったjournal_mode（インメモリDBではmemory）
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        journal_mode = None
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+            if name == 'journal_mode':
+                journal_mode = cursor.fetchone()[0]
+        return journal_mode
+    finally:
+        cursor.close()
+
+
+def configure_sqlite(app):
+    """アプリケーションのSQLiteエンジンに接続時のPRAGMA設定を登録
+
+    db.init_appの後、最初の接続より前に呼び出す。SQLite以外のエンジンには何もしない。
+    """
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+        reported = []
+
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record, reported=reported, url=engine.url):
+            journal_mode = apply_pragmas(dbapi_connection, pragmas)
+            if not reported:
+                reported.append(journal_mode)
+                logger.info(f"SQLite {url.database or ':memory:'}: journal_mode={journal_mode}, "
+                            + ', '.join(f"{name}={value}" for name, value in pragmas[1:]))
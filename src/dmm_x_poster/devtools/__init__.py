@@ -0,0 +1,3 @@
+"""
+開発・負荷試験用のツール群
+"""
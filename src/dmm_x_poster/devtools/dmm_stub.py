@@ -0,0 +1,328 @@
+"""
+DMM APIと商品ページを模したローカルサーバー（オフラインでの負荷試験用）
+
+ItemList API（ページング・total_count・ジャンル/女優/日付/cidによる絞り込み）と
+JSON-LDを含む商品ページ、サンプル動画URLのHEAD確認に応答する。
+応答の遅延・エラー率・カタログ件数は起動時に指定できる。
+
+使い方:
+    python -m dmm_x_poster.devtools.dmm_stub --port 8800 --items 5000 --latency 50 --error-rate 0.05
+
+アプリケーション側の設定:
+    DMM_API_BASE_URL=http://127.0.0.1:8800/affiliate/v3/ItemList
+    DMM_LITEVIDEO_BASE_URL=http://127.0.0.1:8800
+"""
+import re
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+API_PATH = '/affiliate/v3/ItemList'
+PAGE_RE = re.compile(r'^/digital/videoa/-/detail/=/cid=([0-9a-z_]+)/?$')
+LITEVIDEO_RE = re.compile(r'^/litevideo/freepv/[^/]+/[^/]+/([0-9a-z_]+)/[^/]+\.mp4$')
+
+GENRE_COUNT = 20
+ACTRESS_COUNT = 100
+MAKER_COUNT = 15
+MAX_HITS = 100
+
+
+class StubCatalog:
+    """決定的に生成される合成商品カタログ（新しい順）"""
+
+    def __init__(self, size=1000, seed=42, video_ratio=0.7, base_date=None):
+        rng = random.Random(seed)
+        base_date = base_date or datetime(2025, 1, 1, 10, 0, 0)
+        self.items = []
+        for index in range(size):
+            released = base_date - timedelta(hours=index * 6)
+            genres = sorted({index % GENRE_COUNT + 1, (index * 7) % GENRE_COUNT + 1})
+            actresses = sorted({1000 + index % ACTRESS_COUNT, 1000 + (index * 13) % ACTRESS_COUNT})
+            self.items.append({
+                'cid': f'stub{index:05d}',
+                'date': released.strftime('%Y-%m-%d %H:%M:%S'),
+                'genres': genres,
+                'actresses': actresses,
+                'maker': index % MAKER_COUNT + 1,
+                'price': 500 + rng.randint(0, 30) * 100,
+                'rank': rng.random(),
+                'has_video': rng.random() < video_ratio,
+            })
+        self.by_cid = {item['cid']: item for item in self.items}
+
+    def search(self, params):
+        """ItemListの検索条件で絞り込み・並び替え"""
+        items = self.items
+
+        cid = params.get('cid')
+        if cid:
+            items = [item for item in items if item['cid'] == cid]
+
+        index = 0
+        while f'article[{index}]' in params:
+            article = params[f'article[{index}]']
+            article_id = int(params.get(f'article_id[{index}]', 0))
+            key = 'genres' if article == 'genre' else 'actresses' if article == 'actress' else None
+            if key:
+                items = [item for item in items if article_id in item[key]]
+            index += 1
+
+        gte = params.get('gte_date', '').replace('T', ' ')
+        lte = params.get('lte_date', '').replace('T', ' ')
+        if gte:
+            items = [item for item in items if item['date'] >= gte]
+        if lte:
+            items = [item for item in items if item['date'] <= lte]
+
+        sort = params.get('sort', 'rank')
+        if sort == 'rank':
+            items = sorted(items, key=lambda item: item['rank'])
+        elif sort == '+price':
+            items = sorted(items, key=lambda item: item['price'])
+        elif sort == '-price':
+            items = sorted(items, key=lambda item: -item['price'])
+        return items
+
+
+class DMMStubServer:
+    """スタブサーバー本体（別スレッドで起動する）"""
+
+    def __init__(self, catalog_size=1000, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 page_kb=0, seed=42, host='127.0.0.1', port=0):
+        """
+        Args:
+            catalog_size (int): カタログの商品数
+            latency (float): 応答までの平均遅延（秒、±50%のばらつきを加える）
+            error_rate (float): 503を返す確率
+            throttle_rate (float): 429を返す確率
+            page_kb (int): 商品ページに加える埋め草のサイズ（KB）
+            seed (int): カタログと障害発生の乱数シード
+            host (str): 待ち受けるアドレス
+            port (int): 待ち受けるポート（0で空きポート）
+        """
+        self.catalog = StubCatalog(catalog_size, seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.page_kb = page_kb
+        self.rng = random.Random(seed)
+        self.counts = {'api': 0, 'page': 0, 'video': 0, 'errors': 0, 'throttled': 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}{API_PATH}'
+
+    def start(self):
+        """バックグラウンドスレッドで待ち受けを開始"""
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+        self._thread.start()
+        logger.info(f"DMM stub server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        """待ち受けを停止"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def _fault(self):
+        """遅延を入れ、障害を発生させる場合はステータスコードを返す"""
+        with self._lock:
+            roll = self.rng.random()
+            delay = self.latency * self.rng.uniform(0.5, 1.5) if self.latency else 0
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            self._count('errors')
+            return 503
+        if roll < self.error_rate + self.throttle_rate:
+            self._count('throttled')
+            return 429
+        return None
+
+    def build_item(self, entry):
+        """カタログのエントリをItemList形式のアイテムに変換"""
+        cid = entry['cid']
+        page_url = f'{self.base_url}/digital/videoa/-/detail/=/cid={cid}/'
+        item = {
+            'service_code': 'digital',
+            'floor_code': 'videoa',
+            'content_id': cid,
+            'product_id': cid,
+            'title': f'スタブ商品 {cid}',
+            'URL': page_url,
+            'affiliateURL': page_url,
+            'date': entry['date'],
+            'imageURL': {
+                'list': f'https://pics.dmm.co.jp/digital/video/{cid}/{cid}pt.jpg',
+                'small': f'https://pics.dmm.co.jp/digital/video/{cid}/{cid}ps.jpg',
+                'large': f'https://pics.dmm.co.jp/digital/video/{cid}/{cid}pl.jpg',
+            },
+            'sampleImageURL': {
+                'sample_l': {'image': [
+                    f'https://pics.dmm.co.jp/digital/video/{cid}/{cid}jp-{n}.jpg' for n in range(1, 6)
+                ]},
+            },
+            'prices': {'price': str(entry['price'])},
+            'iteminfo': {
+                'genre': [{'id': genre_id, 'name': f'ジャンル{genre_id}'} for genre_id in entry['genres']],
+                'actress': [{'id': actress_id, 'name': f'女優{actress_id}'} for actress_id in entry['actresses']],
+                'maker': [{'id': entry['maker'], 'name': f'メーカー{entry["maker"]}'}],
+            },
+        }
+        if entry['has_video']:
+            item['sampleMovieURL'] = {
+                size: f'https://www.dmm.co.jp/litevideo/-/part/=/cid={cid}/size={size[5:]}/affi_id=stub-990/'
+                for size in ('size_720_480', 'size_644_414', 'size_560_360', 'size_476_306')
+            }
+        return item
+
+    def item_list(self, params):
+        """ItemList APIのレスポンスを生成"""
+        matched = self.catalog.search(params)
+        hits = max(1, min(MAX_HITS, int(params.get('hits', 20))))
+        offset = max(1, int(params.get('offset', 1)))
+        page = matched[offset - 1:offset - 1 + hits]
+        return {
+            'request': {'parameters': params},
+            'result': {
+                'status': 200,
+                'result_count': len(page),
+                'total_count': len(matched),
+                'first_position': offset,
+                'items': [self.build_item(entry) for entry in page],
+            },
+        }
+
+    def product_page(self, entry):
+        """JSON-LDを含む商品ページのHTMLを生成"""
+        cid = entry['cid']
+        jsonld = {'@context': 'http://schema.org', '@type': 'Product', 'name': f'スタブ商品 {cid}'}
+        if entry['has_video']:
+            jsonld['subjectOf'] = {
+                '@type': 'VideoObject',
+                'contentUrl': f'https://cc3001.dmm.co.jp/litevideo/freepv/{cid[0]}/{cid[:3]}/{cid}/{cid}_mhb_w.mp4',
+            }
+        filler = ''.join(
+            f'<div class="item"><a href="/digital/videoa/-/detail/=/cid=x{n}/">関連作品{n}</a></div>'
+            for n in range(self.page_kb * 1024 // 70)
+        )
+        return (
+            f'<!DOCTYPE html><html><head><title>{cid}</title>'
+            f'<script type="application/ld+json">{json.dumps(jsonld, ensure_ascii=False)}</script>'
+            f'</head><body><h1>スタブ商品 {cid}</h1>{filler}</body></html>'
+        ).encode('utf-8')
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status, body=b'', content_type='text/plain; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _dispatch(self):
+                parsed = urlparse(self.path)
+                status = server._fault()
+                if status:
+                    return self._send(status, b'unavailable')
+
+                if parsed.path == API_PATH:
+                    server._count('api')
+                    params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                    body = json.dumps(server.item_list(params), ensure_ascii=False).encode('utf-8')
+                    return self._send(200, body, 'application/json; charset=utf-8')
+
+                match = PAGE_RE.match(parsed.path)
+                if match and match.group(1) in server.catalog.by_cid:
+                    server._count('page')
+                    body = server.product_page(server.catalog.by_cid[match.group(1)])
+                    return self._send(200, body, 'text/html; charset=utf-8')
+
+                match = LITEVIDEO_RE.match(parsed.path)
+                if match:
+                    server._count('video')
+                    entry = server.catalog.by_cid.get(match.group(1))
+                    if entry and entry['has_video']:
+                        return self._send(200, b'\x00' * 16, 'video/mp4')
+
+                return self._send(404, b'<html><body>not found</body></html>', 'text/html; charset=utf-8')
+
+            def do_GET(self):
+                self._dispatch()
+
+            def do_HEAD(self):
+                self._dispatch()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--items', type=int, default=5000, help='カタログの商品数')
+    parser.add_argument('--latency', type=float, default=0, help='平均遅延（ミリ秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='503を返す確率')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='429を返す確率')
+    parser.add_argument('--page-kb', type=int, default=150, help='商品ページの埋め草サイズ（KB）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = DMMStubServer(
+        catalog_size=args.items, latency=args.latency / 1000, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, page_kb=args.page_kb, seed=args.seed,
+        host=args.host, port=args.port
+    )
+    print(f"API:  {server.api_url}")
+    print(f"Page: {server.base_url}/digital/videoa/-/detail/=/cid=stub00000/")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"requests: {server.counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+DMMのジャンル・女優IDカタログを管理するサービスモジュール
+
+GenreSearch・ActressSearch APIの結果をDBに保存し、メモリ上の索引から
+名前→IDの解決と前方一致の候補表示を行う（検索条件の作成時にAPIを呼ばない）。
+"""
+import re
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+from datetime import datetime
+from urllib.parse import urlencode
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from dmm_x_poster.config import JST
+from dmm_x_poster.db.models import db, CatalogEntry
+from dmm_x_poster.services.dmm_api import dmm_api_service
+
+logger = logging.getLogger(__name__)
+
+# カタログの種類とAPIの対応（エンドポイント, 結果のキー, IDのキー, 1ページの件数）
+CATALOG_APIS = {
+    'genre': ('GenreSearch', 'genre', 'genre_id', 500),
+    'actress': ('ActressSearch', 'actress', 'id', 100),
+}
+# カタログの種類
+CATALOG_KINDS = tuple(CATALOG_APIS)
+# 入力欄の区切り文字
+TERM_SPLIT_RE = re.compile(r'[,、，]')
+# カタカナをひらがなに変換する表（読み仮名での検索用）
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def normalize_name(text):
+    """名前を照合用に正規化（全角半角・大文字小文字・カタカナひらがなの違いを無視）"""
+    text = unicodedata.normalize('NFKC', text or '').strip().lower()
+    return text.translate(KATAKANA_TO_HIRAGANA)
+
+
+class CatalogIndex:
+    """ジャンル・女優の名前とIDのメモリ上の索引（構築後は変更しない）"""
+
+    def __init__(self, entries=()):
+        """
+        Args:
+            entries (iterable): (種類, ID, 名前, 読み仮名)のタプル
+        """
+        self._by_id = {}
+        self._by_name = {}
+        keys = {kind: [] for kind in CATALOG_KINDS}
+        for kind, dmm_id, name, ruby in entries:
+            self._by_id[(kind, dmm_id)] = {'id': dmm_id, 'name': name, 'ruby': ruby}
+            for key in {normalize_name(name), normalize_name(ruby)}:
+                if key:
+                    self._by_name.setdefault((kind, key), dmm_id)
+                    keys.setdefault(kind, []).append((key, dmm_id))
+        self._keys = {kind: sorted(set(pairs)) for kind, pairs in keys.items()}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def count(self, kind):
+        """種類ごとの件数を取得"""
+        return sum(1 for entry_kind, _ in self._by_id if entry_kind == kind)
+
+    def get(self, kind, dmm_id):
+        """IDに対応するエントリを取得"""
+        return self._by_id.get((kind, str(dmm_id)))
+
+    def resolve(self, kind, name):
+        """名前（または読み仮名）に完全一致するIDを取得"""
+        return self._by_name.get((kind, normalize_name(name)))
+
+    def suggest(self, kind, prefix, limit=10):
+        """名前（または読み仮名）が前方一致するエントリを取得"""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        keys = self._keys.get(kind, [])
+        results = []
+        seen = set()
+        for key, dmm_id in keys[bisect.bisect_left(keys, (prefix,)):]:
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            if dmm_id not in seen:
+                seen.add(dmm_id)
+                results.append(self._by_id[(kind, dmm_id)])
+        return results
+
+
+class CatalogService:
+    """ジャンル・女優IDカタログのサービスクラス"""
+
+    JOB_ID = 'refresh_catalog'
+
+    def __init__(self, app=None):
+        self.floor_id = 43
+        self.actress_max_pages = 100
+        self.reload_interval = 300
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """アプリケーションコンテキストから設定を初期化"""
+        self.floor_id = app.config.get('DMM_CATALOG_FLOOR_ID', 43)
+        self.actress_max_pages = app.config.get('DMM_CATALOG_ACTRESS_MAX_PAGES', 100)
+        self.reload_interval = app.config.get('DMM_CATALOG_RELOAD_INTERVAL', 300)
+        self._index = None
+
+    @property
+    def index(self):
+        """メモリ上の索引を取得（未読み込みか古くなっていればDBから読み込む）"""
+        index = self._index
+        if index is None or time.monotonic() - self._loaded_at > self.reload_interval:
+            index = self.load()
+        return index
+
+    def load(self):
+        """DBのカタログから索引を構築して差し替え"""
+        rows = db.session.query(
+            CatalogEntry.kind, CatalogEntry.dmm_id, CatalogEntry.name, CatalogEntry.ruby
+        ).all()
+        index = CatalogIndex(rows)
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+        logger.debug(f"Loaded catalog index with {len(index)} entries")
+        return index
+
+    def fetch_entries(self, kind, max_pages=None):
+        """APIからカタログの全エントリを取得
+
+        Returns:
+            list: エントリのリスト（失敗時はNone）
+        """
+        endpoint, result_key, id_key, hits = CATALOG_APIS[kind]
+        params = {
+            'api_id': dmm_api_service.api_id,
+            'affiliate_id': dmm_api_service.affiliate_id,
+            'hits': hits,
+            'output': 'json',
+        }
+        if kind == 'genre':
+            params['floor_id'] = self.floor_id
+
+        entries = []
+        offset = 1
+        pages = 0
+        while max_pages is None or pages < max_pages:
+            url = f"{dmm_api_service.endpoint_url(endpoint)}?{urlencode(dict(params, offset=offset))}"
+            data, error = dmm_api_service.request_json(url)
+            result = data.get('result') if isinstance(data, dict) else None
+            if error or not isinstance(result, dict):
+                logger.error(f"Failed to fetch {kind} catalog at offset {offset}: {error or 'invalid_response'}")
+                return None
+
+            page = result.get(result_key) or []
+            for row in page:
+                if row.get(id_key) and row.get('name'):
+                    entries.append({
+                        'dmm_id': str(row[id_key]),
+                        'name': row['name'],
+                        'ruby': row.get('ruby'),
+                    })
+            pages += 1
+            offset += len(page)
+            if not page or offset > int(result.get('total_count') or 0):
+                break
+        return entries
+
+    def save_entries(self, kind, entries):
+        """エントリをDBに保存（既存のIDは名前と読み仮名を更新）"""
+        if not entries:
+            return 0
+        now = datetime.now(JST)
+        rows = [dict(entry, kind=kind, updated_at=now) for entry in entries]
+        rows = list({row['dmm_id']: row for row in rows}.values())
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            stmt = dialect_insert(CatalogEntry)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['kind', 'dmm_id'],
+                set_={'name': stmt.excluded.name, 'ruby': stmt.excluded.ruby,
+                      'updated_at': stmt.excluded.updated_at}
+            )
+            db.session.execute(stmt, rows)
+        else:
+            existing = {entry.dmm_id: entry for entry in CatalogEntry.query.filter_by(kind=kind)}
+            new_rows = []
+            for row in rows:
+                entry = existing.get(row['dmm_id'])
+                if entry is None:
+                    new_rows.append(row)
+                else:
+                    entry.name, entry.ruby, entry.updated_at = row['name'], row['ruby'], now
+            if new_rows:
+                db.session.execute(insert(CatalogEntry), new_rows)
+        db.session.commit()
+        return len(rows)
+
+    def refresh(self, kinds=CATALOG_KINDS):
+        """APIからカタログを取得してDBと索引を更新
+
+        取得に失敗した種類は既存のカタログをそのまま使う。
+
+        Returns:
+            dict: 種類ごとの保存件数（失敗した種類はNone）
+        """
+        counts = {}
+        for kind in kinds:
+            max_pages = self.actress_max_pages if kind == 'actress' else None
+            entries = self.fetch_entries(kind, max_pages=max_pages)
+            counts[kind] = None if entries is None else self.save_entries(kind, entries)
+            logger.info(f"Refreshed {kind} catalog: {counts[kind]} entries")
+        self.load()
+        return counts
+
+    def count(self, kind):
+        """種類ごとの件数を取得"""
+        return self.index.count(kind)
+
+    def is_empty(self):
+        """DBにカタログが1件もないかどうか（初回起動時など）"""
+        return db.session.query(CatalogEntry.id).first() is None
+
+    def suggest(self, kind, prefix, limit=10):
+        """名前の入力候補を取得"""
+        return self.index.suggest(kind, prefix, limit)
+
+    def resolve_terms(self, kind, text):
+        """カンマ区切りの名前・IDをIDのリストに変換
+
+        数字だけの項目はIDとしてそのまま使う。
+
+        Returns:
+            tuple: (IDのリスト, 解決できなかった名前のリスト)
+        """
+        ids = []
+        unknown = []
+        index = None
+        for term in TERM_SPLIT_RE.split(text or ''):
+            term = unicodedata.normalize('NFKC', term).strip()
+            if not term:
+                continue
+            if term.isdigit():
+                ids.append(term)
+                continue
+            if index is None:
+                index = self.index
+            dmm_id = index.resolve(kind, term)
+            if dmm_id:
+                ids.append(dmm_id)
+            else:
+                unknown.append(term)
+        return list(dict.fromkeys(ids)), unknown
+
+    def names_for(self, kind, ids):
+        """IDのリストを名前（カタログにないものはID）のリストに変換"""
+        index = self.index
+        names = []
+        for dmm_id in ids:
+            entry = index.get(kind, dmm_id)
+            names.append(entry['name'] if entry else str(dmm_id))
+        return names
+
+
+# アプリケーションファクトリで初期化するためのインスタンス
+catalog_service = CatalogService()
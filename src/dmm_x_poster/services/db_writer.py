@@ -0,0 +1,149 @@
+"""
+DBへの書き込みを1つのスレッドで順に実行するモジュール
+
+SQLiteは同時に1つの接続しか書き込めないため、スケジューラのスレッドなどが
+それぞれ書き込むとロック待ちが発生する。有効にした場合は書き込み処理を
+待ち行列に入れ、専用のスレッドが1件ずつ短いトランザクションで実行する。
+無効の場合は呼び出し元のスレッドでそのまま実行してコミットする。
+"""
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from dmm_x_poster.db.models import db
+
+logger = logging.getLogger(__name__)
+
+# ワーカースレッドに終了を伝える目印
+_STOP = object()
+
+
+class DBWriter:
+    """書き込み処理を1つのスレッドに集めて順に実行するサービスクラス
+
+    依頼する処理はdb.sessionで書き込みを行い、コミットはしない（実行後にまとめてコミットする）。
+    処理は別スレッドの別セッションで実行されるため、ORMオブジェクトではなく
+    IDや行データを引数に渡す。
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.queue_size = 1000
+        self.timeout = 120
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'jobs': 0, 'failed': 0, 'busy_seconds': 0.0, 'max_wait_seconds': 0.0}
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """アプリケーションコンテキストから設定を初期化"""
+        self.close()
+        self.app = app
+        self.enabled = app.config.get('DB_SINGLE_WRITER', False)
+        self.queue_size = app.config.get('DB_WRITER_QUEUE_SIZE', 1000)
+        self.timeout = app.config.get('DB_WRITER_TIMEOUT', 120)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _record(self, elapsed, waited, failed):
+        with self._stats_lock:
+            self.stats['jobs'] += 1
+            self.stats['failed'] += int(failed)
+            self.stats['busy_seconds'] += elapsed
+            self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], waited)
+
+    def _execute(self, func, args, kwargs):
+        """処理を実行してコミット（失敗した場合はロールバックして例外を送出）"""
+        try:
+            result = func(*args, **kwargs)
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _loop(self):
+        work = self._queue
+        while True:
+            job = work.get()
+            if job is _STOP:
+                return
+            future, func, args, kwargs, queued_at = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                # 処理ごとにアプリケーションコンテキスト（＝セッション）を作り直す
+                with self.app.app_context():
+                    result = self._execute(func, args, kwargs)
+            except Exception as e:
+                logger.error(f"DB writer job {getattr(func, '__name__', func)} failed: {e}")
+                self._record(time.perf_counter() - started, started - queued_at, True)
+                future.set_exception(e)
+            else:
+                self._record(time.perf_counter() - started, started - queued_at, False)
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        """書き込み処理を依頼
+
+        Returns:
+            Future: 処理の戻り値（無効の場合は実行済み）
+        """
+        if not self.enabled or threading.current_thread() is self._thread:
+            # 無効の場合と、書き込みスレッド内からの依頼はその場で実行する
+            future = Future()
+            started = time.perf_counter()
+            try:
+                future.set_result(self._execute(func, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            self._record(time.perf_counter() - started, 0.0, future.exception() is not None)
+            return future
+
+        future = Future()
+        self._ensure_thread().put((future, func, args, kwargs, time.perf_counter()))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """書き込み処理を依頼して完了を待つ
+
+        Returns:
+            処理の戻り値（処理の例外はそのまま送出）
+        """
+        return self.submit(func, *args, **kwargs).result(timeout=self.timeout)
+
+    def report(self):
+        """処理件数と待ち行列の深さを取得"""
+        with self._stats_lock:
+            report = dict(self.stats)
+        report['busy_seconds'] = round(report['busy_seconds'], 3)
+        report['max_wait_seconds'] = round(report['max_wait_seconds'], 3)
+        report['enabled'] = self.enabled
+        report['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        return report
+
+    def close(self):
+        """待ち行列の処理を終えてからスレッドを終了"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            work = self._queue
+        if thread is not None and thread.is_alive():
+            work.put(_STOP)
+            thread.join(timeout=self.timeout)
+
+
+# アプリケーションファクトリで初期化するためのインスタンス
+db_writer = DBWriter()
@@ -1,18 +1,109 @@
 """
 DMM APIと連携するサービスモジュール
 """
+import re
 import json
+import time
+import hashlib
+import threading
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from dmm_x_poster.config import JST
-from dmm_x_poster.db.models import db, Product, Image
+from dmm_x_poster.db.models import (
+    db, Product, Image, Setting, SavedSearch, VideoEnrichmentTask, TAG_COLUMNS, sync_product_tags
+)
+from dmm_x_poster.services.http_client import HTTPClient
+from dmm_x_poster.services.rate_limiter import rate_limiter
+from dmm_x_poster.services.ttl_cache import TTLCache
+from dmm_x_poster.services.resilience import CircuitBreaker, backoff_delay, RETRY_STATUS
+from dmm_x_poster.services.http_cache import HTTPCache, CachedPage
+from dmm_x_poster.services.ingest_pipeline import IngestPipeline, paginate
+from dmm_x_poster.services.parse_pool import ParsePool
+from dmm_x_poster.services.video_extractor import (
+    is_age_verification_page, scan_stream, to_dm_w_url, video_url_candidates,
+    LITEVIDEO_BASE_URL, STREAM_CHUNK_SIZE
+)
 
 logger = logging.getLogger(__name__)
 
+# クロール時の1ページあたり件数（APIの上限）
+CRAWL_HITS = 100
+# APIが受け付けるoffsetの上限
+MAX_CRAWL_OFFSET = 50000
+# クロールカーソルを保存する設定キーの接頭辞
+CRAWL_CURSOR_PREFIX = 'crawl_cursor:'
+# 差分取得のウォーターマークを保存する設定キーの接頭辞
+WATERMARK_PREFIX = 'watermark:'
+# INクエリ1回あたりのパラメータ数（SQLiteの変数上限対策）
+IN_CLAUSE_CHUNK = 500
+# 商品ページURLなどからcontent_idを取り出すパターン
+CONTENT_ID_RE = re.compile(r'cid=([0-9a-z_]+)')
+# 更新モードで差分を比較する商品テーブルの列
+REFRESH_COLUMNS = ('title', 'actresses', 'url', 'package_image_url', 'maker', 'genres', 'release_date')
+
+
+def parse_content_ids(text):
+    """カンマ・空白・改行区切りのcontent_id（商品ページURLも可）をリストに変換"""
+    content_ids = []
+    for token in re.split(r'[\s,、]+', (text or '').lower()):
+        if not token:
+            continue
+        match = CONTENT_ID_RE.search(token)
+        content_ids.append(match.group(1) if match else token)
+    return list(dict.fromkeys(content_ids))
+
+
+class DMMAPIError(Exception):
+    """DMM APIからの取得に失敗したことを表す例外"""
+
+
+class VideoExtractionError(Exception):
+    """商品ページを取得・解析できず、動画URLの有無を判定できなかったことを表す例外"""
+
+
+class RetryableStatus(Exception):
+    """再試行対象のステータスコードが返されたことを表す例外"""
+    
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class SearchResult:
+    """検索APIの結果（0件と失敗を区別する）"""
+    
+    def __init__(self, items=None, total_count=0, error=None, raw=None):
+        """
+        Args:
+            items (list): アイテムリスト
+            total_count (int): 検索条件に一致する総件数
+            error (str): 失敗時の理由（'circuit_open', 'unavailable', 'request_failed', 'invalid_response'）
+            raw (dict): APIレスポンスのresult部分
+        """
+        self.items = items or []
+        self.total_count = int(total_count or 0)
+        self.error = error
+        self.raw = raw
+    
+    @property
+    def ok(self):
+        """取得に成功したかどうか（0件でも成功ならTrue）"""
+        return self.error is None
+    
+    def __repr__(self):
+        if self.error:
+            return f"<SearchResult error={self.error}>"
+        return f"<SearchResult {len(self.items)}/{self.total_count} items>"
+
+
 class DMMAPIService:
     """DMM APIと連携するサービスクラス"""
     
@@ -21,6 +112,30 @@ class DMMAPIService:
     def __init__(self, app=None):
         self.api_id = None
         self.affiliate_id = None
+        self.base_url = self.BASE_URL
+        self.litevideo_base_url = LITEVIDEO_BASE_URL
+        self.http = HTTPClient()
+        self.cache = None
+        self.parse_pool = ParsePool()
+        self.stream_pages = False
+        self.stream_byte_budget = 1024 * 1024
+        self.page_stats = {'pages': 0, 'bytes': 0, 'matched_early': 0, 'budget_exceeded': 0}
+        self._page_stats_lock = threading.Lock()
+        self.search_cache = TTLCache()
+        self.breaker = CircuitBreaker('dmm_api')
+        self.api_retries = 3
+        self.api_backoff_base = 0.5
+        self.api_backoff_max = 8.0
+        self.scrape_workers = 8
+        self.scrape_per_host = 4
+        self.ingest_chunk_size = 500
+        self.ingest_queue_size = 4
+        self.last_ingest_report = None
+        self.defer_video_extraction = False
+        self.probe_video_urls = False
+        self.search_workers = 4
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
         if app:
             self.init_app(app)
     
@@ -28,6 +143,59 @@ class DMMAPIService:
         """アプリケーションコンテキストからAPI設定を初期化"""
         self.api_id = app.config.get('DMM_API_ID')
         self.affiliate_id = app.config.get('DMM_AFFILIATE_ID')
+        
+        # 接続先（負荷試験ではdevtools.dmm_stubを指定する）
+        self.base_url = app.config.get('DMM_API_BASE_URL') or self.BASE_URL
+        self.litevideo_base_url = app.config.get('DMM_LITEVIDEO_BASE_URL') or LITEVIDEO_BASE_URL
+        
+        # ホストごとのコネクションプールを再構築
+        self.http.close()
+        self.http = HTTPClient.from_config(app.config, limiter=rate_limiter)
+        
+        # 商品ページの永続キャッシュ
+        self.cache = HTTPCache.from_config(app)
+        
+        # 商品ページを分割して読み、JSON-LDの動画URLが見つかった時点で接続を閉じる
+        self.stream_pages = app.config.get('DMM_STREAM_PAGES', False)
+        self.stream_byte_budget = app.config.get('DMM_STREAM_BYTE_BUDGET', 1024 * 1024)
+        
+        # 商品ページの解析を行うプロセスプール（無効時は呼び出し元スレッドで解析）
+        self.parse_pool.close()
+        self.parse_pool = ParsePool.from_config(app.config)
+        
+        # 検索結果のメモ化
+        self.search_cache = TTLCache(
+            maxsize=app.config.get('DMM_SEARCH_CACHE_SIZE', 256),
+            ttl=app.config.get('DMM_SEARCH_CACHE_TTL', 300)
+        )
+        
+        # API呼び出しのリトライとサーキットブレーカー
+        self.api_retries = app.config.get('DMM_API_RETRIES', 3)
+        self.api_backoff_base = app.config.get('DMM_API_BACKOFF_BASE', 0.5)
+        self.api_backoff_max = app.config.get('DMM_API_BACKOFF_MAX', 8.0)
+        self.breaker = CircuitBreaker(
+            'dmm_api',
+            failure_threshold=app.config.get('DMM_API_BREAKER_THRESHOLD', 5),
+            reset_timeout=app.config.get('DMM_API_BREAKER_RESET', 60)
+        )
+        
+        # 動画URL抽出の並列度
+        self.scrape_workers = app.config.get('DMM_SCRAPE_WORKERS', 8)
+        self.scrape_per_host = app.config.get('DMM_SCRAPE_PER_HOST', 4)
+        self._host_semaphores = {}
+        
+        # 保存済み検索を並列に実行する数
+        self.search_workers = app.config.get('DMM_SEARCH_WORKERS', 4)
+        
+        # 一括保存時のコミット単位と、取り込みパイプラインの段の間に溜めるページ数
+        self.ingest_chunk_size = app.config.get('DMM_INGEST_CHUNK_SIZE', 500)
+        self.ingest_queue_size = app.config.get('DMM_INGEST_QUEUE_SIZE', 4)
+        
+        # 動画URLの抽出を保存後のバックグラウンド処理に回すかどうか
+        self.defer_video_extraction = app.config.get('DMM_DEFER_VIDEO_EXTRACTION', False)
+        
+        # 動画URLをcontent_idから導出してHEADで確認する（商品ページの取得を省略）
+        self.probe_video_urls = app.config.get('DMM_PROBE_VIDEO_URLS', False)
     
     def get_params(self, **kwargs):
         """APIリクエストパラメータを生成"""
@@ -43,17 +211,17 @@ class DMMAPIService:
         params.update(kwargs)
         return params
     
-    def search_items(self, floor='videoa', sort='date', offset=1, **kwargs):
-        """商品検索を実行
+    def build_search_params(self, floor='videoa', sort='date', offset=1, **kwargs):
+        """検索条件からAPIリクエストパラメータを組み立てる
         
         Args:
             floor (str): 検索対象のフロア（'videoa', 'videoc'など）
             sort (str): 並び順（'date'=新着順, 'rank'=人気順, '+price'=価格が安い順, '-price'=価格が高い順）
-            offset (int): 検索結果の開始位置（1〜1000）
+            offset (int): 検索結果の開始位置
             **kwargs: その他の検索オプション
         
         Returns:
-            list: 検索結果のアイテムリスト
+            dict: APIリクエストパラメータ
         """
         # 基本パラメータ
         params = self.get_params(floor=floor, sort=sort, offset=offset)
@@ -85,57 +253,555 @@ class DMMAPIService:
             if key not in ['article_genre', 'article_actress']:
                 params[key] = value
         
-        url = f"{self.BASE_URL}?{urlencode(params)}"
+        return params
+    
+    def request_json(self, url):
+        """DMM APIのURLを呼び出してJSONを取得（リトライ・サーキットブレーカー付き）
+        
+        Returns:
+            tuple: (レスポンスのJSON, 失敗時の理由)
+        """
+        if not self.breaker.allow():
+            logger.warning(f"DMM API circuit is open, skipping request: {url}")
+            return None, 'circuit_open'
+        
         logger.info(f"DMM API request URL: {url}")
+        # half_openの試行を必ず終えるため、どの経路で抜けても成功か失敗を記録する
+        settled = False
+        try:
+            for attempt in range(self.api_retries + 1):
+                try:
+                    response = self.http.get(url)
+                    if response.status_code in RETRY_STATUS:
+                        raise RetryableStatus(response)
+                    response.raise_for_status()
+                    data = response.json()
+                except (requests.Timeout, requests.ConnectionError, RetryableStatus) as e:
+                    if attempt < self.api_retries:
+                        delay = backoff_delay(attempt, self.api_backoff_base, self.api_backoff_max)
+                        logger.warning(f"API request failed ({e}), retrying in {delay:.2f}s "
+                                       f"({attempt + 1}/{self.api_retries})")
+                        time.sleep(delay)
+                        continue
+                    logger.error(f"API request failed after {attempt + 1} attempts: {e}")
+                    self.breaker.record_failure()
+                    settled = True
+                    return None, 'unavailable'
+                except requests.HTTPError as e:
+                    # 4xxはリクエスト側の問題なので再試行しない（APIは応答しているためブレーカーには成功として記録）
+                    logger.error(f"API request failed: {e}")
+                    if response.status_code < 500:
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                    settled = True
+                    return None, 'request_failed'
+                except requests.JSONDecodeError as e:
+                    # RequestExceptionのサブクラスでもあるため先に捕捉する
+                    logger.error(f"Failed to parse API response: {e}")
+                    self.breaker.record_failure()
+                    settled = True
+                    return None, 'invalid_response'
+                except requests.RequestException as e:
+                    logger.error(f"API request failed: {e}")
+                    self.breaker.record_failure()
+                    settled = True
+                    return None, 'request_failed'
+                except ValueError as e:
+                    logger.error(f"Failed to parse API response: {e}")
+                    self.breaker.record_failure()
+                    settled = True
+                    return None, 'invalid_response'
+                break
+            
+            self.breaker.record_success()
+            settled = True
+            return data, None
+        finally:
+            if not settled:
+                # 想定外の例外は失敗として記録する
+                self.breaker.record_failure()
+    
+    def endpoint_url(self, name):
+        """ItemListと同じ階層にある他のAPI（GenreSearchなど）のURLを取得"""
+        return f"{self.base_url.rsplit('/', 1)[0]}/{name}"
+    
+    def fetch_result(self, params):
+        """APIを呼び出して検索結果を取得（リトライ・サーキットブレーカー付き）
+        
+        タイムアウト・接続エラー・429/5xxはジッター付き指数バックオフで再試行し、
+        再試行しても失敗した場合はサーキットブレーカーに失敗を記録する。
+        ブレーカーが開いている間はAPIを呼び出さずに失敗を返す。
         
+        Args:
+            params (dict): build_search_paramsで生成したパラメータ
+        
+        Returns:
+            SearchResult: 検索結果（失敗時はerrorに理由が入る）
+        """
+        url = f"{self.base_url}?{urlencode(params)}"
+        data, error = self.request_json(url)
+        if error:
+            return SearchResult(error=error)
+        
+        # レスポンスのフォーマットチェック
+        if not isinstance(data, dict) or 'result' not in data or 'items' not in data['result']:
+            logger.error(f"Unexpected API response format: {data}")
+            return SearchResult(error='invalid_response')
+        
+        # 結果件数をログに記録
+        item_count = len(data['result']['items'])
+        total_count = data['result'].get('total_count', 0)
+        result_count = data['result'].get('result_count', 0)
+        first_position = data['result'].get('first_position', params.get('offset'))
+        
+        logger.info(f"API returned {item_count} items (total: {total_count}, result: {result_count}, position: {first_position})")
+        
+        # アイテム情報のデバッグログ
+        for idx, item in enumerate(data['result']['items']):
+            has_movie = 'sampleMovieURL' in item
+            logger.debug(f"商品 #{idx+1} ({item.get('content_id', 'unknown')}): " +
+                        f"動画情報あり={has_movie}")
+            
+            # アフィリエイトURL情報をログに記録
+            logger.debug(f"  URL: {item.get('URL', 'N/A')}")
+            logger.debug(f"  AffiliateURL: {item.get('affiliateURL', 'N/A')}")
+            
+            if has_movie:
+                available_sizes = []
+                movie_sizes = ['size_720_480', 'size_644_414', 'size_560_360', 'size_476_306']
+                for size in movie_sizes:
+                    if size in item['sampleMovieURL'] and item['sampleMovieURL'][size]:
+                        available_sizes.append(size)
+                
+                logger.debug(f"  利用可能な動画サイズ: {', '.join(available_sizes) if available_sizes else 'なし'}")
+        
+        return SearchResult(data['result']['items'], total_count, raw=data['result'])
+    
+    def fetch_page(self, params):
+        """APIを1回呼び出して検索結果を取得
+        
+        Args:
+            params (dict): build_search_paramsで生成したパラメータ
+        
+        Returns:
+            dict: APIレスポンスのresult部分（失敗時はNone）
+        """
+        result = self.fetch_result(params)
+        return result.raw if result.ok else None
+    
+    def search(self, floor='videoa', sort='date', offset=1, force_refresh=False, **kwargs):
+        """商品検索を実行し、失敗と0件を区別できる結果を返す
+        
+        同じ条件の検索結果は一定時間メモ化され、APIを呼び出さずに返す。
+        
+        Args:
+            floor (str): 検索対象のフロア（'videoa', 'videoc'など）
+            sort (str): 並び順（'date'=新着順, 'rank'=人気順, '+price'=価格が安い順, '-price'=価格が高い順）
+            offset (int): 検索結果の開始位置（1〜50000）
+            force_refresh (bool): メモ化された結果を使わずAPIを呼び出すかどうか
+            **kwargs: その他の検索オプション
+        
+        Returns:
+            SearchResult: 検索結果
+        """
+        params = self.build_search_params(floor=floor, sort=sort, offset=offset, **kwargs)
+        key = self.request_hash(params)
+        
+        if not force_refresh:
+            cached = self.search_cache.get(key)
+            if cached is not None:
+                logger.info(f"Search cache hit: {key} ({len(cached.items)} items)")
+                return SearchResult(list(cached.items), cached.total_count, raw=cached.raw)
+        
+        result = self.fetch_result(params)
+        if result.ok:
+            self.search_cache.set(key, result)
+            return SearchResult(list(result.items), result.total_count, raw=result.raw)
+        return result
+    
+    def search_items(self, floor='videoa', sort='date', offset=1, force_refresh=False, **kwargs):
+        """商品検索を実行
+        
+        Args:
+            floor (str): 検索対象のフロア（'videoa', 'videoc'など）
+            sort (str): 並び順（'date'=新着順, 'rank'=人気順, '+price'=価格が安い順, '-price'=価格が高い順）
+            offset (int): 検索結果の開始位置（1〜50000）
+            force_refresh (bool): メモ化された結果を使わずAPIを呼び出すかどうか
+            **kwargs: その他の検索オプション
+        
+        Returns:
+            list: 検索結果のアイテムリスト（失敗時も空リスト。区別が必要な場合はsearchを使う）
+        """
+        return self.search(floor=floor, sort=sort, offset=offset, force_refresh=force_refresh, **kwargs).items
+    
+    def request_hash(self, params):
+        """APIリクエスト全体（位置・件数を含む）を表す正規化済みハッシュを生成"""
+        canonical = {
+            key: value for key, value in params.items()
+            if key not in ('api_id', 'affiliate_id')
+        }
+        payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def query_hash(self, params):
+        """検索条件を表す正規化済みハッシュを生成（認証情報・位置・件数は除外）"""
+        canonical = {
+            key: value for key, value in params.items()
+            if key not in ('api_id', 'affiliate_id', 'offset', 'hits')
+        }
+        payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+    
+    def load_crawl_cursor(self, query_hash):
+        """保存済みのクロールカーソルを取得"""
+        value = Setting.get(f'{CRAWL_CURSOR_PREFIX}{query_hash}')
+        if not value:
+            return None
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
+            return json.loads(value)
+        except ValueError:
+            logger.warning(f"Discarding unreadable crawl cursor: {query_hash}")
+            return None
+    
+    def save_crawl_cursor(self, query_hash, offset, last_date=None, total_count=None):
+        """クロールカーソルを保存（次回はoffsetから再開）"""
+        cursor = {
+            'query_hash': query_hash,
+            'offset': offset,
+            'last_date': last_date,
+            'total_count': total_count,
+            'updated_at': datetime.now(JST).isoformat(),
+        }
+        Setting.set(
+            f'{CRAWL_CURSOR_PREFIX}{query_hash}',
+            json.dumps(cursor, ensure_ascii=False),
+            'ページングクロールの再開位置'
+        )
+        return cursor
+    
+    def clear_crawl_cursor(self, query_hash):
+        """クロールカーソルを削除"""
+        setting = Setting.query.filter_by(key=f'{CRAWL_CURSOR_PREFIX}{query_hash}').first()
+        if setting:
+            db.session.delete(setting)
+            db.session.commit()
+    
+    def crawl_items(self, floor='videoa', sort='date', max_pages=None, time_budget=None,
+                    reset=False, checkpoint=False, state=None, **kwargs):
+        """検索結果の全ページを順に取得するジェネレータ
+        
+        checkpoint=Trueの場合はページを1つ処理し終えるたびにカーソルを保存し、
+        途中で停止しても次回は続きのoffsetから再開する（過去分のバックフィル用）。
+        新着順で上限日付（lte_date）がない検索は新作が先頭に増えてoffsetがずれるため、
+        カーソルは使わない。
+        
+        Args:
+            floor (str): 検索対象のフロア
+            sort (str): 並び順
+            max_pages (int): 今回の実行で取得する最大ページ数（Noneで無制限）
+            time_budget (float): 今回の実行の制限時間（秒、Noneで無制限）
+            reset (bool): 保存済みカーソルを無視して先頭から取得するかどうか
+            checkpoint (bool): カーソルの読み込み・保存を行うかどうか（バックフィル時のみ指定）
+            state (dict): 指定すると終了理由（'stopped'）を書き込む
+                （'completed', 'max_pages', 'time_budget', 'error'のいずれか）
+            **kwargs: その他の検索オプション（search_itemsと同じ）
+        
+        Yields:
+            list: 1ページ分のアイテムリスト
+        """
+        if state is None:
+            state = {}
+        kwargs.pop('offset', None)
+        kwargs.setdefault('hits', CRAWL_HITS)
+        params = self.build_search_params(floor=floor, sort=sort, offset=1, **kwargs)
+        query_hash = self.query_hash(params)
+        hits = int(params['hits'])
+        if checkpoint and sort == 'date' and 'lte_date' not in params:
+            logger.warning(f"Crawl {query_hash} is sorted by date without lte_date, not using a cursor")
+            checkpoint = False
+        
+        offset = 1
+        total_count = None
+        cursor = None if reset or not checkpoint else self.load_crawl_cursor(query_hash)
+        if cursor:
+            offset = cursor['offset']
+            total_count = cursor.get('total_count')
+            logger.info(f"Resuming crawl {query_hash} from offset {offset} "
+                        f"(last date: {cursor.get('last_date')})")
+        
+        started = time.monotonic()
+        pages = 0
+        while offset <= MAX_CRAWL_OFFSET:
+            if max_pages is not None and pages >= max_pages:
+                logger.info(f"Crawl {query_hash} stopped after {pages} pages (next offset: {offset})")
+                state['stopped'] = 'max_pages'
+                return
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                logger.info(f"Crawl {query_hash} reached time budget (next offset: {offset})")
+                state['stopped'] = 'time_budget'
+                return
             
-            # レスポンスのフォーマットチェック
-            if 'result' not in data or 'items' not in data['result']:
-                logger.error(f"Unexpected API response format: {data}")
-                return []
+            result = self.fetch_page(dict(params, offset=offset))
+            if result is None:
+                # 失敗時はカーソルを残して次回に再試行する
+                logger.warning(f"Crawl {query_hash} aborted at offset {offset}")
+                state['stopped'] = 'error'
+                return
             
-            # 結果件数をログに記録
-            item_count = len(data['result']['items'])
-            total_count = data['result'].get('total_count', 0)
-            result_count = data['result'].get('result_count', 0)
-            first_position = data['result'].get('first_position', offset)
+            items = result['items']
+            total_count = int(result.get('total_count', total_count or 0))
+            if not items:
+                break
             
-            logger.info(f"API returned {item_count} items (total: {total_count}, result: {result_count}, position: {first_position})")
+            yield items
+            pages += 1
             
-            # アイテム情報のデバッグログ
-            for idx, item in enumerate(data['result']['items']):
-                has_movie = 'sampleMovieURL' in item
-                logger.debug(f"商品 #{idx+1} ({item.get('content_id', 'unknown')}): " +
-                            f"動画情報あり={has_movie}")
+            offset += len(items)
+            last_date = items[-1].get('date')
+            if offset > total_count or len(items) < hits:
+                break
+            if checkpoint:
+                self.save_crawl_cursor(query_hash, offset, last_date, total_count)
+        
+        # 最後まで到達したらカーソルを破棄
+        logger.info(f"Crawl {query_hash} completed (total: {total_count})")
+        state['stopped'] = 'completed'
+        if checkpoint:
+            self.clear_crawl_cursor(query_hash)
+    
+    def watermark_key(self, params):
+        """ウォーターマークを保存する検索条件のハッシュ（日付フィルターは除外）"""
+        return self.query_hash({
+            key: value for key, value in params.items()
+            if key not in ('gte_date', 'lte_date')
+        })
+    
+    def load_watermark(self, key):
+        """保存済みの検索条件について既知の最新商品（date, content_id）を取得"""
+        value = Setting.get(f'{WATERMARK_PREFIX}{key}')
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            logger.warning(f"Discarding unreadable watermark: {key}")
+            return None
+    
+    def save_watermark(self, key, date, content_id):
+        """既知の最新商品を保存"""
+        watermark = {
+            'date': date,
+            'content_id': content_id,
+            'updated_at': datetime.now(JST).isoformat(),
+        }
+        Setting.set(
+            f'{WATERMARK_PREFIX}{key}',
+            json.dumps(watermark, ensure_ascii=False),
+            '差分取得のウォーターマーク'
+        )
+        return watermark
+    
+    def fetch_incremental_items(self, floor='videoa', max_pages=None, time_budget=None, **kwargs):
+        """前回取得済みの最新商品より新しいものだけを取得して保存
+        
+        検索条件ごとに既知の最新商品（ウォーターマーク）を保持し、次回は
+        gte_dateでそれ以降に絞って新着順に取得する。ウォーターマークの商品か
+        既知の商品だけのページに到達した時点でページングを打ち切る。
+        
+        Args:
+            floor (str): 検索対象のフロア
+            max_pages (int): 今回の実行で取得する最大ページ数
+            time_budget (float): 今回の実行の制限時間（秒）
+            **kwargs: その他の検索オプション（search_itemsと同じ、sortは'date'固定）
+        
+        Returns:
+            int: 新規保存した商品数
+        """
+        kwargs.pop('sort', None)
+        base_params = self.build_search_params(floor=floor, sort='date', **dict(kwargs))
+        key = self.watermark_key(base_params)
+        watermark = self.load_watermark(key)
+        
+        crawl_kwargs = dict(kwargs)
+        if watermark and watermark.get('date'):
+            crawl_kwargs['gte_date'] = watermark['date'].replace(' ', 'T')
+            logger.info(f"Incremental fetch {key} from watermark {watermark['date']} "
+                        f"({watermark.get('content_id')})")
+        
+        # ページの取得はパイプラインの取得段（別スレッド）で進めるため、
+        # 既知の範囲の判定に使う保存済み商品は先に読み込んでおく
+        known_ids = self.saved_ids_since(watermark['date']) if watermark and watermark.get('date') else set()
+        now = datetime.now(JST).strftime('%Y-%m-%d %H:%M:%S')
+        progress = {'newest': None, 'reached_known': False}
+        state = {}
+        
+        def pages():
+            for items in self.crawl_items(floor=floor, sort='date', max_pages=max_pages,
+                                          time_budget=time_budget, checkpoint=False,
+                                          state=state, **crawl_kwargs):
+                # 発売済みの中で最も新しい商品を次回のウォーターマーク候補にする
+                if progress['newest'] is None:
+                    progress['newest'] = next((item for item in items if item.get('date', '') <= now), None)
                 
-                # アフィリエイトURL情報をログに記録
-                logger.debug(f"  URL: {item.get('URL', 'N/A')}")
-                logger.debug(f"  AffiliateURL: {item.get('affiliateURL', 'N/A')}")
+                fresh = []
+                for item in items:
+                    if watermark and item['content_id'] == watermark.get('content_id'):
+                        progress['reached_known'] = True
+                        break
+                    fresh.append(item)
                 
-                if has_movie:
-                    available_sizes = []
-                    movie_sizes = ['size_720_480', 'size_644_414', 'size_560_360', 'size_476_306']
-                    for size in movie_sizes:
-                        if size in item['sampleMovieURL'] and item['sampleMovieURL'][size]:
-                            available_sizes.append(size)
-                    
-                    logger.debug(f"  利用可能な動画サイズ: {', '.join(available_sizes) if available_sizes else 'なし'}")
-            
-            return data['result']['items']
-        except requests.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            return []
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse API response: {e}")
-            return []
-        except Exception as e:
-            # その他の例外も捕捉して空リストを返す
-            logger.error(f"Unexpected error during API request: {e}")
-            return []
+                # 既知の範囲（ウォーターマーク以前の日付で全件保存済み）に入ったら終了
+                if fresh and watermark and all(item['content_id'] in known_ids for item in fresh) and \
+                        all(item.get('date', '') <= watermark['date'] for item in fresh):
+                    progress['reached_known'] = True
+                
+                yield [item for item in fresh if item['content_id'] not in known_ids]
+                if progress['reached_known']:
+                    return
+        
+        # 取得と保存を1つのパイプラインで並行させる
+        saved_count = self.ingest_pages(pages())
+        newest = progress['newest']
+        reached_known = progress['reached_known']
+        
+        # 初回は取得できた範囲を基準にする。2回目以降は既知の商品まで到達した場合のみ更新
+        if watermark is None or reached_known or state.get('stopped') == 'completed':
+            if newest:
+                self.save_watermark(key, newest['date'], newest['content_id'])
+        elif state.get('stopped') == 'error':
+            logger.error(f"Incremental fetch {key} failed, keeping previous watermark")
+        else:
+            logger.warning(f"Incremental fetch {key} ended before reaching known content "
+                           f"({state.get('stopped')}), keeping previous watermark")
+        
+        logger.info(f"Incremental fetch {key} saved {saved_count} new products")
+        return saved_count
+    
+    def collect_incremental_items(self, floor='videoa', sort='date', watermark=None,
+                                  max_pages=None, time_budget=None, **kwargs):
+        """ウォーターマークより新しい商品を取得してメモリ上に集める（DBには触れない）
+        
+        並列実行用。新着順の場合はウォーターマークの日付以降に絞り、
+        ウォーターマークの商品に到達した時点でページングを打ち切る。
+        
+        Returns:
+            dict: items（アイテムリスト）, newest（発売済みで最新のアイテム）,
+                reached_known（既知の商品に到達したか）, stopped（終了理由）
+        """
+        if sort == 'date' and watermark and watermark.get('date'):
+            since = watermark['date'].replace(' ', 'T')
+            kwargs['gte_date'] = max(since, kwargs.get('gte_date') or since)
+        
+        now = datetime.now(JST).strftime('%Y-%m-%d %H:%M:%S')
+        collected = []
+        newest = None
+        reached_known = False
+        state = {}
+        for items in self.crawl_items(floor=floor, sort=sort, max_pages=max_pages, time_budget=time_budget,
+                                      checkpoint=False, state=state, **kwargs):
+            if newest is None:
+                newest = next((item for item in items if item.get('date', '') <= now), None)
+            for item in items:
+                if watermark and item['content_id'] == watermark.get('content_id'):
+                    reached_known = True
+                    break
+                collected.append(item)
+            if reached_known:
+                break
+        
+        return {
+            'items': collected,
+            'newest': newest,
+            'reached_known': reached_known,
+            'stopped': 'known' if reached_known else state.get('stopped'),
+        }
+    
+    def fetch_saved_searches(self, searches=None, max_pages=None, time_budget=None):
+        """保存済み検索を並列に実行し、結果をまとめて1回で保存
+        
+        ウォーターマークの読み込み・保存とDBへの書き込みは呼び出し元のスレッドで行い、
+        スレッドプールではAPIの呼び出しだけを行う。各検索の結果はcontent_idで
+        重複を除いてから保存する。保存済み検索が1件もない場合は既定の新着取得を行う。
+        
+        Args:
+            searches (list): 実行するSavedSearch（省略時は有効なものすべて）
+            max_pages (int): 検索ごとに取得する最大ページ数
+            time_budget (float): 検索ごとの制限時間（秒）
+        
+        Returns:
+            dict: searches（実行数）, fetched（取得件数）, unique（重複除外後）, saved（新規保存）, failed（失敗した検索数）
+        """
+        if searches is None:
+            searches = SavedSearch.query.filter_by(enabled=True).order_by(SavedSearch.id).all()
+        if not searches:
+            saved = self.fetch_incremental_items(floor='videoa', max_pages=max_pages, time_budget=time_budget)
+            return {'searches': 0, 'fetched': saved, 'unique': saved, 'saved': saved, 'failed': 0}
+        
+        # 検索条件とウォーターマークを準備
+        plans = []
+        for search in searches:
+            kwargs = search.to_search_kwargs()
+            key = None
+            watermark = None
+            if kwargs['sort'] == 'date':
+                base_kwargs = {k: v for k, v in kwargs.items() if k not in ('floor', 'sort')}
+                key = self.watermark_key(self.build_search_params(floor=kwargs['floor'], sort='date', **base_kwargs))
+                watermark = self.load_watermark(key)
+            plans.append((search, kwargs, key, watermark))
+        
+        # APIの呼び出しだけを並列に実行
+        results = {}
+        workers = max(1, min(self.search_workers, len(plans)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.collect_incremental_items, watermark=watermark,
+                                max_pages=max_pages, time_budget=time_budget, **dict(kwargs)): search.id
+                for search, kwargs, key, watermark in plans
+            }
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.error(f"Saved search {futures[future]} failed: {e}")
+                    results[futures[future]] = {'items': [], 'newest': None, 'reached_known': False,
+                                                'stopped': 'error'}
+        
+        # 重複を除いて1回で保存
+        merged = {}
+        fetched = 0
+        for search, kwargs, key, watermark in plans:
+            for item in results[search.id]['items']:
+                fetched += 1
+                merged.setdefault(item['content_id'], item)
+        saved = self.save_items_to_db(list(merged.values()))
+        
+        # ウォーターマークと実行結果を記録
+        now = datetime.now(JST)
+        failed = 0
+        for search, kwargs, key, watermark in plans:
+            result = results[search.id]
+            if result['stopped'] == 'error':
+                failed += 1
+            elif key and result['newest'] and (watermark is None or result['reached_known']
+                                              or result['stopped'] == 'completed'):
+                self.save_watermark(key, result['newest']['date'], result['newest']['content_id'])
+            search.last_run_at = now
+            search.last_result = json.dumps({
+                'fetched': len(result['items']),
+                'stopped': result['stopped'],
+            }, ensure_ascii=False)
+        db.session.commit()
+        
+        summary = {
+            'searches': len(plans),
+            'fetched': fetched,
+            'unique': len(merged),
+            'saved': saved,
+            'failed': failed,
+        }
+        logger.info(f"Saved searches finished: {summary}")
+        return summary
     
     def get_request_params(self):
         """リクエスト共通パラメータ（クッキーとヘッダー）を返す"""
@@ -147,226 +813,702 @@ class DMMAPIService:
             'timeout': 15
         }
 
-    def save_items_to_db(self, items):
-        """取得した商品情報をデータベースに保存"""
-        saved_count = 0
+    def _build_product_row(self, item):
+        """APIのアイテムから商品テーブルの行データを生成"""
+        # 出演者リストを取得
+        actresses = []
+        if 'iteminfo' in item and 'actress' in item['iteminfo']:
+            actresses = [actress['name'] for actress in item['iteminfo']['actress']]
         
-        for item in items:
+        # ジャンルリストを取得
+        genres = []
+        if 'iteminfo' in item and 'genre' in item['iteminfo']:
+            genres = [genre['name'] for genre in item['iteminfo']['genre']]
+        
+        # 発売日をパース
+        release_date = None
+        if 'date' in item:
             try:
-                # 既存の商品をチェック
-                existing = Product.query.filter_by(dmm_product_id=item['content_id']).first()
-                if existing:
-                    logger.info(f"Product already exists: {item['title']}")
-                    continue
-                
-                # 出演者リストを取得
-                actresses = []
-                if 'iteminfo' in item and 'actress' in item['iteminfo']:
-                    actresses = [actress['name'] for actress in item['iteminfo']['actress']]
-                
-                # ジャンルリストを取得
-                genres = []
-                if 'iteminfo' in item and 'genre' in item['iteminfo']:
-                    genres = [genre['name'] for genre in item['iteminfo']['genre']]
-                
-                # 発売日をパース
-                release_date = None
-                if 'date' in item:
+                release_date = datetime.strptime(item['date'], '%Y-%m-%d %H:%M:%S').date()
+            except ValueError:
+                pass
+        
+        return {
+            'dmm_product_id': item['content_id'],
+            'title': item['title'],
+            'actresses': actresses,
+            'url': item.get('affiliateURL') if item.get('affiliateURL') else item.get('URL'),  # affiliateURLを優先、なければURLを使用
+            'package_image_url': item.get('imageURL', {}).get('large'),
+            'maker': item.get('iteminfo', {}).get('maker', [{}])[0].get('name', ''),
+            'genres': genres,
+            'release_date': release_date,
+            'fetched_at': datetime.now(JST),
+            'posted': False,
+            'is_favorite': False,
+        }
+    
+    def _build_image_rows(self, item, product_id, video_url=None):
+        """APIのアイテムから画像テーブルの行データを生成"""
+        now = datetime.now(JST)
+        rows = []
+        
+        # パッケージ画像（選択可能にするため）
+        if 'imageURL' in item and 'large' in item['imageURL']:
+            rows.append({'image_url': item['imageURL']['large'], 'image_type': 'package'})
+        
+        # サンプル画像（sample_l.image）
+        sample_l = item.get('sampleImageURL', {}).get('sample_l', {})
+        for img_url in sample_l.get('image', []):
+            rows.append({'image_url': img_url, 'image_type': 'sample'})
+        
+        # サンプルムービー
+        if video_url:
+            rows.append({'image_url': video_url, 'image_type': 'movie'})
+        
+        for row in rows:
+            row.update(product_id=product_id, downloaded=False, selected=False, created_at=now)
+        return rows
+    
+    def _insert_ignoring_duplicates(self, model, index_elements):
+        """一意制約に衝突した行を無視するINSERT文を生成"""
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            return sqlite_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+        if dialect == 'postgresql':
+            return postgresql_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+        return insert(model)
+    
+    def existing_product_ids(self, content_ids):
+        """保存済みのdmm_product_idをINクエリでまとめて取得"""
+        content_ids = list(content_ids)
+        existing = set()
+        for start in range(0, len(content_ids), IN_CLAUSE_CHUNK):
+            chunk = content_ids[start:start + IN_CLAUSE_CHUNK]
+            rows = db.session.query(Product.dmm_product_id).filter(
+                Product.dmm_product_id.in_(chunk)
+            ).all()
+            existing.update(row[0] for row in rows)
+        return existing
+    
+    def saved_ids_since(self, date):
+        """指定日時の発売日以降に発売された保存済み商品のdmm_product_idを取得"""
+        since = datetime.strptime(date[:10], '%Y-%m-%d').date()
+        rows = db.session.query(Product.dmm_product_id).filter(Product.release_date >= since).all()
+        return {row[0] for row in rows}
+    
+    def build_ingest_rows(self, item, video_urls=None):
+        """APIのアイテムから保存する行データ一式を生成（DBには触れない）
+        
+        Args:
+            item (dict): APIのアイテム
+            video_urls (dict): 商品ページURL -> 動画URL（Noneの場合は動画URL抽出キューに登録）
+        
+        Returns:
+            dict: content_id, product（商品の行）, images（商品IDなしの画像の行）,
+                page_url（動画URL抽出キューに登録する商品ページ）
+        """
+        if video_urls is None:
+            images = self._build_image_rows(item, None)
+            page_url = item.get('URL')
+        else:
+            images = self._build_image_rows(item, None, video_urls.get(item.get('URL')))
+            page_url = None
+        return {
+            'content_id': item['content_id'],
+            'product': self._build_product_row(item),
+            'images': images,
+            'page_url': page_url,
+        }
+    
+    def _insert_rows(self, bundles):
+        """行データ一式を一括INSERT（重複した商品はスキップ）
+        
+        Returns:
+            int: 実際に追加された商品数
+        """
+        if not bundles:
+            return 0
+        stmt = self._insert_ignoring_duplicates(Product, ['dmm_product_id']).returning(
+            Product.id, Product.dmm_product_id
+        )
+        inserted = {
+            row.dmm_product_id: row.id
+            for row in db.session.execute(stmt, [bundle['product'] for bundle in bundles])
+        }
+        
+        image_rows = []
+        task_rows = []
+        tag_rows = []
+        for bundle in bundles:
+            product_id = inserted.get(bundle['content_id'])
+            if product_id is None:
+                continue
+            tag_rows.append({'id': product_id, **{key: bundle['product'][key] for key in TAG_COLUMNS}})
+            image_rows.extend(dict(row, product_id=product_id) for row in bundle['images'])
+            if bundle['page_url']:
+                task_rows.append(self._build_video_task_row(product_id, bundle['page_url']))
+        if image_rows:
+            db.session.execute(insert(Image), image_rows)
+        if task_rows:
+            db.session.execute(self._insert_ignoring_duplicates(VideoEnrichmentTask, ['product_id']), task_rows)
+        # 一括INSERTはフラッシュを通らないため、女優・ジャンル・メーカーの関連はここで登録する
+        sync_product_tags(db.session.connection(), tag_rows, replace=False)
+        return len(inserted)
+    
+    def _persist_items(self, items, video_urls=None):
+        """商品と画像を一括INSERT（重複した商品はスキップ）
+        
+        Args:
+            items (list): APIのアイテムリスト
+            video_urls (dict): 商品ページURL -> 動画URL（Noneの場合は動画URL抽出キューに登録）
+        
+        Returns:
+            int: 実際に追加された商品数
+        """
+        return self._insert_rows([self.build_ingest_rows(item, video_urls) for item in items])
+    
+    def persist_ingest_rows(self, bundles):
+        """行データ一式をチャンク単位で保存してコミット
+        
+        チャンクはセーブポイント内で書き込み、失敗した場合は
+        そのチャンクだけ1件ずつ保存し直す。
+        
+        Returns:
+            int: 新規保存した商品数
+        """
+        saved_count = 0
+        for start in range(0, len(bundles), self.ingest_chunk_size):
+            chunk = bundles[start:start + self.ingest_chunk_size]
+            try:
+                with db.session.begin_nested():
+                    saved_count += self._insert_rows(chunk)
+            except Exception as e:
+                logger.error(f"Error saving product chunk, retrying item by item: {e}")
+                for bundle in chunk:
                     try:
-                        release_date = datetime.strptime(item['date'], '%Y-%m-%d %H:%M:%S').date()
-                    except ValueError:
-                        pass
-                
-                # 商品レコードを作成
-                product = Product(
-                    dmm_product_id=item['content_id'],
-                    title=item['title'],
-                    actresses=json.dumps(actresses, ensure_ascii=False),
-                    url=item.get('affiliateURL') if item.get('affiliateURL') else item.get('URL'),  # affiliateURLを優先、なければURLを使用
-                    package_image_url=item.get('imageURL', {}).get('large'),
-                    maker=item.get('iteminfo', {}).get('maker', [{}])[0].get('name', ''),
-                    genres=json.dumps(genres, ensure_ascii=False),
-                    release_date=release_date,
-                    fetched_at=datetime.now(JST)
-                )
-                
-                db.session.add(product)
-                db.session.flush()  # IDを生成するためにflush
-                
-                # パッケージ画像を保存（選択可能にするため）
-                if 'imageURL' in item and 'large' in item['imageURL']:
-                    package_image = Image(
-                        product_id=product.id,
-                        image_url=item['imageURL']['large'],
-                        image_type='package',  # 種類を示す属性を追加
-                        created_at=datetime.now(JST)
-                    )
-                    db.session.add(package_image)
-                
-                # サムネイル画像を保存
-                if 'sampleImageURL' in item:
-                    # sample_l.image の取得
-                    if 'sample_l' in item['sampleImageURL'] and 'image' in item['sampleImageURL']['sample_l']:
-                        sample_images = item['sampleImageURL']['sample_l']['image']
-                        for i, img_url in enumerate(sample_images):
-                            image = Image(
-                                product_id=product.id,
-                                image_url=img_url,
-                                image_type='sample',  # 種類を示す属性を追加
-                                created_at=datetime.now(JST)
-                            )
-                            db.session.add(image)
-                
-                # サンプルムービーを保存
-                if 'URL' in item:  # affiliateURLを使用
-                    affiliate_url = item['URL']
-                    logger.info(f"Extracting video URL from product page: {affiliate_url}")
-                    
-                    # 商品ページから動画URLを抽出
-                    video_url = self.extract_video_url_from_page(affiliate_url)
-                    
-                    if video_url:
-                        # 動画URLを保存
-                        movie = Image(
-                            product_id=product.id,
-                            image_url=video_url,
-                            image_type='movie',
-                            created_at=datetime.now(JST)
-                        )
-                        db.session.add(movie)
-                        logger.info(f"Added video URL from product page: {video_url}")
-                
-                saved_count += 1
-                
+                        with db.session.begin_nested():
+                            saved_count += self._insert_rows([bundle])
+                    except Exception as e:
+                        logger.error(f"Error saving product {bundle['content_id']}: {e}")
+            
+            try:
+                db.session.commit()
             except Exception as e:
-                logger.error(f"Error saving product: {e}")
+                logger.error(f"Error committing to database: {e}")
                 db.session.rollback()
+        return saved_count
+    
+    def _build_video_task_row(self, product_id, page_url):
+        """動画URL抽出キューの行データを生成"""
+        now = datetime.now(JST)
+        return {
+            'product_id': product_id,
+            'page_url': page_url,
+            'priority': 0,
+            'status': 'pending',
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now,
+        }
+    
+    def ingest_pages(self, pages):
+        """ページ単位のアイテムをパイプラインで取り込んで保存
+        
+        ページの取得・動画URLの解決・行データの生成はそれぞれ別スレッドで行い、
+        重複除外とDBへの書き込みは呼び出し元のスレッドで行う。
+        段ごとの統計はlast_ingest_reportに残す。
         
+        Args:
+            pages (iterable): アイテムリストのイテラブル（crawl_itemsなど）
+        
+        Returns:
+            int: 新規保存した商品数
+        """
+        pipeline = IngestPipeline(self, queue_size=self.ingest_queue_size, batch_size=self.ingest_chunk_size)
         try:
-            db.session.commit()
-            logger.info(f"Saved {saved_count} new products to database")
-        except Exception as e:
-            logger.error(f"Error committing to database: {e}")
-            db.session.rollback()
-            saved_count = 0
+            return pipeline.run(pages)
+        finally:
+            self.last_ingest_report = pipeline.report()
+    
+    def save_items_to_db(self, items):
+        """取得した商品情報をデータベースに保存
         
-        return saved_count
+        既存商品の判定はページごとのINクエリで行い、新規の商品・画像は
+        チャンク単位の一括INSERTで保存する。動画URLの解決と保存は
+        パイプラインで並行して進める。動画URLの抽出を後回しにする設定の場合は
+        商品ページを取得せずに保存し、抽出作業を動画URL抽出キューに登録する。
+        """
+        return self.ingest_pages(paginate(list(items), CRAWL_HITS))
+    
+    def _host_semaphore(self, host):
+        """ホストごとの同時接続数を制限するセマフォを取得"""
+        with self._host_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.scrape_per_host)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+    
+    def _extract_with_host_limit(self, page_url):
+        """ホスト単位の同時実行数を守って動画URLを抽出"""
+        with self._host_semaphore(urlparse(page_url).netloc):
+            return self.extract_video_url_from_page(page_url)
+    
+    def extract_video_urls(self, page_urls, failures=None):
+        """複数の商品ページから動画URLをスレッドプールで並列に抽出
+        
+        Args:
+            page_urls (list): 商品ページURLのリスト
+            failures (dict): 指定した場合、取得・解析に失敗したページのURLと理由を追加する
+        
+        Returns:
+            dict: 商品ページURLをキー、動画URL（見つからない場合・失敗した場合はNone）を値とする辞書
+        """
+        unique_urls = list(dict.fromkeys(page_urls))
+        if not unique_urls:
+            return {}
+        
+        results = {}
+        workers = max(1, min(self.scrape_workers, len(unique_urls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._extract_with_host_limit, url): url
+                for url in unique_urls
+            }
+            for future in as_completed(futures):
+                page_url = futures[future]
+                try:
+                    results[page_url] = future.result()
+                except VideoExtractionError as e:
+                    results[page_url] = None
+                    if failures is not None:
+                        failures[page_url] = str(e)
+        
+        found = sum(1 for url in results.values() if url)
+        logger.info(f"Extracted video URLs for {found}/{len(unique_urls)} product pages")
+        return results
+    
+    def probe_video_url(self, candidates):
+        """動画URLの候補をHEADリクエストで確認し、存在する最初のURLを返す"""
+        for video_url in candidates:
+            try:
+                response = self.http.head(video_url, **self.get_request_params())
+            except requests.RequestException as e:
+                logger.debug(f"HEAD {video_url} failed: {e}")
+                continue
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code == 200 and 'html' not in content_type:
+                return video_url
+        return None
+    
+    def resolve_video_urls(self, items, failures=None):
+        """アイテムの動画URLを解決（導出したURLをHEADで確認し、見つからない分だけ商品ページから抽出）
+        
+        Args:
+            items (list): APIのアイテムリスト（'URL'のないアイテムは無視する）
+            failures (dict): 指定した場合、商品ページの取得・解析に失敗したURLと理由を追加する
+        
+        Returns:
+            dict: 商品ページURLをキー、動画URL（見つからない場合はNone）を値とする辞書
+        """
+        items = [item for item in items if item.get('URL')]
+        resolved = {}
+        
+        if self.probe_video_urls:
+            candidates = {}
+            for item in items:
+                urls = video_url_candidates(item, self.litevideo_base_url)
+                if urls:
+                    candidates.setdefault(item['URL'], urls)
+            if candidates:
+                workers = max(1, min(self.scrape_workers, len(candidates)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(self.probe_video_url, urls): page_url
+                        for page_url, urls in candidates.items()
+                    }
+                    for future in as_completed(futures):
+                        video_url = future.result()
+                        if video_url:
+                            resolved[futures[future]] = video_url
+            logger.info(f"Resolved {len(resolved)}/{len(candidates)} video URLs without scraping")
+        
+        # 導出できなかった商品だけ商品ページを取得
+        misses = [item['URL'] for item in items if item['URL'] not in resolved]
+        resolved.update(self.extract_video_urls(misses, failures))
+        return resolved
+    
+    def _read_page_body(self, response):
+        """レスポンス本文を分割して読み、動画URLが見つかるか上限に達したら接続を閉じる
+        
+        Returns:
+            tuple: (読み込んだ本文, 終了理由)
+        """
+        try:
+            body, stopped = scan_stream(response.iter_content(STREAM_CHUNK_SIZE), self.stream_byte_budget)
+        finally:
+            # 読み残しがある場合はコネクションを再利用せずに破棄する
+            response.close()
+        with self._page_stats_lock:
+            self.page_stats['pages'] += 1
+            self.page_stats['bytes'] += len(body)
+            if stopped == 'match':
+                self.page_stats['matched_early'] += 1
+            elif stopped == 'budget':
+                self.page_stats['budget_exceeded'] += 1
+        return body, stopped
+    
+    def fetch_product_page(self, page_url, stream=None):
+        """商品ページを取得（キャッシュが有効な場合は条件付きGETで再検証）
+        
+        ストリーミングが有効な場合は本文を分割して読み、JSON-LDの動画URLが
+        見つかった時点か上限のバイト数に達した時点で読み込みを止める。
+        
+        Args:
+            page_url (str): 商品ページのURL
+            stream (bool): 分割して読むかどうか（Noneの場合はDMM_STREAM_PAGESに従う、
+                ページ全体が必要な場合はFalse）
+        
+        Returns:
+            CachedPage: 取得したページ
+        """
+        request_params = self.get_request_params()
+        kwargs = {
+            'cookies': request_params['cookies'],
+            'headers': request_params['headers'],
+            'timeout': request_params['timeout'],
+        }
+        read_body = None
+        if self.stream_pages if stream is None else stream:
+            kwargs['stream'] = True
+            read_body = self._read_page_body
+        if self.cache:
+            return self.cache.fetch(self.http, page_url, read_body=read_body, **kwargs)
+        
+        response = self.http.get(page_url, **kwargs)
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        if read_body is None:
+            return CachedPage(page_url, response.content, response.encoding or response.apparent_encoding)
+        body, stopped = read_body(response)
+        return CachedPage(page_url, body, response.encoding or 'utf-8', stopped=stopped)
     
     def _modify_video_url(self, video_url):
         """動画URLを_dm_w.mp4形式に変換"""
-        if video_url and video_url.endswith('.mp4'):
-            # .mp4の前に_dm_wを挿入
-            modified_url = video_url.replace('.mp4', '_dm_w.mp4')
-            logger.debug(f"Modified video URL from {video_url} to {modified_url}")
-            return modified_url
-        return video_url
+        return to_dm_w_url(video_url)
 
     def extract_video_url_from_page(self, page_url):
-        """商品詳細ページから動画URLを抽出"""
+        """商品詳細ページから動画URLを抽出
+        
+        Returns:
+            str: 動画URL（ページに動画がない場合はNone）
+        
+        Raises:
+            VideoExtractionError: 通信エラー・解析のタイムアウト・年齢認証ページなどで判定できなかった場合
+        """
         try:
-            import requests
-            from bs4 import BeautifulSoup
-            import re
-            import json
+            # 直近で動画なしと判定済みのページはスキップ
+            if self.cache and self.cache.is_negative(page_url):
+                logger.info(f"Skipping page cached as having no video: {page_url}")
+                return None
             
             logger.info(f"Attempting to extract video URL from page: {page_url}")
             
-            # リクエストパラメータを取得
-            request_params = self.get_request_params()
-            
-            # ページのHTMLを取得（年齢認証クッキー付き）
-            response = requests.get(
-                page_url, 
-                cookies=request_params['cookies'],
-                headers=request_params['headers'],
-                timeout=request_params['timeout']
-            )
-            response.raise_for_status()
+            # ページのHTMLを取得（年齢認証クッキー付き、キャッシュ経由）
+            response = self.fetch_product_page(page_url)
             
             # デバッグ用に最初の数バイトを記録
-            logger.info(f"Response received, length: {len(response.text)} bytes")
-            
-            # HTMLをパース
-            soup = BeautifulSoup(response.text, 'lxml')
+            logger.info(f"Response received, length: {len(response.content)} bytes"
+                        f"{' (cached)' if response.from_cache else ''}"
+                        f"{' (stopped early)' if response.stopped == 'match' else ''}"
+                        f"{' (byte budget exceeded)' if response.stopped == 'budget' else ''}")
             
             # 年齢認証ページかどうかチェック
-            if "年齢確認" in response.text and "あなたは18歳以上ですか" in response.text:
+            if is_age_verification_page(response.content):
                 logger.warning("Age verification page detected instead of product page")
-                return None
-            
-            # JSONLDを探す（最も信頼性の高い方法）
-            jsonld_scripts = soup.find_all('script', type='application/ld+json')
-            logger.debug(f"Found {len(jsonld_scripts)} JSONLD scripts")
-            
-            for script in jsonld_scripts:
-                if not script.string:
-                    continue
-                    
-                try:
-                    data = json.loads(script.string)
-                    # Product構造体かチェック
-                    if isinstance(data, dict) and data.get('@type') == 'Product':
-                        logger.debug("Found Product type in JSONLD")
-                        # subjectOf内のVideoObjectを確認
-                        if 'subjectOf' in data and data['subjectOf'].get('@type') == 'VideoObject':
-                            logger.debug("Found VideoObject in JSONLD")
-                            content_url = data['subjectOf'].get('contentUrl')
-                            if content_url and 'cc3001.dmm.co.jp/litevideo' in content_url:
-                                # 動画URLが見つかったら、_dm_w.mp4形式に変換して返す
-                                modified_url = self._modify_video_url(content_url)
-                                logger.info(f"Found video URL in JSONLD: {modified_url}")
-                                return modified_url
-                except Exception as e:
-                    logger.error(f"Error parsing JSONLD: {e}")
-            
-            # 全スクリプトタグを調査（バックアップ方法）
-            script_count = len(soup.find_all('script'))
-            logger.debug(f"Searching through {script_count} script tags")
-
-            for script in soup.find_all('script'):
-                if not script.string:
-                    continue
-                    
-                # cc3001.dmm.co.jp/litevideo のパターンを探す
-                if script.string and 'cc3001.dmm.co.jp/litevideo' in script.string:
-                    logger.debug("Found script with litevideo reference")
-                
-                # 正規表現で動画URLを検索
-                patterns = [
-                    r'contentUrl[\s:"\']+([^"\']+cc3001\.dmm\.co\.jp/litevideo/[^"\']+\.mp4)["\']',
-                    r'(https://cc3001\.dmm\.co\.jp/litevideo/freepv/[^\'"]+\.mp4)',
-                    r'(https?://cc3001\.dmm\.co\.jp/litevideo/[^\'"]+\.mp4)'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, script.string)
-                    if match:
-                        video_url = match.group(1)
-                        # 動画URLを変換して返す
-                        modified_url = self._modify_video_url(video_url)
-                        logger.info(f"Found video URL in script: {modified_url}")
-                        return modified_url
+                if self.cache:
+                    self.cache.invalidate(page_url)
+                raise VideoExtractionError('age verification page')
             
-            # HTMLソース全体で検索（最後の手段）
-            if 'cc3001.dmm.co.jp/litevideo' in response.text:
-                broader_match = re.search(r'(https://cc3001\.dmm\.co\.jp/litevideo/[^\'"]+\.mp4)', response.text)
-                if broader_match:
-                    video_url = broader_match.group(1)
-                    # 動画URLを変換して返す
-                    modified_url = self._modify_video_url(video_url)
-                    logger.info(f"Found video URL with broader search: {modified_url}")
-                    return modified_url
+            # JSON-LDとscript要素だけを走査（見つからなければ全体パースにフォールバック）
+            video_url = self.parse_pool.extract(response.content, response.encoding)
+            if not video_url and response.stopped == 'budget':
+                # 上限より後ろに動画URLがある場合に備えてページ全体を読み直す
+                logger.info(f"Byte budget exceeded without a video URL, fetching the whole page: {page_url}")
+                response = self.fetch_product_page(page_url, stream=False)
+                video_url = self.parse_pool.extract(response.content, response.encoding)
+            if video_url:
+                logger.info(f"Found video URL in product page: {video_url}")
+                return video_url
             
             logger.warning("No video URL found in product page")
+            if self.cache:
+                self.cache.set_negative(page_url, 'no video url')
             return None
+        except VideoExtractionError:
+            raise
         except Exception as e:
             logger.error(f"Error extracting video URL from {page_url}: {e}")
-            return None
+            raise VideoExtractionError(str(e) or type(e).__name__) from e
 
+    def load_product_snapshots(self, content_ids):
+        """比較対象の列だけを保存済みの商品からまとめて取得（ORMオブジェクトは生成しない）
+        
+        Returns:
+            dict: dmm_product_id -> {'id': 商品ID, 列名: 値, ..., 'image_urls': 画像URLの集合}
+        """
+        content_ids = list(content_ids)
+        snapshots = {}
+        columns = [Product.id, Product.dmm_product_id] + [getattr(Product, name) for name in REFRESH_COLUMNS]
+        for start in range(0, len(content_ids), IN_CLAUSE_CHUNK):
+            chunk = content_ids[start:start + IN_CLAUSE_CHUNK]
+            for row in db.session.execute(select(*columns).where(Product.dmm_product_id.in_(chunk))):
+                snapshot = dict(row._mapping)
+                snapshot['image_urls'] = set()
+                snapshots[snapshot.pop('dmm_product_id')] = snapshot
+        
+        by_id = {snapshot['id']: snapshot for snapshot in snapshots.values()}
+        product_ids = list(by_id)
+        for start in range(0, len(product_ids), IN_CLAUSE_CHUNK):
+            chunk = product_ids[start:start + IN_CLAUSE_CHUNK]
+            rows = db.session.execute(
+                select(Image.product_id, Image.image_url).where(Image.product_id.in_(chunk))
+            )
+            for product_id, image_url in rows:
+                by_id[product_id]['image_urls'].add(image_url)
+        return snapshots
+    
+    def _diff_product(self, item, snapshot):
+        """保存済みの値と異なる列だけを取り出す（値が取得できなかった列は更新しない）"""
+        row = self._build_product_row(item)
+        return {
+            name: row[name] for name in REFRESH_COLUMNS
+            if row[name] is not None and row[name] != snapshot[name]
+        }
+    
+    def _refresh_chunk(self, items, snapshots, video_urls):
+        """1チャンク分の新規INSERT・差分UPDATE・画像追加をまとめて実行
+        
+        Returns:
+            dict: inserted, updated, unchangedの件数
+        """
+        new_items = [item for item in items if item['content_id'] not in snapshots]
+        inserted = self._persist_items(new_items, None if self.defer_video_extraction else video_urls)
+        
+        updates = []
+        image_rows = []
+        updated_ids = set()
+        for item in items:
+            snapshot = snapshots.get(item['content_id'])
+            if snapshot is None:
+                continue
+            changes = self._diff_product(item, snapshot)
+            if changes:
+                updates.append(dict(changes, id=snapshot['id']))
+                updated_ids.add(snapshot['id'])
+            
+            video_url = video_urls.get(item.get('URL'))
+            for image_row in self._build_image_rows(item, snapshot['id'], video_url):
+                if image_row['image_url'] not in snapshot['image_urls']:
+                    image_rows.append(image_row)
+                    updated_ids.add(snapshot['id'])
+        
+        # 主キー指定の一括UPDATE（変更された列だけを書き込む）
+        if updates:
+            db.session.execute(update(Product), updates)
+            sync_product_tags(db.session.connection(), [
+                {key: row[key] for key in ('id',) + TAG_COLUMNS if key in row}
+                for row in updates if any(key in row for key in TAG_COLUMNS)
+            ])
+        if image_rows:
+            db.session.execute(insert(Image), image_rows)
+        
+        existing_count = len(items) - len(new_items)
+        return {
+            'inserted': inserted,
+            'updated': len(updated_ids),
+            'unchanged': existing_count - len(updated_ids),
+        }
+    
+    def refresh_items_in_db(self, items):
+        """取得した商品情報で新規追加と既存商品の更新をまとめて行う
+        
+        保存済みの商品は比較対象の列と画像URLだけを一括で読み込んで差分を取り、
+        変更された列の主キー指定UPDATEと、未登録の画像のINSERTだけを実行する。
+        動画URLは新規商品と、動画がまだ登録されていない既存商品についてのみ抽出する。
+        
+        Args:
+            items (list): APIのアイテムリスト
+        
+        Returns:
+            dict: inserted（新規）, updated（更新）, unchanged（変更なし）の件数
+        """
+        batch_started = time.perf_counter()
+        totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        
+        unique_items = list({item['content_id']: item for item in items}.values())
+        snapshots = self.load_product_snapshots(item['content_id'] for item in unique_items)
+        
+        # 動画が未登録の商品だけ動画URLを確認する
+        resolve_items = []
+        for item in unique_items:
+            if 'URL' not in item:
+                continue
+            snapshot = snapshots.get(item['content_id'])
+            if snapshot is None:
+                if not self.defer_video_extraction:
+                    resolve_items.append(item)
+            elif not any('litevideo' in url for url in snapshot['image_urls']):
+                resolve_items.append(item)
+        video_urls = self.resolve_video_urls(resolve_items)
+        
+        for start in range(0, len(unique_items), self.ingest_chunk_size):
+            chunk = unique_items[start:start + self.ingest_chunk_size]
+            try:
+                with db.session.begin_nested():
+                    counts = self._refresh_chunk(chunk, snapshots, video_urls)
+            except Exception as e:
+                logger.error(f"Error refreshing product chunk, retrying item by item: {e}")
+                counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+                for item in chunk:
+                    try:
+                        with db.session.begin_nested():
+                            item_counts = self._refresh_chunk([item], snapshots, video_urls)
+                    except Exception as e:
+                        logger.error(f"Error refreshing product {item.get('content_id')}: {e}")
+                        continue
+                    for key in counts:
+                        counts[key] += item_counts[key]
+            
+            try:
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error committing to database: {e}")
+                db.session.rollback()
+                continue
+            
+            for key in totals:
+                totals[key] += counts[key]
+            logger.info(f"Refresh chunk: {counts['inserted']} inserted, {counts['updated']} updated, "
+                        f"{counts['unchanged']} unchanged")
+        
+        logger.info(f"Refresh batch finished: {len(items)} items, {totals['inserted']} inserted, "
+                    f"{totals['updated']} updated, {totals['unchanged']} unchanged, "
+                    f"total {time.perf_counter() - batch_started:.2f}s")
+        return totals
+    
+    def fetch_and_refresh_items(self, **kwargs):
+        """商品を取得し、新規追加と既存商品の更新を行う
+        
+        Returns:
+            dict: inserted, updated, unchangedの件数
+        
+        Raises:
+            DMMAPIError: APIからの取得に失敗した場合
+        """
+        result = self.search(**kwargs)
+        if not result.ok:
+            raise DMMAPIError(result.error)
+        return self.refresh_items_in_db(result.items)
+    
+    def fetch_items_by_content_ids(self, content_ids, floor='videoa', force_refresh=False):
+        """content_idを指定して商品を取得・保存
+        
+        ItemListのcidは1回の呼び出しで1件しか指定できないため、保存済みのものを
+        除いたcontent_idごとの検索をスレッドプールで並列に実行し（メモ化済みの
+        検索はAPIを呼ばない）、見つかった商品を通常の保存処理でまとめて保存する。
+        
+        Args:
+            content_ids (list): 取得するcontent_idのリスト
+            floor (str): 検索対象のフロア
+            force_refresh (bool): メモ化された結果を使わずAPIを呼び出すかどうか
+        
+        Returns:
+            dict: requested（指定数）, skipped（保存済み）, saved（新規保存）,
+                not_found（見つからなかったID）, failed（取得に失敗したID）
+        """
+        requested = list(dict.fromkeys(content_ids))
+        existing = self.existing_product_ids(requested)
+        missing = [content_id for content_id in requested if content_id not in existing]
+        summary = {
+            'requested': len(requested),
+            'skipped': len(existing),
+            'saved': 0,
+            'not_found': [],
+            'failed': [],
+        }
+        
+        items = []
+        if missing:
+            # API検索なので、ページ取得用ではなく検索用の並列数を使う
+            workers = max(1, min(self.search_workers, len(missing)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self.search, floor=floor, cid=content_id, hits=1,
+                                    force_refresh=force_refresh): content_id
+                    for content_id in missing
+                }
+                for future in as_completed(futures):
+                    content_id = futures[future]
+                    result = future.result()
+                    if not result.ok:
+                        summary['failed'].append(content_id)
+                        continue
+                    matched = [item for item in result.items if item.get('content_id') == content_id]
+                    if matched:
+                        items.extend(matched)
+                    else:
+                        summary['not_found'].append(content_id)
+        
+        # 結果の並びを指定順に揃える
+        order = {content_id: index for index, content_id in enumerate(requested)}
+        items.sort(key=lambda item: order[item['content_id']])
+        summary['not_found'].sort(key=order.get)
+        summary['failed'].sort(key=order.get)
+        
+        if items:
+            summary['saved'] = self.save_items_to_db(items)
+        logger.info(f"Fetch by content_id: {summary['requested']} requested, {summary['skipped']} already stored, "
+                    f"{summary['saved']} saved, {len(summary['not_found'])} not found, "
+                    f"{len(summary['failed'])} failed")
+        return summary
+    
     def fetch_and_save_new_items(self, **kwargs):
-        """新しい商品を取得して保存"""
-        items = self.search_items(**kwargs)
-        return self.save_items_to_db(items)
+        """新しい商品を取得して保存
+        
+        Returns:
+            int: 新規保存した商品数
+        
+        Raises:
+            DMMAPIError: APIからの取得に失敗した場合
+        """
+        result = self.search(**kwargs)
+        if not result.ok:
+            raise DMMAPIError(result.error)
+        return self.save_items_to_db(result.items)
+    
+    def crawl_and_save_items(self, **kwargs):
+        """検索結果を全ページ巡回しながらページ単位で保存
+        
+        checkpoint=False（既定）の場合はページの取得も保存と並行して進める。
+        
+        Args:
+            **kwargs: crawl_itemsと同じ引数
+        
+        Returns:
+            int: 新規保存した商品数
+        """
+        if not kwargs.get('checkpoint', False):
+            return self.ingest_pages(self.crawl_items(**kwargs))
+        
+        # カーソルの保存はDBへの書き込みなので、ページを保存し終えてから次のページを取得する
+        saved_count = 0
+        for items in self.crawl_items(**kwargs):
+            saved_count += self.save_items_to_db(items)
+        return saved_count
 
 
 # アプリケーションファクトリで初期化するためのインスタンス
@@ -0,0 +1,257 @@
+"""
+商品ページ用の永続HTTPキャッシュモジュール
+
+SQLiteファイルにレスポンス本文と検証子（ETag/Last-Modified）を保存し、
+gunicornの複数ワーカーから共有する。期限切れのエントリは条件付きGETで再検証し、
+「動画が見つからなかった」結果はネガティブキャッシュとしてTTL付きで保持する。
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    encoding TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_fetched_at ON responses (fetched_at);
+CREATE TABLE IF NOT EXISTS negative (
+    url TEXT PRIMARY KEY,
+    reason TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+# キャッシュDBの形式のバージョン（1: 全体を読んだ本文だけを保存）
+SCHEMA_VERSION = 1
+
+
+class CachedPage:
+    """キャッシュまたはネットワークから取得したページ"""
+
+    def __init__(self, url, content, encoding=None, from_cache=False, stopped='eof'):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.from_cache = from_cache
+        self.stopped = stopped  # 'eof'（全体）, 'match'（抽出に必要な先頭部分）, 'budget'（上限で打ち切り）
+        self._text = None
+
+    @property
+    def text(self):
+        """本文を文字列として取得"""
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, errors='replace')
+        return self._text
+
+
+class HTTPCache:
+    """URLをキーとするSQLiteベースのレスポンスキャッシュ"""
+
+    def __init__(self, path, fresh_ttl=6 * 3600, negative_ttl=24 * 3600,
+                 max_age=7 * 24 * 3600, max_entries=20000):
+        """
+        Args:
+            path (str): キャッシュDBファイルのパス
+            fresh_ttl (float): 再検証せずにキャッシュを返す期間（秒）
+            negative_ttl (float): 「動画なし」結果を保持する期間（秒）
+            max_age (float): 取得（再検証）から削除までの期間（秒）
+            max_entries (int): 保存するページ数の上限（超えた分は古い順に削除）
+        """
+        self.path = path
+        self.fresh_ttl = fresh_ttl
+        self.negative_ttl = negative_ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                # 以前の形式では途中までしか読んでいない本文も保存していたため破棄する
+                conn.execute('DELETE FROM responses')
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    @classmethod
+    def from_config(cls, app):
+        """Flaskの設定値からキャッシュを生成（無効な場合はNone）"""
+        if not app.config.get('HTTP_CACHE_ENABLED', False):
+            return None
+        path = app.config.get('HTTP_CACHE_PATH') or os.path.join(app.instance_path, 'http_cache.db')
+        return cls(
+            path,
+            fresh_ttl=app.config.get('HTTP_CACHE_FRESH_TTL', 6 * 3600),
+            negative_ttl=app.config.get('HTTP_CACHE_NEGATIVE_TTL', 24 * 3600),
+            max_age=app.config.get('HTTP_CACHE_MAX_AGE', 7 * 24 * 3600),
+            max_entries=app.config.get('HTTP_CACHE_MAX_ENTRIES', 20000)
+        )
+
+    def _connect(self):
+        """現在のスレッド用のSQLite接続を取得"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            # 複数プロセスからの同時アクセスに備えてWALモードを使用
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, url):
+        """キャッシュ済みのエントリを取得"""
+        row = self._connect().execute(
+            'SELECT body, encoding, etag, last_modified, fetched_at FROM responses WHERE url = ?',
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'body': row[0],
+            'encoding': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+            'fetched_at': row[4],
+        }
+
+    def store(self, url, body, encoding=None, etag=None, last_modified=None):
+        """レスポンスを保存"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (url, body, encoding, etag, last_modified, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (url, body, encoding, etag, last_modified, time.time())
+            )
+
+    def touch(self, url):
+        """再検証済みとして取得時刻を更新"""
+        with self._connect() as conn:
+            conn.execute('UPDATE responses SET fetched_at = ? WHERE url = ?', (time.time(), url))
+
+    def invalidate(self, url):
+        """URLのキャッシュを削除"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+
+    def is_negative(self, url):
+        """有効なネガティブキャッシュがあるかどうか"""
+        row = self._connect().execute(
+            'SELECT expires_at FROM negative WHERE url = ?', (url,)
+        ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def set_negative(self, url, reason=None, ttl=None):
+        """ネガティブキャッシュを登録"""
+        expires_at = time.time() + (self.negative_ttl if ttl is None else ttl)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO negative (url, reason, expires_at) VALUES (?, ?, ?)',
+                (url, reason, expires_at)
+            )
+
+    def clear_negative(self, url):
+        """ネガティブキャッシュを削除"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM negative WHERE url = ?', (url,))
+
+    def purge_expired(self):
+        """期限切れのネガティブキャッシュと、古いページ・上限を超えたページを削除
+
+        Returns:
+            dict: 削除したページ数（responses）とネガティブキャッシュ数（negative）
+        """
+        now = time.time()
+        with self._connect() as conn:
+            negative = conn.execute('DELETE FROM negative WHERE expires_at <= ?', (now,)).rowcount
+            responses = conn.execute('DELETE FROM responses WHERE fetched_at <= ?', (now - self.max_age,)).rowcount
+            # 上限を超えた分は取得（再検証）が古い順に削除
+            responses += conn.execute(
+                'DELETE FROM responses WHERE url IN '
+                '(SELECT url FROM responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        if responses or negative:
+            logger.info(f"HTTP cache purged {responses} pages and {negative} negative entries")
+        return {'responses': responses, 'negative': negative}
+
+    def fetch(self, http, url, read_body=None, **kwargs):
+        """キャッシュを考慮してページを取得
+
+        新鮮なキャッシュがあればそのまま返し、期限切れなら検証子付きの
+        条件付きGETを送って304の場合はキャッシュ本文を返す。
+        キャッシュは他の用途（JSON-LDの一覧など）とも共有するため、保存するのは
+        最後まで読んだ本文だけで、read_bodyが途中で読むのをやめた本文
+        （'match'・'budget'）は保存しない。
+
+        Args:
+            http: getメソッドを持つHTTPクライアント
+            url (str): 取得するURL
+            read_body (callable): レスポンスから(本文, 終了理由)を読み込む関数（Noneで全体を読む）
+            **kwargs: http.getに渡す追加引数
+
+        Returns:
+            CachedPage: 取得したページ
+        """
+        entry = self.get(url)
+        if entry and time.time() - entry['fetched_at'] < self.fresh_ttl:
+            self.hits += 1
+            logger.debug(f"HTTP cache hit: {url}")
+            return CachedPage(url, entry['body'], entry['encoding'], from_cache=True)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = http.get(url, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            response.close()
+            self.revalidated += 1
+            logger.debug(f"HTTP cache revalidated: {url}")
+            self.touch(url)
+            return CachedPage(url, entry['body'], entry['encoding'], from_cache=True)
+
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        self.misses += 1
+        if read_body is None:
+            body, stopped = response.content, 'eof'
+            encoding = response.encoding or response.apparent_encoding
+        else:
+            body, stopped = read_body(response)
+            encoding = response.encoding or 'utf-8'
+        if stopped == 'eof':
+            self.store(
+                url,
+                body,
+                encoding=encoding,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+        return CachedPage(url, body, encoding, stopped=stopped)
+
+    def stats(self):
+        """キャッシュの利用状況を取得"""
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+        }
@@ -0,0 +1,127 @@
+"""
+外部HTTP通信用の共有コネクションプールモジュール
+"""
+import threading
+import logging
+import requests
+from contextlib import ExitStack
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """タイムアウト未指定のリクエストにデフォルト値を適用するアダプタ"""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class HTTPClient:
+    """ホストごとのコネクションプールを共有するHTTPクライアント
+
+    urllib3のPoolManagerを保持するアダプタは全スレッドで共有し、
+    クッキーなどの状態を持つrequests.Sessionはスレッドごとに生成する。
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 connect_timeout=5, read_timeout=15, keepalive=True, limiter=None):
+        """
+        Args:
+            pool_connections (int): プールを保持するホスト数
+            pool_maxsize (int): ホストごとの最大コネクション数
+            pool_block (bool): プール枯渇時に空きを待つかどうか
+            connect_timeout (float): デフォルトの接続タイムアウト（秒）
+            read_timeout (float): デフォルトの読み込みタイムアウト（秒）
+            keepalive (bool): コネクションを再利用するかどうか
+            limiter (RateLimiter): ホストごとのレート制限（Noneで制限なし）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.keepalive = keepalive
+        self.limiter = limiter
+        self.adapter = TimeoutHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            timeout=self.timeout
+        )
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config, limiter=None):
+        """Flaskの設定値からクライアントを生成"""
+        return cls(
+            pool_connections=config.get('DMM_HTTP_POOL_CONNECTIONS', 10),
+            pool_maxsize=config.get('DMM_HTTP_POOL_MAXSIZE', 10),
+            pool_block=config.get('DMM_HTTP_POOL_BLOCK', False),
+            connect_timeout=config.get('DMM_HTTP_CONNECT_TIMEOUT', 5),
+            read_timeout=config.get('DMM_HTTP_READ_TIMEOUT', 15),
+            keepalive=config.get('DMM_HTTP_KEEPALIVE', True),
+            limiter=limiter
+        )
+
+    @property
+    def session(self):
+        """現在のスレッド用のセッションを取得（共有アダプタをマウント済み）"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            if not self.keepalive:
+                session.headers['Connection'] = 'close'
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        """HTTPリクエストを送信（レート制限が設定されていればホストごとの枠内で実行）"""
+        if self.limiter is None:
+            return self.session.request(method, url, **kwargs)
+
+        with ExitStack() as stack:
+            slot = stack.enter_context(self.limiter.slot(urlparse(url).hostname))
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                slot.record(error=e)
+                raise
+            slot.record(status_code=response.status_code)
+            if kwargs.get('stream'):
+                # 本文は呼び出し元が読むため、レスポンスを閉じるまで枠を保持する
+                _release_on_close(response, stack.pop_all().close)
+            return response
+
+    def get(self, url, **kwargs):
+        """GETリクエストを送信"""
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        """HEADリクエストを送信"""
+        kwargs.setdefault('allow_redirects', True)
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        """プール内のコネクションをすべて閉じる"""
+        self.adapter.close()
+
+
+def _release_on_close(response, release):
+    """レスポンスを閉じたときに実行枠を返却する（何度閉じても返却は1回）"""
+    close = response.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            release()
+
+    response.close = close_and_release
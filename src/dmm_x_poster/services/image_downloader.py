@@ -9,6 +9,8 @@ from io import BytesIO
 from flask import current_app
 
 from dmm_x_poster.db.models import db, Image, Product
+from dmm_x_poster.services.http_client import HTTPClient
+from dmm_x_poster.services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,7 @@ class ImageDownloaderService:
     
     def __init__(self, app=None):
         self.images_folder = None
+        self.http = HTTPClient(limiter=rate_limiter)
         if app:
             self.init_app(app)
     
@@ -24,6 +27,10 @@ class ImageDownloaderService:
         """アプリケーションコンテキストから設定を初期化"""
         self.images_folder = os.path.join(app.root_path, app.config.get('IMAGES_FOLDER'))
         
+        # CDNごとのレート制限を共有するHTTPクライアント
+        self.http.close()
+        self.http = HTTPClient.from_config(app.config, limiter=rate_limiter)
+        
         # 画像保存用フォルダがなければ作成
         if not os.path.exists(self.images_folder):
             os.makedirs(self.images_folder)
@@ -59,7 +66,7 @@ class ImageDownloaderService:
                 if is_mp4:
                     # 実際に動画をダウンロード
                     logger.info(f"Downloading movie {image_id} from URL: {image.image_url}")
-                    response = requests.get(image.image_url, timeout=60)  # 動画は大きいので長めのタイムアウト
+                    response = self.http.get(image.image_url, timeout=60)  # 動画は大きいので長めのタイムアウト
                     response.raise_for_status()
                     
                     # ファイル名を決定
@@ -99,7 +106,7 @@ class ImageDownloaderService:
                 try:
                     # 画像をダウンロード
                     logger.info(f"Downloading image {image_id} from URL: {image.image_url}")
-                    response = requests.get(image.image_url, timeout=10)
+                    response = self.http.get(image.image_url, timeout=10)
                     response.raise_for_status()
                     
                     img = PILImage.open(BytesIO(response.content))
@@ -165,7 +172,7 @@ class ImageDownloaderService:
         
         try:
             # 画像URLから取得
-            response = requests.get(product.package_image_url, timeout=10)
+            response = self.http.get(product.package_image_url, timeout=10)
             response.raise_for_status()
             
             # 画像形式を検証
@@ -0,0 +1,318 @@
+"""
+商品取り込みのストリーミングパイプラインモジュール
+
+ページ取得 → 重複除外 → 動画URL解決 → 行データ生成 → 一括保存 の各段を
+上限付きキューでつなぎ、ネットワーク通信とDB書き込みを並行させる。
+DBに触れる段（重複除外と保存）は呼び出し元のスレッドで実行し、
+それ以外の段はそれぞれ専用のスレッドで実行する。
+"""
+import time
+import queue
+import logging
+import threading
+
+from dmm_x_poster.services.db_writer import db_writer
+
+logger = logging.getLogger(__name__)
+
+# 各段の終了を下流に伝える目印
+_DONE = object()
+
+
+class StageStats:
+    """パイプラインの段ごとの処理量と待ち行列の深さ"""
+
+    def __init__(self, name, inbox=None):
+        """
+        Args:
+            name (str): 段の名前
+            inbox (queue.Queue): この段が読み込むキュー
+        """
+        self.name = name
+        self.inbox = inbox
+        self.items = 0
+        self.batches = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def record(self, items, elapsed):
+        """1バッチ分の処理を記録"""
+        with self._lock:
+            self.items += items
+            self.batches += 1
+            self.busy += elapsed
+
+    def observe(self):
+        """キューの深さを記録"""
+        if self.inbox is not None:
+            depth = self.inbox.qsize()
+            with self._lock:
+                self.max_depth = max(self.max_depth, depth)
+
+    def report(self):
+        """統計を取得"""
+        with self._lock:
+            return {
+                'items': self.items,
+                'batches': self.batches,
+                'busy_seconds': round(self.busy, 3),
+                'items_per_second': round(self.items / self.busy, 1) if self.busy else None,
+                'queue_depth': self.inbox.qsize() if self.inbox is not None else None,
+                'max_queue_depth': self.max_depth if self.inbox is not None else None,
+            }
+
+
+class IngestPipeline:
+    """上限付きキューでつないだ商品取り込みパイプライン
+
+    fetch: ページのイテラブルを進める（APIの呼び出しはここで行われる）
+    dedup: バッチ内・実行内の重複と保存済みの商品を除外（呼び出し元スレッド）
+    enrich: 動画URLを解決（後回しにする設定の場合は素通し）
+    build: 商品・画像の行データを生成
+    persist: 行データをまとめてINSERTしてコミット（呼び出し元スレッド）
+
+    キューが埋まると上流の段が待たされるため、メモリ上に保持する商品数は
+    キューの大きさ×ページの件数程度に収まる。
+    """
+
+    STAGES = ('fetch', 'dedup', 'enrich', 'build', 'persist')
+
+    def __init__(self, service, queue_size=4, batch_size=500, poll_interval=0.05):
+        """
+        Args:
+            service (DMMAPIService): 動画URL解決と保存に使うサービス
+            queue_size (int): 段の間のキューに保持できるバッチ数
+            batch_size (int): 1回のコミットで保存する商品数
+            poll_interval (float): 呼び出し元スレッドがキューを確認する間隔（秒）
+        """
+        self.service = service
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.page_queue = queue.Queue(maxsize=queue_size)
+        self.enrich_queue = queue.Queue(maxsize=queue_size)
+        self.build_queue = queue.Queue(maxsize=queue_size)
+        self.persist_queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            'fetch': StageStats('fetch'),
+            'dedup': StageStats('dedup', self.page_queue),
+            'enrich': StageStats('enrich', self.enrich_queue),
+            'build': StageStats('build', self.build_queue),
+            'persist': StageStats('persist', self.persist_queue),
+        }
+        self.saved = 0
+        self.skipped = 0
+        self.error = None
+        self.elapsed = 0.0
+        self._seen = set()
+        self._buffer = []
+        self._stop = threading.Event()
+
+    # --- スレッドで実行する段 ---
+
+    def _put(self, target, item):
+        """停止要求を確認しながらキューに追加（キューが埋まっていれば待つ）"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        """停止要求を確認しながらキューから取り出す"""
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fetch_stage(self, pages):
+        stats = self.stats['fetch']
+        try:
+            iterator = iter(pages)
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    items = next(iterator)
+                except StopIteration:
+                    break
+                stats.record(len(items), time.perf_counter() - started)
+                if items and not self._put(self.page_queue, list(items)):
+                    return
+                self.stats['dedup'].observe()
+        except Exception as e:
+            logger.error(f"Ingest pipeline fetch stage failed: {e}")
+            self.error = e
+        finally:
+            self._put(self.page_queue, _DONE)
+
+    def _enrich_stage(self):
+        stats = self.stats['enrich']
+        while True:
+            items = self._get(self.enrich_queue)
+            if items is _DONE:
+                self._put(self.build_queue, _DONE)
+                return
+            started = time.perf_counter()
+            video_urls = None
+            if not self.service.defer_video_extraction:
+                try:
+                    video_urls = self.service.resolve_video_urls(items)
+                except Exception as e:
+                    # 解決できなかった分は動画URL抽出キューに回す
+                    logger.error(f"Video URL resolution failed, deferring {len(items)} items: {e}")
+            stats.record(len(items), time.perf_counter() - started)
+            self._put(self.build_queue, (items, video_urls))
+            self.stats['build'].observe()
+
+    def _build_stage(self):
+        stats = self.stats['build']
+        while True:
+            batch = self._get(self.build_queue)
+            if batch is _DONE:
+                self._put(self.persist_queue, _DONE)
+                return
+            items, video_urls = batch
+            started = time.perf_counter()
+            bundles = []
+            for item in items:
+                try:
+                    bundles.append(self.service.build_ingest_rows(item, video_urls))
+                except Exception as e:
+                    logger.error(f"Error building rows for product {item.get('content_id')}: {e}")
+            stats.record(len(items), time.perf_counter() - started)
+            self._put(self.persist_queue, bundles)
+            self.stats['persist'].observe()
+
+    # --- 呼び出し元スレッドで実行する段 ---
+
+    def _dedup(self, items):
+        """バッチ内・実行内の重複と保存済みの商品を除外"""
+        started = time.perf_counter()
+        unique = {}
+        for item in items:
+            content_id = item['content_id']
+            if content_id not in self._seen:
+                unique.setdefault(content_id, item)
+        existing = self.service.existing_product_ids(unique)
+        if existing:
+            logger.info(f"Skipping {len(existing)} products that already exist")
+        self.skipped += len(items) - len(unique) + len(existing)
+        self._seen.update(unique)
+        fresh = [item for content_id, item in unique.items() if content_id not in existing]
+        self.stats['dedup'].record(len(items), time.perf_counter() - started)
+        return fresh
+
+    def _persist_ready(self, block=False):
+        """保存段のキューにある行データを取り込み、溜まった分を保存
+
+        Returns:
+            bool: 上流の段がすべて終了した場合True
+        """
+        while True:
+            try:
+                bundles = self.persist_queue.get(timeout=self.poll_interval) if block \
+                    else self.persist_queue.get_nowait()
+            except queue.Empty:
+                return False
+            if bundles is _DONE:
+                self._flush()
+                return True
+            self._buffer.extend(bundles)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        """溜まった行データを保存してコミット"""
+        if not self._buffer:
+            return
+        bundles, self._buffer = self._buffer, []
+        started = time.perf_counter()
+        # 単一書き込みスレッドが有効な場合はそちらで保存する（行データだけを渡す）
+        self.saved += db_writer.run(self.service.persist_ingest_rows, bundles)
+        self.stats['persist'].record(len(bundles), time.perf_counter() - started)
+
+    def _hand_off(self, items):
+        """重複除外の結果を動画URL解決段に渡す（待つ間は保存を進める）"""
+        while True:
+            try:
+                self.enrich_queue.put(items, timeout=self.poll_interval)
+                self.stats['enrich'].observe()
+                return
+            except queue.Full:
+                self._persist_ready()
+
+    def run(self, pages):
+        """パイプラインを実行
+
+        Args:
+            pages (iterable): アイテムリストのイテラブル（ジェネレータの場合は取得段のスレッドで進める）
+
+        Returns:
+            int: 新規保存した商品数
+        
+        Raises:
+            Exception: 取得段で発生した例外（取得済みのページを保存し終えてから送出する）
+        """
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._fetch_stage, args=(pages,), name='ingest-fetch', daemon=True),
+            threading.Thread(target=self._enrich_stage, name='ingest-enrich', daemon=True),
+            threading.Thread(target=self._build_stage, name='ingest-build', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                self._persist_ready()
+                try:
+                    items = self.page_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+                if items is _DONE:
+                    break
+                fresh = self._dedup(items)
+                if fresh:
+                    self._hand_off(fresh)
+            self._hand_off(_DONE)
+            while not self._persist_ready(block=True):
+                pass
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - started
+
+        logger.info(f"Ingest pipeline finished: {self.saved} saved, {self.skipped} skipped "
+                    f"in {self.elapsed:.2f}s ({self.summary()})")
+        if self.error is not None:
+            raise self.error
+        return self.saved
+
+    def report(self):
+        """段ごとの統計を取得"""
+        return {
+            'saved': self.saved,
+            'skipped': self.skipped,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'error': str(self.error) if self.error else None,
+            'stages': {name: self.stats[name].report() for name in self.STAGES},
+        }
+
+    def summary(self):
+        """ログ出力用の段ごとの処理量"""
+        return ', '.join(
+            f"{name} {self.stats[name].items} items/{self.stats[name].busy:.2f}s "
+            f"max queue {self.stats[name].max_depth}"
+            for name in self.STAGES
+        )
+
+
+def paginate(items, size):
+    """アイテムリストを一定件数ごとのページに分割"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
@@ -0,0 +1,118 @@
+"""
+商品ページの解析を別プロセスで行うプールモジュール
+
+HTMLの解析はCPU処理のため、スレッドで並列にダウンロードしてもGILにより
+1コアしか使えない。解析部分だけをプロセスプールに渡すことで複数コアを使う。
+ワーカーにはページのバイト列を渡し、抽出した動画URLだけを受け取る。
+"""
+import os
+import sys
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from dmm_x_poster.services.video_extractor import extract_video_url
+
+logger = logging.getLogger(__name__)
+
+# ProcessPoolExecutorのmax_tasks_per_childは3.11以降、shutdownのcancel_futuresは3.9以降
+MAX_TASKS_PER_CHILD_SUPPORTED = sys.version_info >= (3, 11)
+CANCEL_FUTURES_SUPPORTED = sys.version_info >= (3, 9)
+
+
+def resolve_process_count(value):
+    """設定値からプロセス数を決定（'auto'でCPUコア数、0以下で無効）"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value == 'auto':
+            return os.cpu_count() or 1
+        value = int(value or 0)
+    return max(0, int(value or 0))
+
+
+class ParsePool:
+    """動画URL抽出の解析部分を実行するプロセスプール
+
+    processesが0の場合は呼び出し元のスレッドでそのまま解析する。
+    プールは最初の解析時に起動し、ワーカーが異常終了した場合は
+    その回だけ呼び出し元で解析してから次回に作り直す。
+    """
+
+    def __init__(self, processes=0, max_tasks_per_child=None, timeout=30):
+        """
+        Args:
+            processes (int or str): ワーカープロセス数（'auto'でCPUコア数、0で無効）
+            max_tasks_per_child (int): ワーカーを作り直すまでの解析数（Noneで作り直さない）
+            timeout (float): 1ページの解析を待つ秒数
+        """
+        self.processes = resolve_process_count(processes)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Flaskの設定値からプールを生成"""
+        return cls(
+            processes=config.get('DMM_PARSE_PROCESSES', 0),
+            max_tasks_per_child=config.get('DMM_PARSE_MAX_TASKS_PER_CHILD'),
+        )
+
+    @property
+    def enabled(self):
+        """プロセスプールを使うかどうか"""
+        return self.processes > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # スレッドを持つプロセスからのforkは安全でないためspawnで起動する
+                kwargs = {}
+                if self.max_tasks_per_child and MAX_TASKS_PER_CHILD_SUPPORTED:
+                    kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+                elif self.max_tasks_per_child:
+                    logger.warning("DMM_PARSE_MAX_TASKS_PER_CHILD requires Python 3.11+, ignoring it")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    **kwargs
+                )
+                logger.info(f"Started parse pool with {self.processes} processes")
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        _shutdown(executor, wait=False)
+
+    def extract(self, content, encoding='utf-8'):
+        """商品ページのHTMLから動画URLを抽出（extract_video_urlと同じ結果）"""
+        if not self.enabled:
+            return extract_video_url(content, encoding)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(extract_video_url, content, encoding).result(timeout=self.timeout)
+        except BrokenProcessPool as e:
+            logger.error(f"Parse pool worker died, parsing inline: {e}")
+            self._discard(executor)
+            return extract_video_url(content, encoding)
+
+    def close(self):
+        """ワーカープロセスを終了"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            _shutdown(executor, wait=True)
+
+
+def _shutdown(executor, wait):
+    """未着手の解析を取り消してプールを終了"""
+    if CANCEL_FUTURES_SUPPORTED:
+        executor.shutdown(wait=wait, cancel_futures=True)
+    else:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,191 @@
+"""
+DMM向け外部通信のレート制限・同時実行数制御モジュール
+
+ホストごとにトークンバケット（秒間リクエスト数）と同時実行数の上限を持ち、
+429/5xx/通信エラーを検知すると同時実行数を半減（乗算的減少）、
+成功が続くと徐々に戻す（加算的増加）AIMD方式で調整する。
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ホストごとの既定値（秒間リクエスト数, バースト, 最大同時実行数）
+DEFAULT_HOST_LIMITS = {
+    'api.dmm.com': (5.0, 5, 4),        # DMM API
+    'www.dmm.co.jp': (2.0, 4, 4),      # 商品ページ
+    'al.dmm.co.jp': (2.0, 4, 4),       # アフィリエイトリンク経由の商品ページ
+    'cc3001.dmm.co.jp': (2.0, 2, 2),   # サンプル動画CDN
+    'pics.dmm.co.jp': (10.0, 10, 8),   # 画像CDN
+}
+DEFAULT_LIMIT = (5.0, 5, 4)
+
+# スロットリングとみなすステータスコード
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): 1秒あたりに補充するトークン数
+            burst (int): バケットの容量
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """トークンを1つ取得（足りなければ補充まで待機）
+
+        Returns:
+            float: 待機した秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostGovernor:
+    """1ホスト分のレート制限とAIMDによる同時実行数制御"""
+
+    def __init__(self, host, rate, burst, max_concurrency, min_concurrency=1,
+                 increase=1.0, decrease=0.5):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """同時実行枠とトークンを確保"""
+        started = time.monotonic()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        self.bucket.acquire()
+        with self._cond:
+            self.wait_seconds += time.monotonic() - started
+
+    def release(self, throttled=False):
+        """同時実行枠を返却し、結果に応じて上限を調整"""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                previous = self.limit
+                self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                if int(previous) != int(self.limit):
+                    logger.warning(f"Throttling detected on {self.host}, concurrency {previous:.1f} -> {self.limit:.1f}")
+            else:
+                self.successes += 1
+                # 1ウィンドウ（現在の上限分）成功するごとに+increase
+                self.limit = min(self.max_concurrency, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+    def metrics(self):
+        """現在の状態を取得"""
+        return {
+            'rate_per_second': self.bucket.rate,
+            'burst': self.bucket.burst,
+            'concurrency_limit': round(self.limit, 2),
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'successes': self.successes,
+            'throttled': self.throttled,
+            'wait_seconds': round(self.wait_seconds, 3),
+        }
+
+
+class RequestSlot:
+    """1リクエスト分の実行枠（結果を記録して返却する）"""
+
+    def __init__(self):
+        self.throttled = False
+
+    def record(self, status_code=None, error=None):
+        """レスポンスまたは例外を記録"""
+        if error is not None or status_code in THROTTLE_STATUS:
+            self.throttled = True
+
+
+class RateLimiter:
+    """ホストごとのHostGovernorを管理する共有レートリミッター"""
+
+    def __init__(self, app=None):
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        self.default_limit = DEFAULT_LIMIT
+        self.enabled = True
+        self._governors = {}
+        self._lock = threading.Lock()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """アプリケーション設定からホストごとの上限を初期化"""
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        self.host_limits.update(app.config.get('RATE_LIMIT_HOSTS') or {})
+        self.default_limit = app.config.get('RATE_LIMIT_DEFAULT', DEFAULT_LIMIT)
+        with self._lock:
+            self._governors = {}
+
+    def governor(self, host):
+        """ホストのHostGovernorを取得（なければ生成）"""
+        with self._lock:
+            governor = self._governors.get(host)
+            if governor is None:
+                rate, burst, max_concurrency = self.host_limits.get(host, self.default_limit)
+                governor = HostGovernor(host, rate, burst, max_concurrency)
+                self._governors[host] = governor
+            return governor
+
+    @contextmanager
+    def slot(self, host):
+        """ホストへの1リクエスト分の実行枠を確保するコンテキストマネージャ"""
+        if not self.enabled or not host:
+            yield RequestSlot()
+            return
+        governor = self.governor(host)
+        governor.acquire()
+        slot = RequestSlot()
+        try:
+            yield slot
+        finally:
+            governor.release(slot.throttled)
+
+    def metrics(self):
+        """全ホストの現在のレートと同時実行数を取得"""
+        with self._lock:
+            governors = list(self._governors.values())
+        return {governor.host: governor.metrics() for governor in governors}
+
+
+# アプリケーションファクトリで初期化するためのインスタンス
+rate_limiter = RateLimiter()
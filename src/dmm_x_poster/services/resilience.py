@@ -0,0 +1,106 @@
+"""
+外部API呼び出しのリトライ・サーキットブレーカーモジュール
+"""
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# リトライ対象とするステータスコード
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0, rng=random):
+    """ジッター付き指数バックオフの待機時間を計算（Full Jitter方式）
+
+    Args:
+        attempt (int): 何回目のリトライか（0始まり）
+        base (float): 初回の最大待機時間（秒）
+        cap (float): 待機時間の上限（秒）
+
+    Returns:
+        float: 待機する秒数
+    """
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """連続失敗時に一定時間呼び出しを遮断するサーキットブレーカー
+
+    closed: 通常状態。連続失敗がしきい値に達するとopenへ
+    open: 呼び出しを即座に拒否。reset_timeout経過後にhalf_openへ
+    half_open: 試行を1件だけ許可し、成功でclosed、失敗で再びopenへ
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0):
+        """
+        Args:
+            name (str): ログに出力する名前
+            failure_threshold (int): openにする連続失敗回数
+            reset_timeout (float): openからhalf_openに移るまでの秒数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """呼び出してよいかを判定
+
+        Returns:
+            bool: 呼び出してよい場合True
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, allowing a trial request")
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        """呼び出しの成功を記録"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """呼び出しの失敗を記録"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def metrics(self):
+        """現在の状態を取得"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,66 @@
+"""
+有効期限とサイズ上限付きのメモ化キャッシュモジュール
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTLCache:
+    """スレッドセーフなTTL付きLRUキャッシュ"""
+
+    def __init__(self, maxsize=256, ttl=300):
+        """
+        Args:
+            maxsize (int): 保持する最大エントリ数（超えた分は最も古く使われたものから削除）
+            ttl (float): エントリの有効期間（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """有効なエントリを取得（なければNone）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """エントリを保存"""
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """全エントリを削除"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """ヒット数・ミス数などの統計を取得"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
@@ -0,0 +1,259 @@
+"""
+動画URL抽出キューを処理するバックグラウンドワーカーモジュール
+
+商品の保存時に登録された「動画URL未取得」のタスクを優先度順に取り出し、
+DMMAPIServiceのスレッドプールで動画URLを解決して（content_idからの導出、
+見つからなければ商品ページからの抽出）movieタイプの画像として追加する。
+"""
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update
+
+from dmm_x_poster.config import JST
+from dmm_x_poster.db.models import db, Product, Image, VideoEnrichmentTask
+from dmm_x_poster.services.db_writer import db_writer
+from dmm_x_poster.services.dmm_api import dmm_api_service
+
+logger = logging.getLogger(__name__)
+
+# 詳細ページを開かれた商品に割り当てる優先度
+INTERACTIVE_PRIORITY = 100
+
+
+class VideoEnrichmentService:
+    """動画URL抽出キューの処理を行うサービスクラス"""
+
+    JOB_ID = 'enrich_videos'
+
+    def __init__(self, app=None):
+        self.batch_size = 50
+        self.max_attempts = 3
+        self.stale_after = 600
+        self.scheduler = None
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """アプリケーションコンテキストから設定を初期化"""
+        self.batch_size = app.config.get('VIDEO_ENRICHMENT_BATCH_SIZE', 50)
+        self.max_attempts = app.config.get('VIDEO_ENRICHMENT_MAX_ATTEMPTS', 3)
+        self.stale_after = app.config.get('VIDEO_ENRICHMENT_STALE_AFTER', 600)
+
+    def attach_scheduler(self, scheduler):
+        """優先度を上げた際に即時実行させるスケジューラを登録"""
+        self.scheduler = scheduler
+
+    def pending_count(self):
+        """未処理のタスク数を取得"""
+        return VideoEnrichmentTask.query.filter(
+            VideoEnrichmentTask.status.in_(('pending', 'running'))
+        ).count()
+
+    def is_pending(self, product_id):
+        """商品の動画URL抽出が未完了かどうか"""
+        return db.session.query(
+            select(VideoEnrichmentTask.id).where(
+                VideoEnrichmentTask.product_id == product_id,
+                VideoEnrichmentTask.status.in_(('pending', 'running'))
+            ).exists()
+        ).scalar()
+
+    def prioritize(self, product_id):
+        """商品のタスクをキューの先頭に移動し、ワーカーを即時起動
+
+        詳細ページの表示ごとに呼ばれるため、まず読み込みだけで状態を確認し、
+        優先度を上げていない未処理のタスクがある場合だけ書き込む。
+
+        Returns:
+            bool: 未処理のタスクがあった場合True
+        """
+        task = db.session.execute(
+            select(VideoEnrichmentTask.status, VideoEnrichmentTask.priority)
+            .where(VideoEnrichmentTask.product_id == product_id)
+        ).first()
+        if task is None or task.status not in ('pending', 'running'):
+            return False
+        if task.status == 'running' or task.priority >= INTERACTIVE_PRIORITY:
+            return True
+
+        if db_writer.run(self._prioritize, product_id):
+            logger.info(f"Prioritized video enrichment for product {product_id}")
+            self.wake_up()
+        return self.is_pending(product_id)
+
+    def _prioritize(self, product_id):
+        return db.session.execute(
+            update(VideoEnrichmentTask).where(
+                VideoEnrichmentTask.product_id == product_id,
+                VideoEnrichmentTask.status == 'pending',
+                VideoEnrichmentTask.priority < INTERACTIVE_PRIORITY
+            ).values(priority=INTERACTIVE_PRIORITY, updated_at=datetime.now(JST))
+        ).rowcount
+
+    def wake_up(self):
+        """ワーカーのジョブを次の周期を待たずに実行させる"""
+        if self.scheduler is None:
+            return
+        try:
+            self.scheduler.modify_job(self.JOB_ID, next_run_time=datetime.now(JST))
+        except Exception as e:
+            logger.warning(f"Could not wake up video enrichment worker: {e}")
+
+    def _requeue_stale(self):
+        """処理中のまま放置されたタスク（ワーカー停止時など）を未処理に戻す"""
+        threshold = datetime.now(JST) - timedelta(seconds=self.stale_after)
+        db.session.execute(
+            update(VideoEnrichmentTask).where(
+                VideoEnrichmentTask.status == 'running',
+                VideoEnrichmentTask.updated_at < threshold
+            ).values(status='pending')
+        )
+
+    def claim_batch(self, limit=None):
+        """優先度の高い順にタスクを取り出して処理中にする
+
+        Returns:
+            list: (タスクID, 商品ID, 商品ページURL, DMM商品ID)のリスト
+        """
+        return db_writer.run(self._claim, limit)
+
+    def _claim(self, limit):
+        self._requeue_stale()
+        # 選択と更新を1つのUPDATE文で行い、実際に更新した行だけを受け取る
+        # （複数のワーカーが同じタスクを取り出さないように、status='pending'を更新時に再確認する）
+        candidates = (
+            select(VideoEnrichmentTask.id)
+            .where(VideoEnrichmentTask.status == 'pending')
+            .order_by(VideoEnrichmentTask.priority.desc(), VideoEnrichmentTask.id)
+            .limit(limit or self.batch_size)
+        )
+        claimed = db.session.execute(
+            update(VideoEnrichmentTask)
+            .where(VideoEnrichmentTask.id.in_(candidates.scalar_subquery()),
+                   VideoEnrichmentTask.status == 'pending')
+            .values(status='running', attempts=VideoEnrichmentTask.attempts + 1,
+                    updated_at=datetime.now(JST))
+            .returning(VideoEnrichmentTask.id)
+        ).scalars().all()
+        if not claimed:
+            return []
+        return db.session.execute(
+            select(VideoEnrichmentTask.id, VideoEnrichmentTask.product_id, VideoEnrichmentTask.page_url,
+                   Product.dmm_product_id)
+            .join(Product, Product.id == VideoEnrichmentTask.product_id)
+            .where(VideoEnrichmentTask.id.in_(claimed))
+            .order_by(VideoEnrichmentTask.priority.desc(), VideoEnrichmentTask.id)
+        ).all()
+
+    def process_batch(self, limit=None):
+        """キューから1バッチ分のタスクを処理
+
+        HTTP通信と解析はスレッドプールで並列に行い、DBへの書き込みは
+        通信の前後にそれぞれ短いトランザクションでまとめて行う。
+
+        Returns:
+            int: 動画URLを追加した商品数
+        """
+        tasks = self.claim_batch(limit)
+        if not tasks:
+            return 0
+
+        failures = {}
+        try:
+            video_urls = dmm_api_service.resolve_video_urls([
+                {'content_id': task.dmm_product_id, 'URL': task.page_url} for task in tasks
+            ], failures)
+        except Exception as e:
+            logger.error(f"Video enrichment batch failed: {e}")
+            self._release(tasks, str(e))
+            return 0
+
+        found = db_writer.run(self._record, tasks, video_urls, failures)
+        logger.info(f"Video enrichment processed {len(tasks)} tasks, found {found} videos, "
+                    f"{len(failures)} failed ({self.pending_count()} remaining)")
+        return found
+
+    def _record(self, tasks, video_urls, failures=None):
+        """解決した動画URLを画像として追加し、タスクを完了にする
+
+        商品ページの取得・解析に失敗したタスクは完了にせず、未処理に戻す
+        （試行回数の上限に達したものは失敗扱い）。
+
+        Returns:
+            int: 動画URLを追加した商品数
+        """
+        failures = failures or {}
+        failed = {}
+        for task in tasks:
+            if task.page_url in failures:
+                failed.setdefault(failures[task.page_url], []).append(task.id)
+        for error, ids in failed.items():
+            self._release_ids(ids, error)
+        tasks = [task for task in tasks if task.page_url not in failures]
+        if not tasks:
+            return 0
+
+        now = datetime.now(JST)
+        existing = set(db.session.execute(
+            select(Image.product_id).where(
+                Image.product_id.in_([task.product_id for task in tasks]),
+                Image.image_type == 'movie'
+            )
+        ).scalars())
+        image_rows = [
+            {
+                'product_id': task.product_id,
+                'image_url': video_urls[task.page_url],
+                'image_type': 'movie',
+                'downloaded': False,
+                'selected': False,
+                'created_at': now,
+            }
+            for task in tasks
+            if video_urls.get(task.page_url) and task.product_id not in existing
+        ]
+        if image_rows:
+            db.session.execute(insert(Image), image_rows)
+        db.session.execute(
+            update(VideoEnrichmentTask)
+            .where(VideoEnrichmentTask.id.in_([task.id for task in tasks]))
+            .values(status='done', last_error=None, updated_at=now)
+        )
+        return len(image_rows)
+
+    def _release(self, tasks, error):
+        """失敗したタスクを未処理に戻す（試行回数の上限に達したものは失敗扱い）"""
+        db.session.rollback()
+        db_writer.run(self._release_ids, [task.id for task in tasks], error)
+
+    def _release_ids(self, ids, error):
+        now = datetime.now(JST)
+        db.session.execute(
+            update(VideoEnrichmentTask)
+            .where(VideoEnrichmentTask.id.in_(ids), VideoEnrichmentTask.attempts >= self.max_attempts)
+            .values(status='failed', last_error=error, updated_at=now)
+        )
+        db.session.execute(
+            update(VideoEnrichmentTask)
+            .where(VideoEnrichmentTask.id.in_(ids), VideoEnrichmentTask.status == 'running')
+            .values(status='pending', last_error=error, updated_at=now)
+        )
+
+    def drain(self, max_batches=None):
+        """キューが空になるまで（または指定バッチ数まで）処理
+
+        Returns:
+            int: 動画URLを追加した商品数
+        """
+        found = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            if not VideoEnrichmentTask.query.filter_by(status='pending').first():
+                break
+            found += self.process_batch()
+            batches += 1
+        return found
+
+
+# アプリケーションファクトリで初期化するためのインスタンス
+video_enrichment_service = VideoEnrichmentService()
@@ -0,0 +1,261 @@
+"""
+商品ページのHTMLからサンプル動画URLを抽出するモジュール
+
+まずバイト列に対するコンパイル済み正規表現でJSON-LDとscript要素だけを走査し、
+見つからない場合に限りBeautifulSoupによる従来の全体パースへフォールバックする。
+ネットワークやDBに依存しない純粋な関数のみで構成している。
+"""
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 動画URLに必ず含まれる文字列（これがなければ解析不要）
+LITEVIDEO_MARKER = b'litevideo'
+LITEVIDEO_HOST = 'cc3001.dmm.co.jp/litevideo'
+
+# 年齢認証ページの判定文字列
+AGE_CHECK_MARKERS = ('年齢確認'.encode('utf-8'), 'あなたは18歳以上ですか'.encode('utf-8'))
+
+# JSON-LDブロックとscript要素の本文
+JSONLD_RE = re.compile(
+    rb'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+SCRIPT_RE = re.compile(rb'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+
+# script内の動画URLパターン（優先順）
+SCRIPT_PATTERNS = [
+    re.compile(rb'contentUrl[\s:"\']+([^"\']+cc3001\.dmm\.co\.jp/litevideo/[^"\']+\.mp4)["\']'),
+    re.compile(rb'(https://cc3001\.dmm\.co\.jp/litevideo/freepv/[^\'"]+\.mp4)'),
+    re.compile(rb'(https?://cc3001\.dmm\.co\.jp/litevideo/[^\'"]+\.mp4)'),
+]
+# ページ全体を対象にした最後の手段のパターン
+BROAD_PATTERN = re.compile(rb'(https://cc3001\.dmm\.co\.jp/litevideo/[^\'"]+\.mp4)')
+
+# ストリーミング取得時に1回で読み込むバイト数
+STREAM_CHUNK_SIZE = 16 * 1024
+SCRIPT_OPEN = b'<script'
+
+# サンプル動画の配信URL（content_idから導出できる）
+LITEVIDEO_BASE_URL = 'https://cc3001.dmm.co.jp'
+LITEVIDEO_URL_TEMPLATE = '{base}/litevideo/freepv/{head}/{prefix}/{cid}/{cid}_dm_w.mp4'
+# APIのsampleMovieURLに含まれる動画のcid
+SAMPLE_MOVIE_CID_RE = re.compile(r'/cid=([0-9a-z_]+)/')
+
+# フォールバック用（文字列版）
+TEXT_SCRIPT_PATTERNS = [re.compile(p.pattern.decode('ascii')) for p in SCRIPT_PATTERNS]
+TEXT_BROAD_PATTERN = re.compile(BROAD_PATTERN.pattern.decode('ascii'))
+
+
+def to_dm_w_url(video_url):
+    """動画URLを_dm_w.mp4形式に変換"""
+    if video_url and video_url.endswith('.mp4'):
+        # .mp4の前に_dm_wを挿入
+        modified_url = video_url.replace('.mp4', '_dm_w.mp4')
+        logger.debug(f"Modified video URL from {video_url} to {modified_url}")
+        return modified_url
+    return video_url
+
+
+def litevideo_url_for_cid(cid, base=LITEVIDEO_BASE_URL):
+    """cidから_dm_w.mp4形式の動画URLを導出"""
+    cid = (cid or '').strip().lower()
+    if len(cid) < 3:
+        return None
+    return LITEVIDEO_URL_TEMPLATE.format(base=base.rstrip('/'), head=cid[0], prefix=cid[:3], cid=cid)
+
+
+def video_url_candidates(item, base=LITEVIDEO_BASE_URL):
+    """APIのアイテムから動画URLの候補を優先順に生成（商品ページは取得しない）
+
+    sampleMovieURLに含まれるcidを優先し、次にcontent_idから導出する。
+
+    Args:
+        item (dict): APIのアイテム
+        base (str): 動画配信サーバーのURL
+
+    Returns:
+        list: 動画URLの候補（重複なし）
+    """
+    cids = []
+    for url in (item.get('sampleMovieURL') or {}).values():
+        if isinstance(url, str):
+            match = SAMPLE_MOVIE_CID_RE.search(url)
+            if match:
+                cids.append(match.group(1))
+    cids.append(item.get('content_id'))
+
+    candidates = []
+    for cid in cids:
+        url = litevideo_url_for_cid(cid, base)
+        if url and url not in candidates:
+            candidates.append(url)
+    return candidates
+
+
+def is_age_verification_page(content):
+    """年齢認証ページかどうかを判定"""
+    return all(marker in content for marker in AGE_CHECK_MARKERS)
+
+
+def _video_url_from_jsonld(data):
+    """JSON-LDのProduct構造体からVideoObjectのcontentUrlを取得"""
+    if isinstance(data, dict) and data.get('@type') == 'Product':
+        subject = data.get('subjectOf')
+        if isinstance(subject, dict) and subject.get('@type') == 'VideoObject':
+            content_url = subject.get('contentUrl')
+            if content_url and LITEVIDEO_HOST in content_url:
+                return content_url
+    return None
+
+
+def _video_url_from_jsonld_block(block):
+    """JSON-LDブロックの本文から動画URLを取得"""
+    if LITEVIDEO_MARKER not in block:
+        return None
+    try:
+        return _video_url_from_jsonld(json.loads(block))
+    except ValueError as e:
+        logger.debug(f"Error parsing JSONLD: {e}")
+        return None
+
+
+def scan_stream(chunks, byte_budget=None):
+    """分割して届く本文を読みながらJSON-LDの動画URLを探し、見つかった時点で読み込みを止める
+
+    閉じたJSON-LDブロックだけを走査対象とし、未完了のscript要素の開始位置から
+    次のチャンクで走査を再開する（読み込み済みの部分を何度も走査しない）。
+    JSON-LD以外での抽出は、読み込んだ本文に対してextract_video_urlで行う。
+
+    Args:
+        chunks (iterable): 本文のバイト列のイテラブル（response.iter_contentなど）
+        byte_budget (int): 読み込む最大バイト数（Noneで無制限）
+
+    Returns:
+        tuple: (読み込んだ本文, 終了理由)
+            終了理由は'match'（JSON-LDで発見）, 'budget'（上限に到達）, 'eof'（最後まで読んだ）
+    """
+    buffer = bytearray()
+    pos = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        for match in JSONLD_RE.finditer(buffer, pos):
+            pos = match.end()
+            if _video_url_from_jsonld_block(match.group(1)):
+                return bytes(buffer), 'match'
+        # 閉じていないscript要素があればその開始位置から、なければ末尾付近から再開
+        open_tag = buffer.rfind(SCRIPT_OPEN, pos)
+        pos = open_tag if open_tag >= 0 else max(pos, len(buffer) - len(SCRIPT_OPEN))
+        if byte_budget is not None and len(buffer) >= byte_budget:
+            return bytes(buffer), 'budget'
+    return bytes(buffer), 'eof'
+
+
+def find_video_url_fast(content):
+    """バイト列を正規表現で走査して動画URLを探す（変換前のURLを返す）
+
+    Args:
+        content (bytes): 商品ページのHTML
+
+    Returns:
+        str: 見つかった動画URL（見つからない場合はNone）
+    """
+    # JSON-LD（最も信頼性の高い方法）
+    for match in JSONLD_RE.finditer(content):
+        video_url = _video_url_from_jsonld_block(match.group(1))
+        if video_url:
+            logger.debug("Found video URL in JSONLD (fast path)")
+            return video_url
+
+    # script要素の本文
+    for match in SCRIPT_RE.finditer(content):
+        body = match.group(1)
+        if LITEVIDEO_MARKER not in body:
+            continue
+        for pattern in SCRIPT_PATTERNS:
+            found = pattern.search(body)
+            if found:
+                logger.debug("Found video URL in script (fast path)")
+                return found.group(1).decode('utf-8', errors='replace')
+
+    # ページ全体
+    found = BROAD_PATTERN.search(content)
+    if found:
+        return found.group(1).decode('utf-8', errors='replace')
+    return None
+
+
+def find_video_url_soup(text):
+    """BeautifulSoupでページ全体をパースして動画URLを探す（変換前のURLを返す）
+
+    Args:
+        text (str): 商品ページのHTML
+
+    Returns:
+        str: 見つかった動画URL（見つからない場合はNone）
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(text, 'lxml')
+
+    # JSONLDを探す（最も信頼性の高い方法）
+    jsonld_scripts = soup.find_all('script', type='application/ld+json')
+    logger.debug(f"Found {len(jsonld_scripts)} JSONLD scripts")
+
+    for script in jsonld_scripts:
+        if not script.string:
+            continue
+        try:
+            video_url = _video_url_from_jsonld(json.loads(script.string))
+            if video_url:
+                logger.debug("Found VideoObject in JSONLD")
+                return video_url
+        except Exception as e:
+            logger.error(f"Error parsing JSONLD: {e}")
+
+    # 全スクリプトタグを調査（バックアップ方法）
+    scripts = soup.find_all('script')
+    logger.debug(f"Searching through {len(scripts)} script tags")
+
+    for script in scripts:
+        if not script.string:
+            continue
+        for pattern in TEXT_SCRIPT_PATTERNS:
+            match = pattern.search(script.string)
+            if match:
+                return match.group(1)
+
+    # HTMLソース全体で検索（最後の手段）
+    if LITEVIDEO_HOST in text:
+        broader_match = TEXT_BROAD_PATTERN.search(text)
+        if broader_match:
+            return broader_match.group(1)
+    return None
+
+
+def extract_video_url(content, encoding='utf-8'):
+    """商品ページのHTMLから_dm_w.mp4形式の動画URLを抽出
+
+    高速パスで見つからず、かつページに動画URLの痕跡がある場合のみ
+    BeautifulSoupによる解析にフォールバックする。
+
+    Args:
+        content (bytes): 商品ページのHTML
+        encoding (str): フォールバック時に使う文字コード
+
+    Returns:
+        str: 動画URL（見つからない場合はNone）
+    """
+    if LITEVIDEO_MARKER not in content:
+        return None
+
+    video_url = find_video_url_fast(content)
+    if video_url is None:
+        logger.debug("Fast extractor missed, falling back to BeautifulSoup")
+        video_url = find_video_url_soup(content.decode(encoding or 'utf-8', errors='replace'))
+
+    return to_dm_w_url(video_url) if video_url else None
@@ -106,6 +106,41 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
     
+    // ジャンル・女優名の入力候補（カンマ区切りの最後の項目を補完）
+    const catalogInputs = document.querySelectorAll('input[data-catalog]');
+    catalogInputs.forEach((input, index) => {
+        const datalist = document.createElement('datalist');
+        datalist.id = `catalog-suggest-${index}`;
+        input.setAttribute('list', datalist.id);
+        input.after(datalist);
+        
+        let timer = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const terms = input.value.split(/[,、]/);
+            const prefix = terms.pop().trim();
+            if (!prefix || /^\d+$/.test(prefix)) {
+                datalist.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(() => {
+                const params = new URLSearchParams({kind: input.dataset.catalog, q: prefix});
+                fetch(`/api/catalog/suggest?${params}`)
+                    .then(response => response.ok ? response.json() : [])
+                    .then(entries => {
+                        const head = terms.map(term => term.trim()).filter(term => term);
+                        datalist.innerHTML = '';
+                        entries.forEach(entry => {
+                            const option = document.createElement('option');
+                            option.value = head.concat(entry.name).join(',');
+                            option.label = entry.ruby ? `${entry.name}（${entry.ruby}） ID: ${entry.id}` : `ID: ${entry.id}`;
+                            datalist.appendChild(option);
+                        });
+                    });
+            }, 150);
+        });
+    });
+    
     // フォームバリデーション
     const forms = document.querySelectorAll('.needs-validation');
     Array.from(forms).forEach(form => {
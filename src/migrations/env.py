@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from dmm_x_poster.db.models import PRODUCT_FTS_TABLE
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -51,6 +53,14 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_name(name, type_, parent_names):
+    # 全文検索インデックス（FTS5の仮想テーブルとシャドウテーブル）はモデルの外で
+    # マイグレーションが作成するため、autogenerateで削除対象にしない
+    if type_ == 'table':
+        return not name.startswith(PRODUCT_FTS_TABLE)
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +75,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -100,6 +111,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_name=include_name,
             **conf_args
         )
 
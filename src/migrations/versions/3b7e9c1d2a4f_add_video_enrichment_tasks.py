@@ -0,0 +1,40 @@
+"""Add video enrichment tasks
+
+Revision ID: 3b7e9c1d2a4f
+Revises: f5ad250b01c2
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e9c1d2a4f'
+down_revision = 'f5ad250b01c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('video_enrichment_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('page_url', sa.Text(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id')
+    )
+    op.create_index('ix_video_enrichment_tasks_status_priority', 'video_enrichment_tasks',
+                    ['status', 'priority', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_video_enrichment_tasks_status_priority', table_name='video_enrichment_tasks')
+    op.drop_table('video_enrichment_tasks')
@@ -0,0 +1,33 @@
+"""Add catalog entries
+
+Revision ID: 5e1f7a3c9b2d
+Revises: 8c4d2e6f1a9b
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f7a3c9b2d'
+down_revision = '8c4d2e6f1a9b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('dmm_id', sa.String(length=50), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('ruby', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'dmm_id', name='uq_catalog_entries_kind_dmm_id')
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_entries')
@@ -0,0 +1,38 @@
+"""Add saved searches
+
+Revision ID: 8c4d2e6f1a9b
+Revises: 3b7e9c1d2a4f
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a9b'
+down_revision = '3b7e9c1d2a4f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('saved_searches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('floor', sa.String(length=20), nullable=False),
+    sa.Column('sort', sa.String(length=20), nullable=False),
+    sa.Column('genre_ids', sa.Text(), nullable=True),
+    sa.Column('actress_ids', sa.Text(), nullable=True),
+    sa.Column('release_status', sa.String(length=20), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_result', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('saved_searches')
@@ -0,0 +1,134 @@
+"""Add normalized actress, genre and maker tables
+
+Revision ID: 9a3d6b1f4c8e
+Revises: 5e1f7a3c9b2d
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3d6b1f4c8e'
+down_revision = '5e1f7a3c9b2d'
+branch_labels = None
+depends_on = None
+
+# 既存商品の移行を1回に読み込む件数
+BACKFILL_BATCH = 1000
+# INクエリ1回あたりのパラメータ数
+IN_CHUNK = 500
+
+
+def upgrade():
+    for name in ('actresses', 'genres', 'makers'):
+        op.create_table(name,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+    op.create_table('product_actresses',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('actress_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['actress_id'], ['actresses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'actress_id')
+    )
+    op.create_index('ix_product_actresses_actress_id_product_id', 'product_actresses',
+                    ['actress_id', 'product_id'], unique=False)
+    op.create_table('product_genres',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'genre_id')
+    )
+    op.create_index('ix_product_genres_genre_id_product_id', 'product_genres',
+                    ['genre_id', 'product_id'], unique=False)
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(sa.Column('maker_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_products_maker_id', ['maker_id'], unique=False)
+        batch_op.create_foreign_key('fk_products_maker_id_makers', 'makers', ['maker_id'], ['id'])
+
+    backfill(op.get_bind())
+
+
+def backfill(connection):
+    """保存済み商品のJSON列から正規化テーブルを作成"""
+    products = sa.table('products', sa.column('id', sa.Integer), sa.column('actresses', sa.Text),
+                        sa.column('genres', sa.Text), sa.column('maker', sa.Text),
+                        sa.column('maker_id', sa.Integer))
+    name_tables = {name: sa.table(name, sa.column('id', sa.Integer), sa.column('name', sa.String))
+                   for name in ('actresses', 'genres', 'makers')}
+    link_tables = {
+        'actresses': (sa.table('product_actresses', sa.column('product_id', sa.Integer),
+                               sa.column('actress_id', sa.Integer)), 'actress_id'),
+        'genres': (sa.table('product_genres', sa.column('product_id', sa.Integer),
+                            sa.column('genre_id', sa.Integer)), 'genre_id'),
+    }
+    known = {name: {} for name in name_tables}
+
+    def ensure(table_name, names):
+        ids = known[table_name]
+        missing = [name for name in dict.fromkeys(names) if name not in ids]
+        table = name_tables[table_name]
+        if missing:
+            connection.execute(table.insert(), [{'name': name} for name in missing])
+            for start in range(0, len(missing), IN_CHUNK):
+                chunk = missing[start:start + IN_CHUNK]
+                ids.update(connection.execute(
+                    sa.select(table.c.name, table.c.id).where(table.c.name.in_(chunk))
+                ).all())
+        return ids
+
+    def decode(value):
+        try:
+            names = json.loads(value) if value else []
+        except ValueError:
+            return []
+        return list(dict.fromkeys(name for name in names if name))
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(products.c.id, products.c.actresses, products.c.genres, products.c.maker)
+            .where(products.c.id > last_id).order_by(products.c.id).limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for key, (link_table, column) in link_tables.items():
+            names = {row.id: decode(getattr(row, key)) for row in rows}
+            ids = ensure(key, [name for values in names.values() for name in values])
+            links = [{'product_id': product_id, column: ids[name]}
+                     for product_id, values in names.items() for name in values]
+            if links:
+                connection.execute(link_table.insert(), links)
+
+        makers = {row.id: row.maker for row in rows if row.maker}
+        if makers:
+            ids = ensure('makers', makers.values())
+            connection.execute(
+                products.update().where(products.c.id == sa.bindparam('product_id'))
+                .values(maker_id=sa.bindparam('maker_id')),
+                [{'product_id': product_id, 'maker_id': ids[name]} for product_id, name in makers.items()]
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('fk_products_maker_id_makers', type_='foreignkey')
+        batch_op.drop_index('ix_products_maker_id')
+        batch_op.drop_column('maker_id')
+    op.drop_index('ix_product_genres_genre_id_product_id', table_name='product_genres')
+    op.drop_table('product_genres')
+    op.drop_index('ix_product_actresses_actress_id_product_id', table_name='product_actresses')
+    op.drop_table('product_actresses')
+    op.drop_table('makers')
+    op.drop_table('genres')
+    op.drop_table('actresses')
@@ -0,0 +1,59 @@
+"""Add FTS5 trigram index for product search
+
+Revision ID: c7e2a9d4f1b3
+Revises: 9a3d6b1f4c8e
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+import sqlite3
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9d4f1b3'
+down_revision = '9a3d6b1f4c8e'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'title, actresses, genres, maker'
+NEW_VALUES = 'new.title, new.actresses, new.genres, new.maker'
+OLD_VALUES = 'old.title, old.actresses, old.genres, old.maker'
+
+
+def supported():
+    # SQLite以外とtrigramトークナイザのないSQLiteではLIKE検索のまま
+    return op.get_bind().dialect.name == 'sqlite' and sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def upgrade():
+    if not supported():
+        return
+    op.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        f"{COLUMNS}, content='products', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+        f"INSERT INTO products_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+        f"INSERT INTO products_fts(products_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF {COLUMNS} ON products BEGIN "
+        f"INSERT INTO products_fts(products_fts, rowid, {COLUMNS}) VALUES ('delete', old.id, {OLD_VALUES}); "
+        f"INSERT INTO products_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW_VALUES}); END"
+    )
+    # 保存済みの商品から索引を構築
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if not supported():
+        return
+    op.execute("DROP TRIGGER IF EXISTS products_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS products_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS products_fts_ai")
+    op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,38 @@
+"""Add indexes for hot queries
+
+Revision ID: e4b8f2a6c1d7
+Revises: c7e2a9d4f1b3
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8f2a6c1d7'
+down_revision = 'c7e2a9d4f1b3'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_products_fetched_at', 'products', ['fetched_at']),
+    ('ix_products_release_date', 'products', ['release_date']),
+    ('ix_products_posted', 'products', ['posted']),
+    ('ix_products_is_favorite_fetched_at', 'products', ['is_favorite', 'fetched_at']),
+    ('ix_images_product_id_selected_selection_order', 'images', ['product_id', 'selected', 'selection_order']),
+    ('ix_posts_status_scheduled_at', 'posts', ['status', 'scheduled_at']),
+    ('ix_posts_status_posted_at', 'posts', ['status', 'posted_at']),
+    ('ix_posts_product_id', 'posts', ['product_id']),
+    ('ix_post_images_post_id_display_order', 'post_images', ['post_id', 'display_order']),
+    ('ix_post_images_image_id', 'post_images', ['image_id']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
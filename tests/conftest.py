@@ -8,6 +8,7 @@ import pytest
 from datetime import datetime, UTC
 from flask import Flask
 from flask.testing import FlaskClient
+from unittest.mock import MagicMock
 
 # プロジェクトのsrcディレクトリをPythonパスに追加
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
@@ -108,6 +109,42 @@ def sample_product(db):
     return product
 
 
+@pytest.fixture(scope="function")
+def make_item():
+    """APIの商品アイテム（ItemListのitemsの要素）を生成するファクトリ
+    
+    page=Trueで商品ページのURLを付ける（動画URLの抽出対象になる）。
+    その他のキーワード引数はアイテムのフィールドを上書き・追加する。
+    """
+    def factory(content_id, title="テスト商品", page=False, **fields):
+        item = {
+            "content_id": content_id,
+            "title": title,
+            "affiliateURL": f"https://example.com/product/{content_id}",
+            "imageURL": {"large": f"https://example.com/images/{content_id}.jpg"},
+            "sampleImageURL": {"sample_l": {"image": [f"https://example.com/samples/{content_id}-1.jpg"]}},
+        }
+        if page:
+            item["URL"] = f"https://example.com/page/{content_id}"
+        item.update(fields)
+        return item
+    return factory
+
+
+@pytest.fixture(scope="function")
+def make_page_response():
+    """商品ページ取得のHTTPレスポンスのモックを生成するファクトリ"""
+    def factory(status_code=200, content=b'<html></html>', headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.content = content
+        response.encoding = 'utf-8'
+        response.headers = headers or {}
+        response.raise_for_status.return_value = None
+        return response
+    return factory
+
+
 @pytest.fixture(scope="function")
 def sample_images(db, sample_product):
     """テスト用サンプル画像データ"""
@@ -20,6 +20,25 @@ def test_products_page(client: FlaskClient):
     assert b"\xe5\x95\x86\xe5\x93\x81\xe4\xb8\x80\xe8\xa6\xa7" in response.data  # "商品一覧" in UTF-8
 
 
+def test_products_filter_matches_exact_names(client: FlaskClient, sample_product):
+    """女優・ジャンルの絞り込みが名前の完全一致になるかテスト"""
+    response = client.get('/products', query_string={'actress': '女優A', 'genres': 'ジャンルB'})
+    assert sample_product.title.encode('utf-8') in response.data
+    
+    # 部分一致では一致しない
+    response = client.get('/products', query_string={'actress': '女優'})
+    assert sample_product.title.encode('utf-8') not in response.data
+
+
+def test_products_keyword_search(client: FlaskClient, sample_product):
+    """キーワード検索がタイトル以外の列も対象にするかテスト"""
+    response = client.get('/products', query_string={'keyword': 'サンプルメーカー'})
+    assert sample_product.title.encode('utf-8') in response.data
+    
+    response = client.get('/products', query_string={'keyword': '存在しない商品'})
+    assert sample_product.title.encode('utf-8') not in response.data
+
+
 def test_posts_page(client: FlaskClient):
     """投稿一覧ページが正常に表示されるかテスト"""
     response = client.get('/posts')
@@ -54,6 +73,119 @@ def test_fetch_new_products(client: FlaskClient, mocker):
     mock_fetch.assert_called_once_with(floor='dvd', hits=20)
 
 
+def test_api_fetch_by_ids(client: FlaskClient, mocker):
+    """content_id指定取得APIのテスト（サービスをモック）"""
+    mock_fetch = mocker.patch('dmm_x_poster.services.dmm_api.dmm_api_service.fetch_items_by_content_ids')
+    mock_fetch.return_value = {'requested': 2, 'skipped': 0, 'saved': 2, 'not_found': [], 'failed': []}
+    
+    response = client.post('/api/fetch_by_ids', json={'content_ids': ['SSIS00001', 'ssis00002']})
+    
+    assert response.status_code == 200
+    assert response.json['saved'] == 2
+    mock_fetch.assert_called_once_with(['ssis00001', 'ssis00002'], floor='videoa', force_refresh=False)
+    
+    response = client.post('/api/fetch_by_ids', json={'content_ids': []})
+    assert response.status_code == 400
+
+
+def test_saved_searches(client: FlaskClient, db, mocker):
+    """保存済み検索の追加・切り替え・削除のテスト"""
+    from dmm_x_poster.db.models import SavedSearch
+    mocker.patch('dmm_x_poster.app.flash')
+    
+    response = client.post('/saved_searches', data={
+        'name': '新着ジャンル', 'floor': 'videoa', 'sort': 'date',
+        'genre_ids': '1001, 1002', 'release_status': 'released', 'hits': 50
+    })
+    assert response.status_code == 302
+    assert '新着ジャンル' in client.get('/settings').data.decode('utf-8')
+    
+    search = SavedSearch.query.one()
+    assert search.get_genre_ids() == ['1001', '1002']
+    assert search.hits == 50
+    
+    client.post(f'/saved_searches/{search.id}/toggle')
+    assert db.session.get(SavedSearch, search.id).enabled is False
+    
+    client.post(f'/saved_searches/{search.id}/delete')
+    assert SavedSearch.query.count() == 0
+
+
+def test_run_saved_searches_starts_job(client: FlaskClient, app, db, mocker, monkeypatch):
+    """保存済み検索の今すぐ実行がリクエスト内で取得せず、定期取得のジョブを起動するテスト"""
+    from dmm_x_poster.services.dmm_api import dmm_api_service
+    mocker.patch('dmm_x_poster.app.flash')
+    scheduler = mocker.MagicMock()
+    monkeypatch.setitem(app.extensions, 'scheduler', scheduler)
+    mock_fetch = mocker.patch.object(dmm_api_service, 'fetch_saved_searches')
+    
+    response = client.post('/saved_searches/run')
+    
+    assert response.status_code == 302
+    mock_fetch.assert_not_called()
+    assert scheduler.modify_job.call_args.args == ('fetch_products',)
+    assert 'next_run_time' in scheduler.modify_job.call_args.kwargs
+
+
+def test_refresh_catalog_now_starts_job(client: FlaskClient, app, db, mocker, monkeypatch):
+    """カタログの今すぐ更新がリクエスト内で取得せず、定期更新のジョブを起動するテスト"""
+    from dmm_x_poster.services.catalog import catalog_service
+    mocker.patch('dmm_x_poster.app.flash')
+    scheduler = mocker.MagicMock()
+    monkeypatch.setitem(app.extensions, 'scheduler', scheduler)
+    mock_refresh = mocker.patch.object(catalog_service, 'refresh')
+    
+    response = client.post('/catalog/refresh')
+    
+    assert response.status_code == 302
+    mock_refresh.assert_not_called()
+    assert scheduler.modify_job.call_args.args == (catalog_service.JOB_ID,)
+    assert 'next_run_time' in scheduler.modify_job.call_args.kwargs
+
+
+def test_empty_catalog_is_refreshed_on_startup(app, db):
+    """カタログが空の場合のみ起動直後に更新するかテスト"""
+    from dmm_x_poster.app import catalog_needs_initial_refresh
+    from dmm_x_poster.db.models import CatalogEntry
+    from dmm_x_poster.services.catalog import catalog_service
+    CatalogEntry.query.delete()
+    
+    assert catalog_needs_initial_refresh(app) is True
+    
+    catalog_service.save_entries('genre', [{'dmm_id': '4025', 'name': '単体作品', 'ruby': None}])
+    assert catalog_needs_initial_refresh(app) is False
+
+
+def test_api_catalog_suggest(client: FlaskClient, db):
+    """ジャンル・女優名の入力候補APIのテスト"""
+    from dmm_x_poster.services.catalog import catalog_service
+    catalog_service.save_entries('genre', [{'dmm_id': '4025', 'name': '単体作品', 'ruby': 'たんたいさくひん'}])
+    catalog_service.load()
+    
+    response = client.get('/api/catalog/suggest', query_string={'kind': 'genre', 'q': 'たんたい'})
+    assert response.status_code == 200
+    assert response.json == [{'id': '4025', 'name': '単体作品', 'ruby': 'たんたいさくひん'}]
+    
+    response = client.get('/api/catalog/suggest', query_string={'kind': 'maker', 'q': 'a'})
+    assert response.status_code == 400
+
+
+def test_fetch_new_resolves_catalog_names(client: FlaskClient, db, mocker):
+    """新着取得でジャンル名をIDに変換するテスト"""
+    from dmm_x_poster.services.catalog import catalog_service
+    mocker.patch('dmm_x_poster.app.flash')
+    mock_fetch = mocker.patch('dmm_x_poster.services.dmm_api.dmm_api_service.fetch_and_save_new_items', return_value=0)
+    catalog_service.save_entries('genre', [{'dmm_id': '4025', 'name': '単体作品', 'ruby': None}])
+    catalog_service.load()
+    
+    client.post('/fetch_new', data={'genre_ids': '単体作品, 5001'})
+    assert mock_fetch.call_args.kwargs['article_genre'] == ['4025', '5001']
+    
+    mock_fetch.reset_mock()
+    client.post('/fetch_new', data={'genre_ids': '存在しないジャンル'})
+    mock_fetch.assert_not_called()
+
+
 def test_select_images(client: FlaskClient, sample_product, sample_images, mocker):
     """画像選択機能のテスト"""
     # 画像ダウンロードサービスをモック
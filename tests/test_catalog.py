@@ -0,0 +1,103 @@
+"""
+ジャンル・女優IDカタログのテスト
+"""
+from unittest.mock import patch
+
+from dmm_x_poster.db.models import CatalogEntry
+from dmm_x_poster.services.catalog import CatalogIndex, CatalogService, normalize_name
+from dmm_x_poster.services.dmm_api import dmm_api_service
+
+
+ENTRIES = [
+    ('genre', '4025', '単体作品', 'たんたいさくひん'),
+    ('genre', '5001', '中出し', 'なかだし'),
+    ('genre', '6004', 'デビュー作品', 'でびゅーさくひん'),
+    ('actress', '1001', '山田花子', 'やまだはなこ'),
+    ('actress', '1002', '山田太郎', 'やまだたろう'),
+]
+
+
+class TestCatalogIndex:
+    """メモリ上の索引のテストクラス"""
+
+    def test_normalize_name(self):
+        """全角半角・カタカナひらがなの違いを無視するかテスト"""
+        assert normalize_name(' ＤＥＢＵＴ ') == 'debut'
+        assert normalize_name('デビュー') == normalize_name('でびゅー')
+
+    def test_resolve_by_name_and_ruby(self):
+        """名前・読み仮名のどちらでもIDに変換できるかテスト"""
+        index = CatalogIndex(ENTRIES)
+        assert index.resolve('genre', '単体作品') == '4025'
+        assert index.resolve('genre', 'ナカダシ') == '5001'
+        assert index.resolve('actress', '単体作品') is None
+        assert index.get('actress', 1001)['name'] == '山田花子'
+
+    def test_suggest_by_prefix(self):
+        """前方一致の候補を重複なく返すかテスト"""
+        index = CatalogIndex(ENTRIES)
+        assert [entry['id'] for entry in index.suggest('actress', 'やまだ')] == ['1002', '1001']
+        assert [entry['id'] for entry in index.suggest('actress', '山田花')] == ['1001']
+        assert len(index.suggest('actress', 'やまだ', limit=1)) == 1
+        assert index.suggest('genre', '') == []
+
+
+class TestCatalogService:
+    """カタログサービスのテストクラス"""
+
+    def make_service(self, app):
+        service = CatalogService()
+        service.init_app(app)
+        return service
+
+    def test_fetch_entries_pages_through_api(self, app):
+        """total_countに達するまでページングするかテスト"""
+        service = self.make_service(app)
+        pages = [
+            {'result': {'total_count': '3', 'actress': [
+                {'id': '1', 'name': 'A', 'ruby': 'あ'}, {'id': '2', 'name': 'B', 'ruby': 'び'}]}},
+            {'result': {'total_count': '3', 'actress': [{'id': '3', 'name': 'C', 'ruby': 'し'}]}},
+        ]
+        with patch.object(dmm_api_service, 'request_json', side_effect=[(page, None) for page in pages]) as mock_request:
+            entries = service.fetch_entries('actress')
+
+        assert [entry['dmm_id'] for entry in entries] == ['1', '2', '3']
+        assert mock_request.call_count == 2
+        assert '/ActressSearch?' in mock_request.call_args_list[1][0][0]
+        assert 'offset=3' in mock_request.call_args_list[1][0][0]
+
+    def test_refresh_keeps_catalog_on_failure(self, app, db):
+        """取得に失敗した種類は既存のカタログを残すかテスト"""
+        service = self.make_service(app)
+        service.save_entries('actress', [{'dmm_id': '1001', 'name': '山田花子', 'ruby': 'やまだはなこ'}])
+        genre_page = {'result': {'total_count': 1, 'genre': [
+            {'genre_id': 4025, 'name': '単体作品', 'ruby': 'たんたいさくひん'}]}}
+
+        def request_json(url):
+            return (genre_page, None) if 'GenreSearch' in url else (None, 'unavailable')
+
+        with patch.object(dmm_api_service, 'request_json', side_effect=request_json):
+            counts = service.refresh()
+
+        assert counts == {'genre': 1, 'actress': None}
+        assert service.count('actress') == 1
+        assert service.resolve_terms('genre', '単体作品') == (['4025'], [])
+
+    def test_save_entries_updates_names(self, app, db):
+        """既存のIDは名前を更新し、重複行を作らないかテスト"""
+        service = self.make_service(app)
+        service.save_entries('genre', [{'dmm_id': '4025', 'name': '単体', 'ruby': None}])
+        service.save_entries('genre', [{'dmm_id': '4025', 'name': '単体作品', 'ruby': 'たんたいさくひん'}])
+
+        assert CatalogEntry.query.count() == 1
+        assert service.load().resolve('genre', 'たんたいさくひん') == '4025'
+
+    def test_resolve_terms_mixes_names_and_ids(self, app, db):
+        """名前とIDの混在した入力を変換し、解決できない名前を返すかテスト"""
+        service = self.make_service(app)
+        service.save_entries('actress', [{'dmm_id': '1001', 'name': '山田花子', 'ruby': 'やまだはなこ'}])
+
+        ids, unknown = service.resolve_terms('actress', '山田花子, 2002、１００１,不明な女優')
+        assert ids == ['1001', '2002']
+        assert unknown == ['不明な女優']
+        assert service.names_for('actress', ['1001', '2002']) == ['山田花子', '2002']
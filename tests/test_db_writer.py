@@ -0,0 +1,130 @@
+"""
+SQLiteの接続設定と単一書き込みスレッドのテスト
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from dmm_x_poster.db.models import db as _db, Setting
+from dmm_x_poster.db.sqlite import configure_sqlite, engine_options, sqlite_pragmas
+from dmm_x_poster.services.db_writer import DBWriter
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """ファイルのSQLiteを使うアプリケーション（スレッド間で接続を共有しない）"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'writer.db'}",
+        SQLITE_BUSY_TIMEOUT=2000,
+        DB_SINGLE_WRITER=True,
+    )
+    _db.init_app(app)
+    configure_sqlite(app)
+    with app.app_context():
+        _db.create_all()
+    yield app
+    with app.app_context():
+        _db.engine.dispose()
+
+
+def add_setting(key, value='1'):
+    """設定を1件追加する書き込み処理（コミットは書き込みスレッドが行う）"""
+    _db.session.add(Setting(key=key, value=value))
+    return threading.current_thread().name
+
+
+class TestSQLitePragmas:
+    """SQLiteの接続設定のテストクラス"""
+
+    def test_pragmas_from_config(self):
+        """設定値からPRAGMAの一覧を生成し、不正な値を拒否するかテスト"""
+        pragmas = dict(sqlite_pragmas({'SQLITE_CACHE_SIZE_KB': 1024, 'SQLITE_SYNCHRONOUS': 'full'}))
+        assert pragmas['journal_mode'] == 'WAL'
+        assert pragmas['synchronous'] == 'FULL'
+        assert pragmas['cache_size'] == -1024
+        with pytest.raises(ValueError):
+            sqlite_pragmas({'SQLITE_JOURNAL_MODE': 'fast'})
+
+    def test_pool_options_only_for_queue_pool(self):
+        """プールの大きさをファイルのSQLiteとSQLite以外のDBにだけ設定するかテスト"""
+        config = {'DB_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 0, 'DB_POOL_TIMEOUT': 5}
+        for url in ('sqlite://', 'sqlite:///:memory:', 'sqlite:///file:db?mode=memory&uri=true'):
+            assert engine_options(dict(config, SQLALCHEMY_DATABASE_URI=url)) == {}
+        for url in ('sqlite:///app.db', 'postgresql://user@localhost/dmm'):
+            assert engine_options(dict(config, SQLALCHEMY_DATABASE_URI=url)) == {
+                'pool_size': 3, 'max_overflow': 0, 'pool_timeout': 5.0}
+        assert engine_options(dict(config, SQLALCHEMY_DATABASE_URI='sqlite:///app.db',
+                                   SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 10}))['pool_size'] == 10
+
+    def test_options_create_engine(self, tmp_path):
+        """既定のプール設定でインメモリ・ファイルのSQLiteのエンジンを作成できるかテスト"""
+        for url in ('sqlite://', f"sqlite:///{tmp_path / 'pool.db'}"):
+            engine = create_engine(url, **engine_options({'SQLALCHEMY_DATABASE_URI': url}))
+            with engine.connect() as connection:
+                assert connection.execute(text('SELECT 1')).scalar() == 1
+            engine.dispose()
+
+    def test_connections_use_wal(self, file_app):
+        """ファイルDBの接続にWALなどの設定が適用されるかテスト"""
+        with file_app.app_context():
+            assert _db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert _db.session.execute(text('PRAGMA busy_timeout')).scalar() == 2000
+            # NORMAL = 1
+            assert _db.session.execute(text('PRAGMA synchronous')).scalar() == 1
+
+
+class TestDBWriter:
+    """単一書き込みスレッドのテストクラス"""
+
+    def test_serializes_writes_on_one_thread(self, file_app):
+        """複数スレッドからの書き込みが1つのスレッドで順に実行・コミットされるかテスト"""
+        writer = DBWriter(file_app)
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                threads = list(executor.map(lambda i: writer.run(add_setting, f'key-{i}'), range(20)))
+            assert set(threads) == {'db-writer'}
+            with file_app.app_context():
+                assert Setting.query.count() == 20
+            assert writer.report()['jobs'] == 20
+        finally:
+            writer.close()
+
+    def test_failed_job_is_rolled_back(self, file_app):
+        """失敗した処理はロールバックされ、例外が依頼元に返るかテスト"""
+        writer = DBWriter(file_app)
+
+        def add_twice():
+            add_setting('dup')
+            _db.session.flush()
+            add_setting('dup')
+
+        try:
+            with pytest.raises(Exception):
+                writer.run(add_twice)
+            writer.run(add_setting, 'after')
+            with file_app.app_context():
+                assert [s.key for s in Setting.query.all()] == ['after']
+            assert writer.report()['failed'] == 1
+        finally:
+            writer.close()
+
+    def test_nested_submit_runs_inline(self, file_app):
+        """書き込みスレッド内からの依頼がその場で実行されるかテスト（デッドロックしない）"""
+        writer = DBWriter(file_app)
+        writer.timeout = 5
+        try:
+            assert writer.run(lambda: writer.run(add_setting, 'nested')) == 'db-writer'
+        finally:
+            writer.close()
+
+    def test_disabled_runs_on_caller(self, app, db):
+        """無効の場合は呼び出し元のスレッドで実行してコミットするかテスト"""
+        writer = DBWriter(app)
+        assert writer.enabled is False
+        assert writer.run(add_setting, 'inline') == threading.current_thread().name
+        db.session.rollback()
+        assert Setting.get('inline') == '1'
@@ -1,11 +1,13 @@
 """
 DMM APIサービスのテスト
 """
-import json
 import pytest
 from unittest.mock import MagicMock, patch
 
-from dmm_x_poster.services.dmm_api import DMMAPIService
+from dmm_x_poster.services.dmm_api import DMMAPIService, DMMAPIError, SearchResult
+
+# 過去分のバックフィルで指定する上限日付
+BACKFILL_UNTIL = '2023-01-31T23:59:59'
 
 
 class TestDMMAPIService:
@@ -38,7 +40,7 @@ class TestDMMAPIService:
         assert params['sort'] == 'date'
         assert params['keyword'] == 'テスト'
     
-    @patch('dmm_x_poster.services.dmm_api.requests.get')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
     def test_search_items_success(self, mock_get, app):
         """search_itemsメソッドが正常な場合のテスト"""
         # モックレスポンスの設定
@@ -101,7 +103,7 @@ class TestDMMAPIService:
         assert 'floor=dvd' in call_args
         assert 'sort=date' in call_args
     
-    @patch('dmm_x_poster.services.dmm_api.requests.get')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
     def test_search_items_api_error(self, mock_get, app):
         """search_itemsメソッドがAPI呼び出しエラー時に空リストを返すかテスト"""
         # モックレスポンスの設定（例外発生）
@@ -116,7 +118,7 @@ class TestDMMAPIService:
         # 結果の検証
         assert items == []
     
-    @patch('dmm_x_poster.services.dmm_api.requests.get')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
     def test_search_items_invalid_format(self, mock_get, app):
         """search_itemsメソッドが不正なレスポンス形式の場合に空リストを返すかテスト"""
         # モックレスポンスの設定（不正な形式）
@@ -185,12 +187,12 @@ class TestDMMAPIService:
         assert product.package_image_url == "https://example.com/images/test-123.jpg"
         
         # 女優情報の検証
-        actresses = json.loads(product.actresses)
+        actresses = product.actresses
         assert "女優A" in actresses
         assert "女優B" in actresses
         
         # ジャンル情報の検証
-        genres = json.loads(product.genres)
+        genres = product.genres
         assert "ジャンルA" in genres
         assert "ジャンルB" in genres
         
@@ -200,11 +202,11 @@ class TestDMMAPIService:
         assert images[0].image_url == "https://example.com/samples/test-123-1.jpg"
         assert images[1].image_url == "https://example.com/samples/test-123-2.jpg"
     
-    @patch('dmm_x_poster.services.dmm_api.DMMAPIService.search_items')
-    def test_fetch_and_save_new_items(self, mock_search_items, app, db):
+    @patch('dmm_x_poster.services.dmm_api.DMMAPIService.search')
+    def test_fetch_and_save_new_items(self, mock_search, app, db):
         """fetch_and_save_new_itemsメソッドが正しく機能するかテスト"""
         # モックの設定
-        mock_search_items.return_value = [
+        mock_search.return_value = SearchResult([
             {
                 "content_id": "test-123",
                 "title": "テスト商品",
@@ -230,7 +232,7 @@ class TestDMMAPIService:
                     ]
                 }
             }
-        ]
+        ], 1)
         
         # サービスの設定とテスト実行
         service = DMMAPIService()
@@ -241,4 +243,711 @@ class TestDMMAPIService:
         assert saved_count == 1
         
         # モックの検証
-        mock_search_items.assert_called_once_with(floor='dvd', sort='date')
\ No newline at end of file
+        mock_search.assert_called_once_with(floor='dvd', sort='date')
+    
+    @patch('dmm_x_poster.services.dmm_api.DMMAPIService.search')
+    def test_fetch_and_save_new_items_api_failure(self, mock_search, app, db):
+        """API失敗時に0件ではなく例外になるかテスト"""
+        mock_search.return_value = SearchResult(error='unavailable')
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        with pytest.raises(DMMAPIError):
+            service.fetch_and_save_new_items(floor='dvd')
+
+class TestDMMAPICrawl:
+    """ページングクロールのテストクラス"""
+    
+    @staticmethod
+    def make_page(offset, count, total_count):
+        """指定位置から始まるダミーのAPI結果を生成"""
+        return {
+            "total_count": total_count,
+            "first_position": offset,
+            "items": [
+                {"content_id": f"crawl-{offset + i}", "date": f"2023-01-{(offset + i) % 28 + 1:02d} 00:00:00"}
+                for i in range(count)
+            ]
+        }
+    
+    def test_crawl_items_walks_all_pages(self, app, db):
+        """crawl_itemsがtotal_countまでoffsetを進めるかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        pages = {1: self.make_page(1, 100, 250), 101: self.make_page(101, 100, 250), 201: self.make_page(201, 50, 250)}
+        with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]) as mock_fetch:
+            result = list(service.crawl_items(floor='videoa'))
+        
+        assert [len(page) for page in result] == [100, 100, 50]
+        assert [c[0][0]['offset'] for c in mock_fetch.call_args_list] == [1, 101, 201]
+        assert mock_fetch.call_args_list[0][0][0]['hits'] == 100
+        
+        # 完走したらカーソルは残らない
+        params = service.build_search_params(floor='videoa', sort='date', hits=100)
+        assert service.load_crawl_cursor(service.query_hash(params)) is None
+    
+    def test_crawl_items_resumes_from_cursor(self, app, db):
+        """途中で停止したクロールが保存済みカーソルから再開するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        pages = {1: self.make_page(1, 100, 300), 101: self.make_page(101, 100, 300), 201: self.make_page(201, 100, 300)}
+        with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]):
+            first_run = list(service.crawl_items(floor='videoa', max_pages=1, checkpoint=True, lte_date=BACKFILL_UNTIL))
+        
+        assert len(first_run) == 1
+        params = service.build_search_params(floor='videoa', sort='date', hits=100, lte_date=BACKFILL_UNTIL)
+        cursor = service.load_crawl_cursor(service.query_hash(params))
+        assert cursor['offset'] == 101
+        assert cursor['last_date'] == first_run[0][-1]['date']
+        
+        with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]) as mock_fetch:
+            second_run = list(service.crawl_items(floor='videoa', checkpoint=True, lte_date=BACKFILL_UNTIL))
+        
+        assert [c[0][0]['offset'] for c in mock_fetch.call_args_list] == [101, 201]
+        assert second_run[0][0]['content_id'] == 'crawl-101'
+    
+    def test_crawl_items_keeps_cursor_on_failure(self, app, db):
+        """API失敗時にカーソルを残して終了するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        pages = {1: self.make_page(1, 100, 300), 101: None}
+        with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]):
+            result = list(service.crawl_items(floor='videoa', checkpoint=True, lte_date=BACKFILL_UNTIL))
+        
+        assert len(result) == 1
+        params = service.build_search_params(floor='videoa', sort='date', hits=100, lte_date=BACKFILL_UNTIL)
+        assert service.load_crawl_cursor(service.query_hash(params))['offset'] == 101
+    
+    def test_date_sorted_crawl_does_not_resume(self, app, db):
+        """上限日付のない新着順のクロールはカーソルを保存・再開しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        params = service.build_search_params(floor='videoa', sort='date', hits=100)
+        service.save_crawl_cursor(service.query_hash(params), 101)
+        
+        pages = {1: self.make_page(1, 100, 300), 101: self.make_page(101, 100, 300)}
+        for checkpoint in (False, True):
+            with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]) as mock_fetch:
+                result = list(service.crawl_items(floor='videoa', max_pages=1, checkpoint=checkpoint))
+            
+            # 新作が先頭に増えるため、前回の続きではなく毎回先頭から取得する
+            assert [c[0][0]['offset'] for c in mock_fetch.call_args_list] == [1]
+            assert result[0][0]['content_id'] == 'crawl-1'
+        assert service.load_crawl_cursor(service.query_hash(params))['offset'] == 101
+    
+    def test_query_hash_ignores_offset_and_credentials(self, app):
+        """query_hashが位置や認証情報に依存しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        a = service.build_search_params(floor='videoa', offset=1, hits=20)
+        b = service.build_search_params(floor='videoa', offset=501, hits=100)
+        c = service.build_search_params(floor='videoc', offset=1)
+        
+        assert service.query_hash(a) == service.query_hash(b)
+        assert service.query_hash(a) != service.query_hash(c)
+
+
+class TestDMMAPIVideoExtraction:
+    """動画URL並列抽出のテストクラス"""
+    
+    def test_extract_video_urls_limits_per_host(self, app):
+        """ホストごとの同時実行数が上限を超えないかテスト"""
+        import threading
+        import time
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        service.scrape_workers = 8
+        service.scrape_per_host = 2
+        
+        lock = threading.Lock()
+        active = {}
+        peak = {}
+        
+        def fake_extract(url):
+            host = url.split('/')[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return f"{url}.mp4"
+        
+        urls = [f"https://a.example.com/{i}" for i in range(6)] + [f"https://b.example.com/{i}" for i in range(6)]
+        with patch.object(service, 'extract_video_url_from_page', side_effect=fake_extract):
+            results = service.extract_video_urls(urls)
+        
+        assert results == {url: f"{url}.mp4" for url in urls}
+        assert peak['a.example.com'] <= 2
+        assert peak['b.example.com'] <= 2
+    
+    def test_save_items_merges_extracted_videos(self, app, db):
+        """並列抽出した動画URLが商品ごとに保存されるかテスト"""
+        from dmm_x_poster.db.models import Product, Image
+        
+        items = [
+            {"content_id": f"video-{i}", "title": f"動画商品{i}", "URL": f"https://example.com/product/video-{i}"}
+            for i in range(3)
+        ]
+        videos = {
+            "https://example.com/product/video-0": "https://cc3001.dmm.co.jp/litevideo/freepv/v/vid/video0/video0_dm_w.mp4",
+            "https://example.com/product/video-1": None,
+            "https://example.com/product/video-2": "https://cc3001.dmm.co.jp/litevideo/freepv/v/vid/video2/video2_dm_w.mp4",
+        }
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        with patch.object(service, 'extract_video_url_from_page', side_effect=videos.get):
+            saved_count = service.save_items_to_db(items)
+        
+        assert saved_count == 3
+        for i in range(3):
+            product = Product.query.filter_by(dmm_product_id=f"video-{i}").first()
+            movies = Image.query.filter_by(product_id=product.id, image_type='movie').all()
+            expected = videos[f"https://example.com/product/video-{i}"]
+            assert [m.image_url for m in movies] == ([expected] if expected else [])
+
+
+class TestDMMAPIBulkIngest:
+    """一括保存のテストクラス"""
+    
+    def test_skips_existing_and_duplicate_items(self, app, db, sample_product, make_item):
+        """既存商品とバッチ内の重複が保存されないかテスト"""
+        from dmm_x_poster.db.models import Product, Image
+        
+        items = [
+            make_item(sample_product.dmm_product_id),
+            make_item("bulk-001"),
+            make_item("bulk-001"),
+            make_item("bulk-002"),
+        ]
+        service = DMMAPIService()
+        service.init_app(app)
+        saved_count = service.save_items_to_db(items)
+        
+        assert saved_count == 2
+        assert Product.query.count() == 3
+        product = Product.query.filter_by(dmm_product_id="bulk-001").first()
+        images = Image.query.filter_by(product_id=product.id).order_by(Image.id).all()
+        assert [(img.image_type, img.selected) for img in images] == [('package', False), ('sample', False)]
+        # 既存商品には画像を追加しない
+        assert Image.query.filter_by(product_id=sample_product.id).count() == 0
+    
+    def test_bad_item_does_not_roll_back_chunk(self, app, db, make_item):
+        """不正なアイテムがあっても同じチャンクの他の商品は保存されるかテスト"""
+        from dmm_x_poster.db.models import Product
+        
+        items = [make_item(f"bulk-{i:03d}") for i in range(5)]
+        items[2]["title"] = None  # NOT NULL制約違反
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        service.ingest_chunk_size = 2
+        saved_count = service.save_items_to_db(items)
+        
+        assert saved_count == 4
+        stored = {p.dmm_product_id for p in Product.query.all()}
+        assert stored == {"bulk-000", "bulk-001", "bulk-003", "bulk-004"}
+    
+    def test_existing_product_ids_chunks_in_clause(self, app, db, sample_product, monkeypatch):
+        """existing_product_idsが大量IDでも既存IDを返すかテスト"""
+        import dmm_x_poster.services.dmm_api as dmm_api
+        monkeypatch.setattr(dmm_api, 'IN_CLAUSE_CHUNK', 3)
+        
+        service = DMMAPIService()
+        ids = [f"missing-{i}" for i in range(10)] + [sample_product.dmm_product_id]
+        assert service.existing_product_ids(ids) == {sample_product.dmm_product_id}
+    
+    def test_bulk_insert_and_refresh_sync_tags(self, app, db, make_item):
+        """一括INSERTと差分UPDATEで女優・ジャンル・メーカーの関連が更新されるかテスト"""
+        from dmm_x_poster.db.models import Product, Maker
+        
+        def with_tags(content_id, actresses):
+            return dict(make_item(content_id), iteminfo={
+                "actress": [{"name": name} for name in actresses],
+                "genre": [{"name": "ジャンルA"}],
+                "maker": [{"name": "メーカーZ"}],
+            })
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        service.save_items_to_db([with_tags("tag-101", ["女優A"]), with_tags("tag-102", ["女優A", "女優B"])])
+        
+        tagged = Product.query.filter(Product.tagged_with('actress', "女優A"))
+        assert sorted(p.dmm_product_id for p in tagged) == ["tag-101", "tag-102"]
+        assert Product.query.filter(Product.tagged_with('genre', "ジャンルA")).count() == 2
+        maker = Maker.query.filter_by(name="メーカーZ").one()
+        assert Product.query.filter_by(maker_id=maker.id).count() == 2
+        
+        service.refresh_items_in_db([with_tags("tag-101", ["女優B"])])
+        tagged = Product.query.filter(Product.tagged_with('actress', "女優A"))
+        assert [p.dmm_product_id for p in tagged] == ["tag-102"]
+        assert Product.query.filter(Product.tagged_with('actress', "女優B")).count() == 2
+
+
+class TestDMMAPIRefresh:
+    """既存商品の更新モードのテストクラス"""
+    
+    def test_refresh_updates_changed_columns_and_adds_images(self, app, db, make_item):
+        """変更された列と新しい画像だけが反映され、件数が集計されるかテスト"""
+        from dmm_x_poster.db.models import Product, Image
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        service.save_items_to_db([make_item("ref-001"), make_item("ref-002"), make_item("ref-003")])
+        favorite = Product.query.filter_by(dmm_product_id="ref-001").first()
+        favorite.is_favorite = True
+        db.session.commit()
+        
+        renamed = make_item("ref-001", title="改題された商品")
+        more_images = make_item("ref-002")
+        more_images["sampleImageURL"]["sample_l"]["image"].append("https://example.com/samples/ref-002-2.jpg")
+        items = [renamed, more_images, make_item("ref-003"), make_item("ref-004")]
+        
+        counts = service.refresh_items_in_db(items)
+        
+        assert counts == {'inserted': 1, 'updated': 2, 'unchanged': 1}
+        product = Product.query.filter_by(dmm_product_id="ref-001").first()
+        assert product.title == "改題された商品"
+        # 更新対象外の列は保持される
+        assert product.is_favorite is True
+        product = Product.query.filter_by(dmm_product_id="ref-002").first()
+        assert Image.query.filter_by(product_id=product.id).count() == 3
+        assert Product.query.filter_by(dmm_product_id="ref-004").count() == 1
+    
+    def test_refresh_scrapes_only_products_without_video(self, app, db, make_item):
+        """動画が未登録の既存商品と新規商品だけ動画URLを抽出するかテスト"""
+        from dmm_x_poster.db.models import Product, Image
+        
+        service = DMMAPIService()
+        service.init_app(app)
+        with_video = make_item("ref-v01", page=True)
+        without_video = make_item("ref-v02", page=True)
+        video = "https://cc3001.dmm.co.jp/litevideo/freepv/r/ref/ref-v01/ref-v01_dm_w.mp4"
+        with patch.object(service, 'extract_video_url_from_page',
+                          side_effect=lambda url: video if url.endswith('ref-v01') else None):
+            service.save_items_to_db([with_video, without_video])
+        
+        new_video = "https://cc3001.dmm.co.jp/litevideo/freepv/r/ref/ref-v02/ref-v02_dm_w.mp4"
+        with patch.object(service, 'extract_video_url_from_page', return_value=new_video) as mock_extract:
+            counts = service.refresh_items_in_db([with_video, without_video])
+        
+        mock_extract.assert_called_once_with("https://example.com/page/ref-v02")
+        assert counts == {'inserted': 0, 'updated': 1, 'unchanged': 1}
+        product = Product.query.filter_by(dmm_product_id="ref-v02").first()
+        assert Image.query.filter_by(product_id=product.id, image_type='movie').one().image_url == new_video
+
+
+class TestDMMAPIIncrementalFetch:
+    """ウォーターマークによる差分取得のテストクラス"""
+    
+    def test_first_run_sets_watermark(self, app, db, make_item):
+        """初回実行で最新の商品がウォーターマークになるかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        page = {"total_count": 2, "items": [
+            make_item("inc-002", date="2024-01-02 10:00:00"),
+            make_item("inc-001", date="2024-01-01 10:00:00"),
+        ]}
+        with patch.object(service, 'fetch_page', return_value=page), \
+                patch.object(service, 'extract_video_url_from_page', return_value=None):
+            assert service.fetch_incremental_items(floor='videoa') == 2
+        
+        key = service.watermark_key(service.build_search_params(floor='videoa', sort='date'))
+        watermark = service.load_watermark(key)
+        assert watermark['content_id'] == "inc-002"
+        assert watermark['date'] == "2024-01-02 10:00:00"
+    
+    def test_next_run_uses_gte_date_and_stops_at_watermark(self, app, db, make_item):
+        """2回目はgte_dateで絞り、既知の商品に到達したらページングを止めるかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        key = service.watermark_key(service.build_search_params(floor='videoa', sort='date'))
+        service.save_watermark(key, "2024-01-02 10:00:00", "inc-002")
+        
+        first_page = {"total_count": 300, "items": [
+            make_item("inc-004", date="2024-01-03 10:00:00"),
+            make_item("inc-003", date="2024-01-02 10:00:00"),
+            make_item("inc-002", date="2024-01-02 10:00:00"),
+        ] + [make_item(f"old-{i}", date="2024-01-01 10:00:00") for i in range(97)]}
+        with patch.object(service, 'fetch_page', return_value=first_page) as mock_fetch, \
+                patch.object(service, 'extract_video_url_from_page', return_value=None):
+            saved_count = service.fetch_incremental_items(floor='videoa')
+        
+        assert saved_count == 2
+        assert mock_fetch.call_count == 1
+        assert mock_fetch.call_args[0][0]['gte_date'] == "2024-01-02T10:00:00"
+        assert service.load_watermark(key)['content_id'] == "inc-004"
+    
+    def test_keeps_watermark_when_run_is_cut_short(self, app, db, make_item):
+        """既知の商品に届く前に上限で止まった場合はウォーターマークを更新しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        key = service.watermark_key(service.build_search_params(floor='videoa', sort='date'))
+        service.save_watermark(key, "2024-01-01 10:00:00", "inc-001")
+        
+        page = {"total_count": 500, "items": [
+            make_item(f"new-{i}", date="2024-02-01 10:00:00") for i in range(100)
+        ]}
+        with patch.object(service, 'fetch_page', return_value=page), \
+                patch.object(service, 'extract_video_url_from_page', return_value=None):
+            service.fetch_incremental_items(floor='videoa', max_pages=1)
+        
+        assert service.load_watermark(key)['content_id'] == "inc-001"
+    
+    def test_pages_stream_through_one_pipeline(self, app, db, make_item):
+        """全ページを1回のパイプライン実行で取り込み、既知の商品だけのページで止まるかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        key = service.watermark_key(service.build_search_params(floor='videoa', sort='date'))
+        service.save_watermark(key, "2024-01-02 10:00:00", "deleted-item")
+        known = [make_item(f"known-{i}", date="2024-01-02 10:00:00") for i in range(100)]
+        with patch.object(service, 'extract_video_url_from_page', return_value=None):
+            service.save_items_to_db(known)
+        
+        pages = {
+            1: {"total_count": 300, "items": [make_item(f"new-{i}", date="2024-01-03 10:00:00") for i in range(100)]},
+            101: {"total_count": 300, "items": known},
+            201: {"total_count": 300, "items": [make_item(f"older-{i}", date="2024-01-02 10:00:00") for i in range(100)]},
+        }
+        with patch.object(service, 'fetch_page', side_effect=lambda params: pages[params['offset']]) as mock_fetch, \
+                patch.object(service, 'extract_video_url_from_page', return_value=None), \
+                patch.object(service, 'ingest_pages', wraps=service.ingest_pages) as mock_ingest:
+            saved_count = service.fetch_incremental_items(floor='videoa')
+        
+        assert saved_count == 100
+        assert mock_ingest.call_count == 1
+        assert [c[0][0]['offset'] for c in mock_fetch.call_args_list] == [1, 101]
+        assert service.load_watermark(key)['content_id'] == "new-0"
+
+
+class TestDMMAPISavedSearches:
+    """保存済み検索の並列取得のテストクラス"""
+    
+    @staticmethod
+    def make_search(name, **kwargs):
+        from dmm_x_poster.db.models import SavedSearch
+        search = SavedSearch(name=name, floor='videoa', sort='date', release_status='all', hits=100,
+                             enabled=True, **kwargs)
+        return search
+    
+    def test_to_search_kwargs(self):
+        """保存済み検索が検索オプションに変換されるかテスト"""
+        search = self.make_search("ジャンル", genre_ids="1001, 1002", actress_ids="2001")
+        search.release_status = 'released'
+        assert search.to_search_kwargs(today="2024-01-10T00:00:00") == {
+            'floor': 'videoa',
+            'sort': 'date',
+            'hits': 100,
+            'lte_date': "2024-01-10T00:00:00",
+            'article_genre': ["1001", "1002"],
+        }
+    
+    def test_fan_out_merges_and_saves_once(self, app, db, make_item):
+        """各検索を実行し、重複を除いて1回で保存しウォーターマークを記録するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        pages = {
+            "1001": [make_item("ss-003", date="2024-01-03 10:00:00"), make_item("ss-001", date="2024-01-01 10:00:00")],
+            "1002": [make_item("ss-003", date="2024-01-03 10:00:00"), make_item("ss-002", date="2024-01-02 10:00:00")],
+        }
+        searches = [self.make_search("A", genre_ids="1001"), self.make_search("B", genre_ids="1002")]
+        db.session.add_all(searches)
+        db.session.commit()
+        
+        def fetch_page(params):
+            items = pages[params['article_id[0]']]
+            return {"total_count": len(items), "items": items}
+        
+        with patch.object(service, 'fetch_page', side_effect=fetch_page), \
+                patch.object(service, 'save_items_to_db', return_value=3) as mock_save:
+            summary = service.fetch_saved_searches()
+        
+        assert mock_save.call_count == 1
+        assert sorted(item['content_id'] for item in mock_save.call_args[0][0]) == ["ss-001", "ss-002", "ss-003"]
+        assert summary == {'searches': 2, 'fetched': 4, 'unique': 3, 'saved': 3, 'failed': 0}
+        for search in searches:
+            assert search.last_run_at is not None
+            assert search.get_last_result()['fetched'] == 2
+            kwargs = {k: v for k, v in search.to_search_kwargs().items() if k not in ('floor', 'sort')}
+            key = service.watermark_key(service.build_search_params(floor='videoa', sort='date', **kwargs))
+            assert service.load_watermark(key)['content_id'] == "ss-003"
+    
+    def test_failed_search_does_not_block_others(self, app, db, make_item):
+        """失敗した検索があっても他の検索の結果は保存されるかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        searches = [self.make_search("A", genre_ids="1001"), self.make_search("B", genre_ids="1002")]
+        db.session.add_all(searches)
+        db.session.commit()
+        
+        def fetch_page(params):
+            if params['article_id[0]'] == "1002":
+                raise RuntimeError("boom")
+            return {"total_count": 1, "items": [make_item("ss-010", date="2024-01-03 10:00:00")]}
+        
+        with patch.object(service, 'fetch_page', side_effect=fetch_page), \
+                patch.object(service, 'extract_video_url_from_page', return_value=None):
+            summary = service.fetch_saved_searches()
+        
+        assert summary['failed'] == 1
+        assert summary['saved'] == 1
+        assert searches[1].get_last_result()['stopped'] == 'error'
+    
+    def test_falls_back_to_default_fetch(self, app, db):
+        """保存済み検索がない場合は既定の新着取得を行うかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        with patch.object(service, 'fetch_incremental_items', return_value=5) as mock_fetch:
+            summary = service.fetch_saved_searches()
+        
+        mock_fetch.assert_called_once_with(floor='videoa', max_pages=None, time_budget=None)
+        assert summary['searches'] == 0
+        assert summary['saved'] == 5
+
+
+class TestDMMAPISearchCache:
+    """検索結果メモ化のテストクラス"""
+    
+    def test_repeated_search_uses_memo(self, app):
+        """同じ条件の検索はAPIを1回しか呼ばないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        result = SearchResult([{"content_id": "memo-1"}], 1)
+        
+        with patch.object(service, 'fetch_result', return_value=result) as mock_fetch:
+            first = service.search_items(floor='videoa', article_genre=['1', '2'], offset=21)
+            second = service.search_items(floor='videoa', article_genre=['1', '2'], offset=21)
+            other_page = service.search_items(floor='videoa', article_genre=['1', '2'], offset=41)
+        
+        assert first == second == other_page
+        assert mock_fetch.call_count == 2
+        assert service.search_cache.stats()['hits'] == 1
+    
+    def test_force_refresh_bypasses_memo(self, app):
+        """force_refreshでメモ化を無視するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        result = SearchResult([{"content_id": "memo-1"}], 1)
+        
+        with patch.object(service, 'fetch_result', return_value=result) as mock_fetch:
+            service.search_items(floor='videoa')
+            service.search_items(floor='videoa', force_refresh=True)
+        
+        assert mock_fetch.call_count == 2
+    
+    def test_failures_are_not_memoized(self, app):
+        """API失敗時の結果はメモ化しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        with patch.object(service, 'fetch_result', return_value=SearchResult(error='unavailable')) as mock_fetch:
+            assert service.search_items(floor='videoa') == []
+            assert service.search_items(floor='videoa') == []
+        
+        assert mock_fetch.call_count == 2
+
+
+class TestDMMAPIResilience:
+    """API呼び出しのリトライとサーキットブレーカーのテストクラス"""
+    
+    @staticmethod
+    def make_response(status_code, data=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = data
+        if status_code >= 400:
+            import requests
+            response.raise_for_status.side_effect = requests.HTTPError(f"HTTP {status_code}", response=response)
+        return response
+    
+    @patch('dmm_x_poster.services.dmm_api.time.sleep')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
+    def test_retries_transient_errors(self, mock_get, mock_sleep, app):
+        """一時的なエラーを再試行して成功するかテスト"""
+        import requests
+        mock_get.side_effect = [
+            requests.Timeout("read timeout"),
+            self.make_response(503),
+            self.make_response(200, {"result": {"total_count": 0, "items": []}}),
+        ]
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        result = service.search(floor='videoa')
+        
+        assert result.ok
+        assert result.items == []
+        assert mock_get.call_count == 3
+        assert mock_sleep.call_count == 2
+    
+    @patch('dmm_x_poster.services.dmm_api.time.sleep')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
+    def test_client_error_is_not_retried(self, mock_get, mock_sleep, app):
+        """4xxは再試行せず失敗として返すかテスト"""
+        mock_get.return_value = self.make_response(400)
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        result = service.search(floor='videoa')
+        
+        assert result.error == 'request_failed'
+        assert mock_get.call_count == 1
+        mock_sleep.assert_not_called()
+    
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
+    def test_half_open_trial_is_settled_on_every_path(self, mock_get, app, monkeypatch):
+        """half_openの試行が4xx・想定外の例外で終わってもブレーカーが詰まらないかテスト"""
+        monkeypatch.setitem(app.config, 'DMM_API_BREAKER_THRESHOLD', 1)
+        monkeypatch.setitem(app.config, 'DMM_API_BREAKER_RESET', 0)
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        # 4xxはAPIが応答しているので成功として扱い、ブレーカーを閉じる
+        service.breaker.record_failure()
+        mock_get.return_value = self.make_response(404)
+        assert service.search(floor='videoa').error == 'request_failed'
+        assert service.breaker.metrics()['state'] == 'closed'
+        
+        # 想定外の例外は失敗として記録し、次の試行を受け付ける
+        service.breaker.record_failure()
+        mock_get.side_effect = RuntimeError("unexpected")
+        with pytest.raises(RuntimeError):
+            service.request_json('https://api.dmm.com/affiliate/v3/ItemList')
+        assert service.breaker.metrics()['state'] == 'open'
+        
+        mock_get.side_effect = None
+        mock_get.return_value = self.make_response(200, {"result": {"total_count": 0, "items": []}})
+        assert service.search(floor='videoa').ok
+        assert service.breaker.metrics()['state'] == 'closed'
+    
+    @patch('dmm_x_poster.services.dmm_api.time.sleep')
+    @patch('dmm_x_poster.services.http_client.HTTPClient.get')
+    def test_circuit_opens_after_repeated_failures(self, mock_get, mock_sleep, app, monkeypatch):
+        """連続失敗でブレーカーが開き、APIを呼ばずに失敗を返すかテスト"""
+        import requests
+        monkeypatch.setitem(app.config, 'DMM_API_RETRIES', 1)
+        monkeypatch.setitem(app.config, 'DMM_API_BREAKER_THRESHOLD', 2)
+        mock_get.side_effect = requests.ConnectionError("connection refused")
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        assert service.search(floor='videoa').error == 'unavailable'
+        assert service.search(floor='videoa').error == 'unavailable'
+        assert mock_get.call_count == 4
+        
+        result = service.search(floor='videoa')
+        assert result.error == 'circuit_open'
+        assert mock_get.call_count == 4
+        assert service.breaker.metrics()['state'] == 'open'
+
+
+class TestDMMAPIVideoResolver:
+    """動画URLの導出と確認のテストクラス"""
+    
+    @staticmethod
+    def make_head_response(status_code, content_type='video/mp4'):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = {'Content-Type': content_type}
+        return response
+    
+    def test_probe_hit_skips_page_scrape(self, app):
+        """導出したURLが存在すれば商品ページを取得しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        service.probe_video_urls = True
+        items = [
+            {"content_id": "abcd00001", "URL": "https://example.com/page/abcd00001"},
+            {"content_id": "abcd00002", "URL": "https://example.com/page/abcd00002"},
+        ]
+        
+        def head(url, **kwargs):
+            return self.make_head_response(200 if 'abcd00001' in url else 404)
+        
+        with patch('dmm_x_poster.services.http_client.HTTPClient.head', side_effect=head), \
+                patch.object(service, 'extract_video_url_from_page', return_value=None) as mock_extract:
+            video_urls = service.resolve_video_urls(items)
+        
+        assert video_urls["https://example.com/page/abcd00001"] == \
+            "https://cc3001.dmm.co.jp/litevideo/freepv/a/abc/abcd00001/abcd00001_dm_w.mp4"
+        assert video_urls["https://example.com/page/abcd00002"] is None
+        mock_extract.assert_called_once_with("https://example.com/page/abcd00002")
+    
+    def test_html_response_is_a_miss(self, app):
+        """エラーページ（HTML）への応答は存在しないとみなすかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        with patch('dmm_x_poster.services.http_client.HTTPClient.head',
+                   return_value=self.make_head_response(200, 'text/html; charset=UTF-8')):
+            assert service.probe_video_url(["https://cc3001.dmm.co.jp/litevideo/freepv/a/abc/x/x_dm_w.mp4"]) is None
+
+
+class TestDMMAPIFetchByContentIds:
+    """content_id指定取得のテストクラス"""
+    
+    def test_parse_content_ids(self):
+        """区切り文字と商品ページURLを解釈するかテスト"""
+        from dmm_x_poster.services.dmm_api import parse_content_ids
+        text = "SSIS00001, ssis00002\nhttps://www.dmm.co.jp/digital/videoa/-/detail/=/cid=abcd00003/ ssis00001"
+        assert parse_content_ids(text) == ["ssis00001", "ssis00002", "abcd00003"]
+    
+    def test_skips_stored_and_reports_missing(self, app, db, sample_product, make_item):
+        """保存済みIDはAPIを呼ばず、見つからない・失敗したIDを報告するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        
+        def search(floor, cid, hits, force_refresh):
+            if cid == "gone00001":
+                return SearchResult([], 0)
+            if cid == "fail00001":
+                return SearchResult(error='unavailable')
+            return SearchResult([make_item(cid)], 1)
+        
+        with patch.object(service, 'search', side_effect=search) as mock_search:
+            summary = service.fetch_items_by_content_ids(
+                ["new00002", sample_product.dmm_product_id, "gone00001", "fail00001", "new00001"]
+            )
+        
+        assert mock_search.call_count == 4
+        assert sample_product.dmm_product_id not in [call.kwargs['cid'] for call in mock_search.call_args_list]
+        assert summary == {
+            'requested': 5,
+            'skipped': 1,
+            'saved': 2,
+            'not_found': ["gone00001"],
+            'failed': ["fail00001"],
+        }
+    
+    def test_lookups_use_search_concurrency(self, app, db):
+        """content_idごとの検索がページ取得用ではなく検索用の並列数で実行されるかテスト"""
+        from concurrent.futures import ThreadPoolExecutor
+        service = DMMAPIService()
+        service.init_app(app)
+        service.search_workers = 2
+        service.scrape_workers = 8
+        
+        with patch.object(service, 'search', return_value=SearchResult([], 0)), \
+                patch('dmm_x_poster.services.dmm_api.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as mock_pool:
+            service.fetch_items_by_content_ids([f"cid{i:05d}" for i in range(5)])
+        
+        assert mock_pool.call_args.kwargs['max_workers'] == 2
+    
+    def test_memoized_ids_do_not_call_api(self, app, db, make_item):
+        """メモ化済みの検索はAPIを呼ばないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        result = SearchResult([make_item("memo00001")], 1)
+        
+        with patch.object(service, 'fetch_result', return_value=result) as mock_fetch:
+            service.search(floor='videoa', cid="memo00001", hits=1)
+            summary = service.fetch_items_by_content_ids(["memo00001"])
+        
+        assert mock_fetch.call_count == 1
+        assert summary['saved'] == 1
@@ -0,0 +1,108 @@
+"""
+DMM APIスタブサーバーを使った結合テスト
+"""
+import pytest
+
+from dmm_x_poster.db.models import Product, Image
+from dmm_x_poster.devtools.dmm_stub import DMMStubServer
+from dmm_x_poster.services.dmm_api import DMMAPIService
+from dmm_x_poster.services.rate_limiter import rate_limiter
+
+
+@pytest.fixture
+def stub_server():
+    """テスト用のスタブサーバーを起動"""
+    with DMMStubServer(catalog_size=250) as server:
+        yield server
+
+
+@pytest.fixture
+def stub_service(app, stub_server, monkeypatch):
+    """スタブサーバーに接続するDMMAPIService"""
+    monkeypatch.setitem(app.config, 'DMM_API_BASE_URL', stub_server.api_url)
+    monkeypatch.setitem(app.config, 'DMM_LITEVIDEO_BASE_URL', stub_server.base_url)
+    monkeypatch.setattr(rate_limiter, 'enabled', False)
+    service = DMMAPIService()
+    service.init_app(app)
+    return service
+
+
+class TestDMMStub:
+    """スタブサーバーのテストクラス"""
+
+    def test_crawl_paginates_whole_catalog(self, stub_service, stub_server):
+        """全ページを取得し、total_countどおりの件数になるかテスト"""
+        state = {}
+        pages = list(stub_service.crawl_items(sort='date', checkpoint=False, state=state))
+
+        assert [len(page) for page in pages] == [100, 100, 50]
+        assert state['stopped'] == 'completed'
+        content_ids = [item['content_id'] for page in pages for item in page]
+        assert len(set(content_ids)) == 250
+        assert stub_server.counts['api'] == 3
+
+    def test_filters(self, stub_service):
+        """ジャンルとcidの絞り込みが反映されるかテスト"""
+        result = stub_service.search(article_genre=['3'], hits=100)
+        assert result.ok
+        assert result.items
+        assert all(any(genre['id'] == 3 for genre in item['iteminfo']['genre']) for item in result.items)
+
+        result = stub_service.search(cid='stub00007')
+        assert [item['content_id'] for item in result.items] == ['stub00007']
+
+    def test_ingest_resolves_videos_from_pages_and_probes(self, stub_service, stub_server, db):
+        """商品ページのJSON-LDとHEAD確認の両方で動画URLを解決できるかテスト"""
+        items = stub_service.search(hits=20).items
+        with_video = sum(1 for item in items if 'sampleMovieURL' in item)
+
+        assert stub_service.save_items_to_db(items) == 20
+        assert Image.query.filter_by(image_type='movie').count() == with_video
+        assert stub_server.counts['page'] == 20
+
+        stub_service.probe_video_urls = True
+        more = stub_service.search(hits=20, offset=21).items
+        stub_service.save_items_to_db(more)
+        assert stub_server.counts['video'] > 0
+        assert Product.query.count() == 40
+
+    def test_streamed_page_stops_after_jsonld(self, stub_service, stub_server, monkeypatch):
+        """ストリーミング取得でJSON-LDの後を読まずに同じ動画URLを得るかテスト"""
+        monkeypatch.setattr(stub_server, 'page_kb', 256)
+        stub_service.cache = None
+        item = next(item for item in stub_service.search(hits=20).items if 'sampleMovieURL' in item)
+        expected = stub_service.extract_video_url_from_page(item['URL'])
+
+        stub_service.stream_pages = True
+        assert stub_service.extract_video_url_from_page(item['URL']) == expected
+        assert stub_service.page_stats['matched_early'] == 1
+        assert stub_service.page_stats['bytes'] < 256 * 1024 // 10
+
+    def test_errors_surface_as_failed_results(self, app, monkeypatch):
+        """障害が続くとリトライ後に失敗として返るかテスト"""
+        with DMMStubServer(catalog_size=10, error_rate=1.0) as server:
+            monkeypatch.setitem(app.config, 'DMM_API_BASE_URL', server.api_url)
+            monkeypatch.setitem(app.config, 'DMM_API_RETRIES', 1)
+            monkeypatch.setitem(app.config, 'DMM_API_BACKOFF_BASE', 0.01)
+            monkeypatch.setattr(rate_limiter, 'enabled', False)
+            service = DMMAPIService()
+            service.init_app(app)
+
+            result = service.search()
+
+        assert result.error == 'unavailable'
+        assert server.counts['errors'] == 2
+
+    def test_non_json_body_is_invalid_response(self, app, stub_server, monkeypatch):
+        """APIがJSONでない本文を返した場合にinvalid_responseになるかテスト"""
+        # 商品ページ（HTML）をAPIのURLとして指定する
+        monkeypatch.setitem(app.config, 'DMM_API_BASE_URL', f'{stub_server.base_url}/digital/videoa/-/detail/=/cid=stub00001/')
+        monkeypatch.setitem(app.config, 'DMM_API_RETRIES', 0)
+        monkeypatch.setattr(rate_limiter, 'enabled', False)
+        service = DMMAPIService()
+        service.init_app(app)
+
+        result = service.search()
+
+        assert result.error == 'invalid_response'
+        assert stub_server.counts['page'] == 1
@@ -0,0 +1,106 @@
+"""
+永続HTTPキャッシュのテスト
+"""
+import time
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+from dmm_x_poster.services.http_cache import HTTPCache
+from dmm_x_poster.services.dmm_api import DMMAPIService
+
+
+class TestHTTPCache:
+    """HTTPキャッシュのテストクラス"""
+
+    def test_fresh_entry_skips_network(self, make_page_response, tmp_path):
+        """新鮮なキャッシュがあればネットワークにアクセスしないかテスト"""
+        cache = HTTPCache(str(tmp_path / 'cache.db'), fresh_ttl=3600)
+        http = MagicMock()
+        http.get.return_value = make_page_response(content=b'page')
+
+        first = cache.fetch(http, 'https://www.dmm.co.jp/a')
+        second = cache.fetch(http, 'https://www.dmm.co.jp/a')
+
+        assert first.from_cache is False
+        assert second.from_cache is True
+        assert second.text == 'page'
+        assert http.get.call_count == 1
+
+    def test_revalidates_with_validators(self, make_page_response, tmp_path):
+        """期限切れのエントリをETag/Last-Modifiedで再検証するかテスト"""
+        cache = HTTPCache(str(tmp_path / 'cache.db'), fresh_ttl=0)
+        http = MagicMock()
+        http.get.side_effect = [
+            make_page_response(content=b'page', headers={'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+            make_page_response(status_code=304, content=b''),
+        ]
+
+        cache.fetch(http, 'https://www.dmm.co.jp/a', headers={'User-Agent': 'test'})
+        page = cache.fetch(http, 'https://www.dmm.co.jp/a', headers={'User-Agent': 'test'})
+
+        headers = http.get.call_args[1]['headers']
+        assert headers['If-None-Match'] == '"v1"'
+        assert headers['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+        assert headers['User-Agent'] == 'test'
+        assert page.from_cache is True
+        assert page.content == b'page'
+        assert cache.stats() == {'hits': 0, 'revalidated': 1, 'misses': 1}
+
+    def test_shared_between_instances(self, tmp_path):
+        """同じファイルを使う別インスタンス（別ワーカー）から参照できるかテスト"""
+        path = str(tmp_path / 'cache.db')
+        HTTPCache(path).store('https://www.dmm.co.jp/a', b'page', 'utf-8')
+        HTTPCache(path).set_negative('https://www.dmm.co.jp/b')
+
+        other = HTTPCache(path)
+        assert other.get('https://www.dmm.co.jp/a')['body'] == b'page'
+        assert other.is_negative('https://www.dmm.co.jp/b')
+
+    def test_negative_cache_expires(self, tmp_path):
+        """ネガティブキャッシュがTTL経過後に無効になるかテスト"""
+        cache = HTTPCache(str(tmp_path / 'cache.db'))
+        cache.set_negative('https://www.dmm.co.jp/a', ttl=60)
+        cache.set_negative('https://www.dmm.co.jp/b', ttl=-1)
+
+        assert cache.is_negative('https://www.dmm.co.jp/a')
+        assert not cache.is_negative('https://www.dmm.co.jp/b')
+
+    def test_extract_records_negative_result(self, make_page_response, app, tmp_path):
+        """動画が見つからないページをネガティブキャッシュし再取得しないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        service.cache = HTTPCache(str(tmp_path / 'cache.db'))
+
+        with patch.object(service.http, 'get', return_value=make_page_response(content=b'<html><body>no video</body></html>')) as mock_get:
+            assert service.extract_video_url_from_page('https://www.dmm.co.jp/a') is None
+            assert service.extract_video_url_from_page('https://www.dmm.co.jp/a') is None
+
+        assert mock_get.call_count == 1
+        assert service.cache.is_negative('https://www.dmm.co.jp/a')
+
+    def test_legacy_cache_entries_are_discarded(self, tmp_path):
+        """途中までの本文を保存していた以前の形式のキャッシュを破棄するかテスト"""
+        path = str(tmp_path / 'cache.db')
+        HTTPCache(path).store('https://www.dmm.co.jp/a', b'<head>', 'utf-8')
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA user_version = 0')
+        conn.commit()
+        conn.close()
+
+        assert HTTPCache(path).get('https://www.dmm.co.jp/a') is None
+
+    def test_purge_removes_old_and_excess_pages(self, tmp_path):
+        """古いページと上限を超えたページ、期限切れのネガティブキャッシュを削除するかテスト"""
+        cache = HTTPCache(str(tmp_path / 'cache.db'), max_age=3600, max_entries=2)
+        for index in range(4):
+            cache.store(f'https://www.dmm.co.jp/{index}', b'page', 'utf-8')
+        cache.set_negative('https://www.dmm.co.jp/gone', ttl=-1)
+        with patch('dmm_x_poster.services.http_cache.time.time', return_value=time.time() + 1):
+            cache.store('https://www.dmm.co.jp/3', b'page', 'utf-8')
+        with patch('dmm_x_poster.services.http_cache.time.time', return_value=time.time() - 7200):
+            cache.store('https://www.dmm.co.jp/old', b'page', 'utf-8')
+
+        assert cache.purge_expired() == {'responses': 3, 'negative': 1}
+        assert cache.get('https://www.dmm.co.jp/old') is None
+        assert cache.get('https://www.dmm.co.jp/3') is not None
+        assert cache._connect().execute('SELECT COUNT(*) FROM responses').fetchone()[0] == 2
@@ -0,0 +1,71 @@
+"""
+共有HTTPクライアントのテスト
+"""
+import threading
+import requests
+from unittest.mock import patch
+
+from dmm_x_poster.services.http_client import HTTPClient
+from dmm_x_poster.services.dmm_api import DMMAPIService
+
+
+class TestHTTPClient:
+    """HTTPクライアントのテストクラス"""
+
+    def test_from_config(self):
+        """設定値からプールサイズとタイムアウトを読み込むかテスト"""
+        client = HTTPClient.from_config({
+            'DMM_HTTP_POOL_MAXSIZE': 4,
+            'DMM_HTTP_CONNECT_TIMEOUT': 2,
+            'DMM_HTTP_READ_TIMEOUT': 7,
+        })
+
+        assert client.pool_maxsize == 4
+        assert client.timeout == (2, 7)
+        assert client.adapter.timeout == (2, 7)
+
+    def test_sessions_share_adapter_across_threads(self):
+        """スレッドごとのセッションが同じコネクションプールを共有するかテスト"""
+        client = HTTPClient()
+        sessions = []
+
+        def worker():
+            sessions.append(client.session)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len({id(s) for s in sessions}) == 3
+        for session in sessions:
+            assert session.get_adapter('https://api.dmm.com/') is client.adapter
+        # 同一スレッドでは同じセッションを再利用
+        assert client.session is client.session
+
+    def test_default_timeout_applied(self):
+        """タイムアウト未指定時にデフォルト値が渡されるかテスト"""
+        client = HTTPClient(connect_timeout=3, read_timeout=9)
+        request = requests.Request('GET', 'https://api.dmm.com/affiliate/v3/ItemList').prepare()
+
+        with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+            client.adapter.send(request)
+            assert mock_send.call_args[1]['timeout'] == (3, 9)
+
+            client.adapter.send(request, timeout=1)
+            assert mock_send.call_args[1]['timeout'] == 1
+
+    def test_keepalive_disabled(self):
+        """keepalive無効時にConnection: closeを送るかテスト"""
+        client = HTTPClient(keepalive=False)
+        assert client.session.headers['Connection'] == 'close'
+
+    def test_service_owns_client(self, app, monkeypatch):
+        """DMMAPIServiceがinit_appで設定済みのクライアントを持つかテスト"""
+        monkeypatch.setitem(app.config, 'DMM_HTTP_POOL_MAXSIZE', 6)
+        service = DMMAPIService()
+        service.init_app(app)
+
+        assert isinstance(service.http, HTTPClient)
+        assert service.http.pool_maxsize == 6
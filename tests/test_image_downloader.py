@@ -47,7 +47,7 @@ class TestImageDownloaderService:
         app.config['IMAGES_FOLDER'] = test_images_dir
         
         # リクエストとPIL画像のモック
-        with patch('dmm_x_poster.services.image_downloader.requests.get') as mock_get:
+        with patch('dmm_x_poster.services.http_client.HTTPClient.get') as mock_get:
             # モックレスポンスの作成
             mock_response = MagicMock()
             mock_response.raise_for_status.return_value = None
@@ -148,7 +148,7 @@ class TestImageDownloaderService:
         db.session.commit()
         
         # リクエストのモック（例外発生）
-        with patch('dmm_x_poster.services.image_downloader.requests.get') as mock_get:
+        with patch('dmm_x_poster.services.http_client.HTTPClient.get') as mock_get:
             mock_get.side_effect = Exception("Connection error")
             
             service = ImageDownloaderService()
@@ -193,7 +193,7 @@ class TestImageDownloaderService:
         db.session.commit()
         
         # リクエストとPIL画像のモック
-        with patch('dmm_x_poster.services.image_downloader.requests.get') as mock_get:
+        with patch('dmm_x_poster.services.http_client.HTTPClient.get') as mock_get:
             # モックレスポンスの作成
             mock_response = MagicMock()
             mock_response.raise_for_status.return_value = None
@@ -0,0 +1,115 @@
+"""
+商品取り込みパイプラインのテスト
+"""
+import time
+import pytest
+from unittest.mock import patch
+
+from dmm_x_poster.db.models import Product, Image, VideoEnrichmentTask
+from dmm_x_poster.services.dmm_api import DMMAPIService
+from dmm_x_poster.services.ingest_pipeline import IngestPipeline
+
+
+def make_pages(make_item, count, size=5, prefix="pipe"):
+    return [[make_item(f"{prefix}-{page}-{i}", page=True) for i in range(size)] for page in range(count)]
+
+
+class TestIngestPipeline:
+    """取り込みパイプラインのテストクラス"""
+
+    def make_service(self, app, defer=True):
+        service = DMMAPIService()
+        service.init_app(app)
+        service.defer_video_extraction = defer
+        return service
+
+    def test_saves_pages_and_reports_stages(self, app, db, sample_product, make_item):
+        """ページを保存し、重複と保存済みの商品を除外して段ごとの統計を残すかテスト"""
+        service = self.make_service(app)
+        pages = make_pages(make_item, 3)
+        pages[1].append(make_item("pipe-0-0", page=True))
+        pages[2].append(make_item(sample_product.dmm_product_id, page=True))
+
+        saved = service.ingest_pages(iter(pages))
+
+        assert saved == 15
+        assert Product.query.count() == 16
+        assert VideoEnrichmentTask.query.count() == 15
+        report = service.last_ingest_report
+        assert report['skipped'] == 2
+        assert report['stages']['fetch']['items'] == 17
+        assert report['stages']['enrich']['items'] == 15
+        assert report['stages']['persist']['items'] == 15
+        assert set(report['stages']) == set(IngestPipeline.STAGES)
+
+    def test_backpressure_bounds_pages_in_flight(self, app, db, make_item):
+        """保存が遅い場合に取得段が先行しすぎないかテスト"""
+        service = self.make_service(app)
+        fetched = []
+        persisted = []
+        max_lead = [0]
+
+        def pages():
+            for page in make_pages(make_item, 30, size=2):
+                fetched.append(page)
+                max_lead[0] = max(max_lead[0], len(fetched) - len(persisted))
+                yield page
+
+        original = service.persist_ingest_rows
+
+        def slow_persist(bundles):
+            time.sleep(0.01)
+            persisted.append(bundles)
+            return original(bundles)
+
+        with patch.object(service, 'persist_ingest_rows', side_effect=slow_persist):
+            saved = IngestPipeline(service, queue_size=1, batch_size=2, poll_interval=0.005).run(pages())
+
+        assert saved == 60
+        # 各キュー1ページ＋各段が処理中の1ページ程度に収まる
+        assert max_lead[0] <= 10
+
+    def test_fetch_failure_keeps_saved_pages(self, app, db, make_item):
+        """取得段で例外が起きても取得済みのページは保存されるかテスト"""
+        service = self.make_service(app)
+
+        def pages():
+            yield from make_pages(make_item, 2)
+            raise RuntimeError("api down")
+
+        pipeline = IngestPipeline(service, batch_size=100)
+        with pytest.raises(RuntimeError, match="api down"):
+            pipeline.run(pages())
+        assert pipeline.saved == 10
+        assert pipeline.report()['error'] == "api down"
+        assert Product.query.count() == 10
+
+    def test_fetch_failure_is_not_reported_as_success(self, app, db, make_item):
+        """取得段の例外が保存処理の呼び出し元に伝わるかテスト"""
+        service = self.make_service(app)
+
+        def pages():
+            yield from make_pages(make_item, 1)
+            raise RuntimeError("api down")
+
+        with pytest.raises(RuntimeError):
+            service.ingest_pages(pages())
+        assert service.last_ingest_report['saved'] == 5
+
+    def test_enrichment_failure_defers_to_queue(self, app, db, make_item):
+        """動画URLの解決に失敗した商品は動画URL抽出キューに回すかテスト"""
+        service = self.make_service(app, defer=False)
+        video = "https://cc3001.dmm.co.jp/litevideo/freepv/p/pip/pipe-ok/pipe-ok_dm_w.mp4"
+
+        def resolve(items):
+            if items[0]['content_id'] == "pipe-ng":
+                raise RuntimeError("resolver crashed")
+            return {item['URL']: video for item in items}
+
+        with patch.object(service, 'resolve_video_urls', side_effect=resolve):
+            saved = IngestPipeline(service).run([[make_item("pipe-ok", page=True)], [make_item("pipe-ng", page=True)]])
+
+        assert saved == 2
+        assert Image.query.filter_by(image_type='movie').count() == 1
+        task = VideoEnrichmentTask.query.one()
+        assert task.product.dmm_product_id == "pipe-ng"
@@ -0,0 +1,46 @@
+"""
+マイグレーションのテスト
+"""
+import os
+import shutil
+
+import pytest
+from flask import Flask
+from flask_migrate import Migrate, upgrade, check
+
+from dmm_x_poster.db.models import db
+
+MIGRATIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src/migrations'))
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    """自動生成したリビジョンがリポジトリに書き込まれないよう一時ディレクトリにコピー"""
+    directory = tmp_path / 'migrations'
+    shutil.copytree(MIGRATIONS_DIR, directory, ignore=shutil.ignore_patterns('__pycache__'))
+    return str(directory)
+
+
+@pytest.fixture
+def migration_app(tmp_path):
+    """一時ファイルのSQLiteに接続するマイグレーション用のアプリケーション"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'migrations.db'}"
+    db.init_app(app)
+    Migrate(app, db)
+    return app
+
+
+class TestMigrations:
+    """マイグレーションのテストクラス"""
+
+    def test_autogenerate_against_head_is_empty(self, migration_app, migrations_dir):
+        """最新までアップグレードしたDBに対してautogenerateが変更を検出しないかテスト
+
+        全文検索インデックス（products_fts*）はモデルの外で作成されるため、
+        除外しないと削除操作が生成される。
+        """
+        with migration_app.app_context():
+            upgrade(directory=migrations_dir)
+            # 変更を検出した場合はSystemExitになる
+            check(directory=migrations_dir)
@@ -4,8 +4,12 @@
 import json
 import pytest
 from datetime import datetime
+from sqlalchemy import insert
 
-from dmm_x_poster.db.models import Product, Image, Post, PostImage
+from dmm_x_poster.db import models
+from dmm_x_poster.db.models import (
+    Product, Image, Post, PostImage, Actress, Maker, ProductActress, ProductGenre, search_products
+)
 
 
 class TestProductModel:
@@ -90,7 +94,55 @@ class TestProductModel:
         assert len(retrieved_genres) == 2
         assert "ジャンルA" in retrieved_genres
         assert "ジャンルB" in retrieved_genres
-    
+
+    def test_lists_are_decoded_once_when_loaded(self, db, mocker):
+        """女優・ジャンルが読み込み時に一度だけデコードされ、JSON文字列として保存されるかテスト"""
+        product = Product(
+            dmm_product_id="test-005",
+            title="テスト商品",
+            actresses=["女優A", "女優B"],
+            genres=["ジャンルA"],
+            url="https://example.com/product/test-005"
+        )
+        db.session.add(product)
+        db.session.commit()
+
+        # 日本語をエスケープしないJSON文字列として保存（全文検索・LIKE検索が使う）
+        raw = db.session.execute(db.text("SELECT actresses FROM products WHERE id = :id"), {'id': product.id}).scalar()
+        assert raw == '["女優A", "女優B"]'
+
+        db.session.expire_all()
+        loads = mocker.spy(models.json, 'loads')
+        product = db.session.get(Product, product.id)
+        for _ in range(4):
+            assert product.get_actresses_list() == ["女優A", "女優B"]
+            assert product.get_genres_list() == ["ジャンルA"]
+        assert loads.call_count == 2
+
+    def test_assignment_replaces_decoded_list(self, db):
+        """代入したJSON文字列・リスト・Noneがすぐに反映されるかテスト"""
+        product = Product(
+            dmm_product_id="test-006",
+            title="テスト商品",
+            actresses=json.dumps(["女優A"], ensure_ascii=False),
+            url="https://example.com/product/test-006"
+        )
+        assert product.get_actresses_list() == ["女優A"]
+
+        product.actresses = json.dumps(["女優B"], ensure_ascii=False)
+        assert product.get_actresses_list() == ["女優B"]
+        product.actresses = ["女優C"]
+        assert product.get_actresses_list() == ["女優C"]
+        db.session.add(product)
+        db.session.commit()
+
+        product.actresses = None
+        assert product.get_actresses_list() == []
+        db.session.commit()
+        db.session.expire_all()
+        assert product.actresses is None
+        assert product.get_actresses_list() == []
+
     def test_get_selected_images(self, db):
         """get_selected_imagesメソッドのテスト"""
         # 商品を作成
@@ -248,4 +300,121 @@ class TestPostImageModel:
         
         # リレーションシップが機能するか
         assert saved_post_image.post.id == post.id
-        assert saved_post_image.image.id == sample_images[0].id
\ No newline at end of file
+        assert saved_post_image.image.id == sample_images[0].id
+
+
+class TestProductTags:
+    """女優・ジャンル・メーカーの正規化テーブルのテストクラス"""
+    
+    @staticmethod
+    def make_product(dmm_product_id, actresses, genres=(), maker=None):
+        return Product(
+            dmm_product_id=dmm_product_id,
+            title="タグ商品",
+            url=f"https://example.com/product/{dmm_product_id}",
+            actresses=json.dumps(list(actresses), ensure_ascii=False),
+            genres=json.dumps(list(genres), ensure_ascii=False),
+            maker=maker,
+        )
+    
+    def test_orm_writes_are_indexed(self, db):
+        """ORMで保存した商品の関連とメーカーIDが登録されるかテスト"""
+        db.session.add_all([
+            self.make_product("tag-001", ["女優1", "女優2"], ["ジャンルA"], maker="メーカーX"),
+            self.make_product("tag-002", ["女優12"], ["ジャンルA"], maker="メーカーX"),
+        ])
+        db.session.commit()
+        
+        assert Actress.query.count() == 3
+        assert ProductGenre.query.count() == 2
+        maker = Maker.query.filter_by(name="メーカーX").one()
+        assert {p.maker_id for p in Product.query.all()} == {maker.id}
+        
+        # 部分一致では一致しない（"女優1"で"女優12"を拾わない）
+        hits = Product.query.filter(Product.tagged_with('actress', "女優1")).all()
+        assert [p.dmm_product_id for p in hits] == ["tag-001"]
+        hits = Product.query.filter(Product.tagged_with('genre', "ジャンルA"),
+                                    Product.tagged_with('actress', "女優12")).all()
+        assert [p.dmm_product_id for p in hits] == ["tag-002"]
+        # JSON列からの取得はこれまでどおり
+        assert hits[0].get_actresses_list() == ["女優12"]
+    
+    def test_update_and_delete_keep_links_in_sync(self, db):
+        """女優の変更と商品の削除が関連テーブルに反映されるかテスト"""
+        product = self.make_product("tag-003", ["女優A", "女優B"], maker="メーカーY")
+        db.session.add(product)
+        db.session.commit()
+        
+        product.actresses = json.dumps(["女優C"], ensure_ascii=False)
+        product.maker = None
+        db.session.commit()
+        
+        assert Product.query.filter(Product.tagged_with('actress', "女優A")).count() == 0
+        assert Product.query.filter(Product.tagged_with('actress', "女優C")).one().id == product.id
+        assert product.maker_id is None
+        
+        db.session.delete(product)
+        db.session.commit()
+        assert ProductActress.query.count() == 0
+
+
+
+class TestProductSearch:
+    """商品の全文検索のテストクラス"""
+    
+    make_product = staticmethod(TestProductTags.make_product)
+    
+    @staticmethod
+    def search(keyword):
+        query, rank = search_products(Product.query, keyword)
+        if rank is not None:
+            query = query.order_by(rank)
+        return [p.dmm_product_id for p in query], rank
+    
+    def test_ranks_title_matches_first(self, db):
+        """タイトル・女優・ジャンル・メーカーを検索し、タイトルの一致を上位にするかテスト"""
+        title_hit = self.make_product("fts-001", ["佐藤花子"])
+        title_hit.title = "夏の思い出スペシャル"
+        actress_hit = self.make_product("fts-002", ["夏の思い出"], maker="思い出レーベル")
+        db.session.add_all([actress_hit, title_hit, self.make_product("fts-003", ["鈴木"])])
+        db.session.commit()
+        
+        ids, rank = self.search("夏の思い出")
+        assert rank is not None
+        assert ids == ["fts-001", "fts-002"]
+        assert self.search("佐藤花子")[0] == ["fts-001"]
+        # 複数の語はAND検索
+        assert self.search("思い出 レーベル")[0] == ["fts-002"]
+    
+    def test_index_follows_updates_and_bulk_inserts(self, db):
+        """ORMの更新・削除と一括INSERTが索引に反映されるかテスト"""
+        product = self.make_product("fts-004", ["女優A"])
+        product.title = "冬のスペシャル"
+        db.session.add(product)
+        db.session.commit()
+        
+        product.title = "春のスペシャル"
+        db.session.commit()
+        assert self.search("冬のスペ")[0] == []
+        assert self.search("春のスペ")[0] == ["fts-004"]
+        
+        db.session.execute(insert(Product), [{
+            'dmm_product_id': "fts-005", 'title': "春のスペシャル第二弾", 'url': "https://example.com/fts-005",
+        }])
+        db.session.delete(product)
+        db.session.commit()
+        assert self.search("春のスペ")[0] == ["fts-005"]
+    
+    def test_short_terms_and_fallback_use_like(self, db, monkeypatch):
+        """2文字以下の語と全文検索インデックスがない場合はLIKE検索になるかテスト"""
+        product = self.make_product("fts-006", ["女優A"])
+        product.title = "秋の\"特集\" OR 号"
+        db.session.add(product)
+        db.session.commit()
+        
+        assert self.search("秋の") == (["fts-006"], None)
+        # FTS5の演算子として解釈されない
+        assert self.search('"特集" OR')[0] == ["fts-006"]
+        
+        monkeypatch.setattr(models, 'product_search_available', lambda connection: False)
+        assert self.search("秋の\"特集") == (["fts-006"], None)
@@ -0,0 +1,76 @@
+"""
+商品ページのストリーミング取得のテスト
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from dmm_x_poster.services.http_cache import HTTPCache
+from dmm_x_poster.services.dmm_api import DMMAPIService
+
+
+class TestPageStreaming:
+    """商品ページのストリーミング取得のテストクラス"""
+
+    def test_streamed_body_is_cached_only_when_complete(self, make_page_response, tmp_path):
+        """最後まで読んだ本文だけを保存し、途中で読むのをやめた本文は保存しないかテスト"""
+        cache = HTTPCache(str(tmp_path / 'cache.db'), fresh_ttl=3600)
+        http = MagicMock()
+        http.get.return_value = make_page_response()
+
+        page = cache.fetch(http, 'https://www.dmm.co.jp/a', read_body=lambda response: (b'<head>', 'match'))
+        assert page.stopped == 'match'
+        assert cache.get('https://www.dmm.co.jp/a') is None
+
+        page = cache.fetch(http, 'https://www.dmm.co.jp/c', read_body=lambda response: (b'<html></html>', 'eof'))
+        assert page.stopped == 'eof'
+        assert cache.get('https://www.dmm.co.jp/c')['body'] == b'<html></html>'
+
+        page = cache.fetch(http, 'https://www.dmm.co.jp/b', read_body=lambda response: (b'<html', 'budget'))
+        assert page.stopped == 'budget'
+        assert cache.get('https://www.dmm.co.jp/b') is None
+
+    def test_jsonld_api_reads_whole_page_after_streamed_extract(self, make_page_response, client, tmp_path, monkeypatch):
+        """動画URLの抽出で途中まで読んだページが、JSON-LD一覧のAPIで切り詰められないかテスト"""
+        from dmm_x_poster.services.dmm_api import dmm_api_service
+
+        video = {"@type": "Product", "subjectOf": {
+            "@type": "VideoObject",
+            "contentUrl": "https://cc3001.dmm.co.jp/litevideo/freepv/s/ssi/ssis00001/ssis00001_mhb_w.mp4"}}
+        head = f'<html><head><script type="application/ld+json">{json.dumps(video)}</script>'.encode()
+        tail = b'</head><body><script type="application/ld+json">{"@type": "BreadcrumbList"}</script></body></html>'
+        response = make_page_response(content=head + tail)
+        response.iter_content.side_effect = lambda size: iter([head, tail])
+
+        monkeypatch.setattr(dmm_api_service, 'cache', HTTPCache(str(tmp_path / 'cache.db')))
+        monkeypatch.setattr(dmm_api_service, 'stream_pages', True)
+        url = 'https://www.dmm.co.jp/a'
+        with patch.object(dmm_api_service.http, 'get', return_value=response):
+            assert dmm_api_service.extract_video_url_from_page(url)
+            assert dmm_api_service.cache.get(url) is None
+            result = client.get(f'/api/extract_jsonld?url={url}').get_json()
+
+        assert result['count'] == 2
+        assert dmm_api_service.cache.get(url)['body'] == head + tail
+
+    def test_budget_exceeded_reads_whole_page(self, make_page_response, app, tmp_path):
+        """上限までに動画URLがない場合はページ全体を読み直し、ネガティブキャッシュしないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        service.cache = HTTPCache(str(tmp_path / 'cache.db'))
+        service.stream_pages = True
+        service.stream_byte_budget = 1024
+
+        video = {"@type": "Product", "subjectOf": {
+            "@type": "VideoObject",
+            "contentUrl": "https://cc3001.dmm.co.jp/litevideo/freepv/s/ssi/ssis00001/ssis00001_mhb_w.mp4"}}
+        page = (b'<html><body>' + b'<p>filler</p>' * 200
+                + f'<script type="application/ld+json">{json.dumps(video)}</script></body></html>'.encode())
+        response = make_page_response(content=page)
+        response.iter_content.side_effect = lambda size: (page[i:i + 512] for i in range(0, len(page), 512))
+
+        with patch.object(service.http, 'get', return_value=response) as mock_get:
+            assert service.extract_video_url_from_page('https://www.dmm.co.jp/a').endswith('_dm_w.mp4')
+
+        assert mock_get.call_count == 2
+        assert service.page_stats['budget_exceeded'] == 1
+        assert not service.cache.is_negative('https://www.dmm.co.jp/a')
@@ -0,0 +1,73 @@
+"""
+商品ページ解析のプロセスプールのテスト
+"""
+from unittest.mock import patch, MagicMock
+
+from dmm_x_poster.services.dmm_api import DMMAPIService
+from dmm_x_poster.services.http_cache import CachedPage
+from dmm_x_poster.services.parse_pool import ParsePool, resolve_process_count
+
+
+VIDEO = "https://cc3001.dmm.co.jp/litevideo/freepv/a/abc/abcd00001/abcd00001_mhb_w.mp4"
+PAGE = (
+    '<html><head><script type="application/ld+json">'
+    '{"@type": "Product", "subjectOf": {"@type": "VideoObject", "contentUrl": "%s"}}'
+    '</script></head><body></body></html>' % VIDEO
+).encode('utf-8')
+
+
+class TestParsePool:
+    """プロセスプールのテストクラス"""
+
+    def test_resolve_process_count(self):
+        """設定値からプロセス数を決定するかテスト"""
+        assert resolve_process_count('0') == 0
+        assert resolve_process_count(None) == 0
+        assert resolve_process_count('3') == 3
+        assert resolve_process_count('auto') >= 1
+
+    def test_process_pool_matches_inline(self):
+        """プロセスプールでも呼び出し元での解析と同じ結果になるかテスト"""
+        pages = [PAGE, b'<html><body>no video</body></html>']
+        inline = ParsePool(processes=0)
+        pool = ParsePool(processes=2)
+        try:
+            assert [pool.extract(page) for page in pages] == [inline.extract(page) for page in pages]
+            assert pool.extract(PAGE) == VIDEO.replace('.mp4', '_dm_w.mp4')
+        finally:
+            pool.close()
+
+    def test_broken_pool_falls_back_inline(self):
+        """ワーカーが異常終了した場合は呼び出し元で解析してプールを作り直すかテスト"""
+        from concurrent.futures.process import BrokenProcessPool
+        pool = ParsePool(processes=1)
+        executor = MagicMock()
+        executor.submit.side_effect = BrokenProcessPool("worker died")
+        pool._executor = executor
+
+        assert pool.extract(PAGE) == VIDEO.replace('.mp4', '_dm_w.mp4')
+        assert pool._executor is None
+        executor.shutdown.assert_called_once()
+
+    def test_older_python_skips_unsupported_arguments(self):
+        """max_tasks_per_child・cancel_futuresに未対応のバージョンでは渡さないかテスト"""
+        pool = ParsePool(processes=1, max_tasks_per_child=10)
+        with patch('dmm_x_poster.services.parse_pool.MAX_TASKS_PER_CHILD_SUPPORTED', False), \
+                patch('dmm_x_poster.services.parse_pool.CANCEL_FUTURES_SUPPORTED', False), \
+                patch('dmm_x_poster.services.parse_pool.ProcessPoolExecutor') as mock_executor:
+            pool._get_executor()
+            pool.close()
+
+        assert 'max_tasks_per_child' not in mock_executor.call_args.kwargs
+        mock_executor.return_value.shutdown.assert_called_once_with(wait=True)
+
+    def test_service_parses_through_pool(self, app):
+        """商品ページからの動画URL抽出がプールを経由するかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        service.cache = None
+        page_url = "https://www.dmm.co.jp/digital/videoa/-/detail/=/cid=abcd00001/"
+        with patch.object(service, 'fetch_product_page', return_value=CachedPage(page_url, PAGE, 'utf-8')), \
+                patch.object(service.parse_pool, 'extract', return_value=VIDEO) as mock_extract:
+            assert service.extract_video_url_from_page(page_url) == VIDEO
+        mock_extract.assert_called_once_with(PAGE, 'utf-8')
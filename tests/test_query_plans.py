@@ -0,0 +1,114 @@
+"""
+よく実行されるクエリの実行計画のテスト
+
+実際の処理を呼び出して発行されたSELECT文を記録し、SQLiteのEXPLAIN QUERY PLANで
+テーブルの全件走査（索引を使わないSCAN）になっていないかを確認する。
+"""
+import re
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+
+from dmm_x_poster.db.models import db as _db, Post
+from dmm_x_poster.services.scheduler import SchedulerService
+from dmm_x_poster.services.twitter_api import TwitterAPIService
+
+# 索引を使わない走査（SCAN テーブル名 の後にUSING ... INDEXが続かない行）
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?! USING (?:COVERING |INTEGER PRIMARY KEY)?INDEX| VIRTUAL TABLE)')
+
+
+@contextmanager
+def capture_selects():
+    """ブロック内で発行されたSELECT文とパラメータを記録"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    engine = _db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def full_scans(statement, parameters):
+    """実行計画のうちテーブルの全件走査になっている行を取得"""
+    tables = set(_db.metadata.tables)
+    with _db.engine.connect() as connection:
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    scans = []
+    for row in plan:
+        match = FULL_SCAN_RE.match(row[-1])
+        if match and match.group(1) in tables:
+            scans.append(row[-1])
+    return scans
+
+
+def assert_no_full_scans(statements):
+    """記録したSELECT文に全件走査がないことを確認"""
+    assert statements, "no queries were captured"
+    failures = []
+    for statement, parameters in statements:
+        scans = full_scans(statement, parameters)
+        if scans:
+            failures.append(f"{' / '.join(scans)}\n    {statement}")
+    assert not failures, "full table scans:\n" + "\n".join(failures)
+
+
+class TestQueryPlans:
+    """よく実行されるクエリの実行計画のテストクラス"""
+
+    def test_harness_detects_full_scan(self, db):
+        """索引のない列の検索を全件走査として検出するかテスト"""
+        assert full_scans("SELECT id FROM products WHERE title = ?", ("x",)) == ["SCAN products"]
+        assert full_scans("SELECT id FROM products WHERE dmm_product_id = ?", ("x",)) == []
+
+    @pytest.mark.parametrize('path', [
+        '/',
+        '/products',
+        '/products?sort=release&release_status=released',
+        '/products?actress=女優A&genres=ジャンルA',
+        '/products?keyword=サンプル商品',
+        '/favorites',
+        '/posts?status=scheduled',
+        '/posts?status=posted',
+    ])
+    def test_pages(self, client, sample_product, path):
+        """画面表示のクエリが索引を使うかテスト"""
+        with capture_selects() as statements:
+            assert client.get(path).status_code == 200
+        assert_no_full_scans(statements)
+
+    def test_product_detail_images(self, client, sample_product, sample_images):
+        """商品詳細と選択済み画像の取得が索引を使うかテスト"""
+        with capture_selects() as statements:
+            assert client.get(f'/products/{sample_product.id}').status_code == 200
+            sample_product.get_selected_images()
+        assert_no_full_scans(statements)
+
+    def test_scheduler_queries(self, app, db, sample_product, sample_images):
+        """投稿スケジュールのクエリが索引を使うかテスト"""
+        service = SchedulerService()
+        service.init_app(app)
+        with capture_selects() as statements:
+            service.schedule_unposted_products()
+            service.calculate_next_post_time()
+        post = Post.query.first()
+        with capture_selects() as more:
+            post.get_images()
+        statements.extend(more)
+        assert_no_full_scans(statements)
+
+    def test_process_scheduled_posts(self, app, db, sample_product):
+        """予定投稿の検索が索引を使うかテスト"""
+        service = TwitterAPIService()
+        with patch.object(TwitterAPIService, 'is_authenticated', return_value=True), \
+                patch.object(TwitterAPIService, 'post_with_media', return_value=True), \
+                capture_selects() as statements:
+            service.process_scheduled_posts()
+        assert_no_full_scans(statements)
@@ -0,0 +1,124 @@
+"""
+レートリミッターのテスト
+"""
+import time
+import threading
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from dmm_x_poster.services.http_client import HTTPClient
+from dmm_x_poster.services.rate_limiter import RateLimiter, TokenBucket, HostGovernor
+
+
+class TestRateLimiter:
+    """レートリミッターのテストクラス"""
+
+    def test_token_bucket_limits_rate(self):
+        """バースト分を使い切った後は補充レートで待機するかテスト"""
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # バースト2件 + 4件 / 50rps = 約0.08秒
+        assert time.monotonic() - start >= 0.07
+
+    def test_aimd_decrease_and_increase(self):
+        """スロットリングで上限が半減し、成功で徐々に回復するかテスト"""
+        governor = HostGovernor('api.dmm.com', rate=1000, burst=1000, max_concurrency=8)
+
+        governor.acquire()
+        governor.release(throttled=True)
+        assert governor.limit == 4
+
+        governor.acquire()
+        governor.release(throttled=True)
+        assert governor.limit == 2
+
+        for _ in range(20):
+            governor.acquire()
+            governor.release()
+        assert 2 < governor.limit <= 8
+        assert governor.metrics()['throttled'] == 2
+
+    def test_concurrency_limit_per_host(self):
+        """同時実行数がホストの上限を超えないかテスト"""
+        limiter = RateLimiter()
+        limiter.host_limits = {'pics.dmm.co.jp': (1000, 1000, 2)}
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def worker():
+            with limiter.slot('pics.dmm.co.jp'):
+                with lock:
+                    state['active'] += 1
+                    state['peak'] = max(state['peak'], state['active'])
+                time.sleep(0.02)
+                with lock:
+                    state['active'] -= 1
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert state['peak'] <= 2
+        assert limiter.metrics()['pics.dmm.co.jp']['successes'] == 6
+
+    def test_http_client_records_throttling(self):
+        """HTTPClientが429やタイムアウトをリミッターに伝えるかテスト"""
+        limiter = RateLimiter()
+        limiter.host_limits = {'api.dmm.com': (1000, 1000, 4)}
+        client = HTTPClient(limiter=limiter)
+
+        throttled = MagicMock(status_code=429)
+        with patch('requests.Session.request', return_value=throttled):
+            client.get('https://api.dmm.com/affiliate/v3/ItemList')
+        assert limiter.metrics()['api.dmm.com']['concurrency_limit'] == 2
+
+        with patch('requests.Session.request', side_effect=requests.Timeout()):
+            try:
+                client.get('https://api.dmm.com/affiliate/v3/ItemList')
+            except requests.Timeout:
+                pass
+        assert limiter.metrics()['api.dmm.com']['throttled'] == 2
+
+    def test_http_client_records_other_request_errors(self):
+        """タイムアウト・接続エラー以外の通信エラーもリミッターに伝えるかテスト"""
+        limiter = RateLimiter()
+        limiter.host_limits = {'api.dmm.com': (1000, 1000, 4)}
+        client = HTTPClient(limiter=limiter)
+
+        for error in (requests.exceptions.ChunkedEncodingError(), requests.TooManyRedirects()):
+            with patch('requests.Session.request', side_effect=error):
+                try:
+                    client.get('https://api.dmm.com/affiliate/v3/ItemList')
+                except requests.RequestException:
+                    pass
+        metrics = limiter.metrics()['api.dmm.com']
+        assert metrics['throttled'] == 2
+        assert metrics['in_flight'] == 0
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        """ストリーミング取得では本文を閉じるまで同時実行枠を保持するかテスト"""
+        limiter = RateLimiter()
+        limiter.host_limits = {'www.dmm.co.jp': (1000, 1000, 1)}
+        client = HTTPClient(limiter=limiter)
+        url = 'https://www.dmm.co.jp/digital/videoa/-/detail/=/cid=abcd00001/'
+
+        with patch('requests.Session.request', return_value=MagicMock(status_code=200)):
+            response = client.get(url, stream=True)
+            assert limiter.metrics()['www.dmm.co.jp']['in_flight'] == 1
+            response.close()
+            response.close()
+            assert limiter.metrics()['www.dmm.co.jp']['in_flight'] == 0
+
+            client.get(url)
+            assert limiter.metrics()['www.dmm.co.jp']['in_flight'] == 0
+
+    def test_metrics_endpoint(self, client):
+        """レート制限のメトリクスをJSONで取得できるかテスト"""
+        response = client.get('/api/metrics/rate_limits')
+        assert response.status_code == 200
+        assert isinstance(response.get_json(), dict)
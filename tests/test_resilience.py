@@ -0,0 +1,63 @@
+"""
+リトライ・サーキットブレーカーのテスト
+"""
+import random
+
+from dmm_x_poster.services.resilience import CircuitBreaker, backoff_delay
+
+
+class TestBackoff:
+    """指数バックオフのテストクラス"""
+
+    def test_delay_is_capped_and_jittered(self):
+        """待機時間が上限以下かつばらつくかテスト"""
+        rng = random.Random(1)
+        delays = [backoff_delay(10, base=0.5, cap=8.0, rng=rng) for _ in range(50)]
+        assert all(0 <= d <= 8.0 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_delay_grows_with_attempts(self):
+        """試行回数に応じて上限が倍々に増えるかテスト"""
+        class MaxRandom:
+            @staticmethod
+            def uniform(low, high):
+                return high
+        assert backoff_delay(0, base=0.5, cap=8.0, rng=MaxRandom) == 0.5
+        assert backoff_delay(2, base=0.5, cap=8.0, rng=MaxRandom) == 2.0
+        assert backoff_delay(6, base=0.5, cap=8.0, rng=MaxRandom) == 8.0
+
+
+class TestCircuitBreaker:
+    """サーキットブレーカーのテストクラス"""
+
+    def test_opens_after_threshold(self):
+        """連続失敗がしきい値に達すると遮断するかテスト"""
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.metrics()['rejected'] == 1
+
+    def test_success_resets_failures(self):
+        """成功で連続失敗数がリセットされるかテスト"""
+        breaker = CircuitBreaker('test', failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_single_trial(self):
+        """一定時間後に1件だけ試行を許可し、結果で状態が変わるかテスト"""
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
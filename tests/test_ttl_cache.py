@@ -0,0 +1,38 @@
+"""
+TTLキャッシュのテスト
+"""
+import time
+
+from dmm_x_poster.services.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    """TTLキャッシュのテストクラス"""
+
+    def test_hit_and_miss_counters(self):
+        """ヒット数とミス数を数えるかテスト"""
+        cache = TTLCache(maxsize=4, ttl=60)
+        assert cache.get('a') is None
+        cache.set('a', [1])
+        assert cache.get('a') == [1]
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_expires_after_ttl(self):
+        """TTL経過後はミスになるかテスト"""
+        cache = TTLCache(maxsize=4, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """サイズ上限を超えたら最も古く使われたエントリを削除するかテスト"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
@@ -0,0 +1,170 @@
+"""
+動画URL抽出キューのテスト
+"""
+from unittest.mock import patch
+
+import pytest
+import requests
+from sqlalchemy import event
+
+from dmm_x_poster.db.models import Product, Image, VideoEnrichmentTask
+from dmm_x_poster.services.http_cache import HTTPCache
+from dmm_x_poster.services.dmm_api import DMMAPIService, VideoExtractionError, dmm_api_service
+from dmm_x_poster.services.video_enrichment import (
+    VideoEnrichmentService, INTERACTIVE_PRIORITY, video_enrichment_service
+)
+
+
+def video_url(content_id):
+    return f"https://cc3001.dmm.co.jp/litevideo/freepv/q/que/{content_id}/{content_id}_dm_w.mp4"
+
+
+class TestVideoEnrichment:
+    """動画URL抽出キューのテストクラス"""
+
+    def ingest_deferred(self, app, make_item, content_ids):
+        service = DMMAPIService()
+        service.init_app(app)
+        service.defer_video_extraction = True
+        with patch.object(service, 'extract_video_url_from_page') as mock_extract:
+            saved = service.save_items_to_db([make_item(cid, page=True) for cid in content_ids])
+        mock_extract.assert_not_called()
+        return saved
+
+    def test_deferred_ingest_enqueues_tasks(self, app, db, make_item):
+        """商品ページを取得せずに保存し、キューに登録するかテスト"""
+        assert self.ingest_deferred(app, make_item, ["que-001", "que-002"]) == 2
+
+        assert Product.query.count() == 2
+        assert Image.query.filter_by(image_type='movie').count() == 0
+        tasks = VideoEnrichmentTask.query.order_by(VideoEnrichmentTask.id).all()
+        assert [task.status for task in tasks] == ['pending', 'pending']
+        assert tasks[0].page_url == "https://example.com/page/que-001"
+
+    def test_worker_adds_movie_images(self, app, db, make_item):
+        """ワーカーが動画URLをmovie画像として追加するかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001", "que-002"])
+        worker = VideoEnrichmentService()
+        worker.init_app(app)
+
+        def extract(page_url):
+            return video_url("que-001") if page_url.endswith("que-001") else None
+
+        with patch.object(dmm_api_service, 'extract_video_url_from_page', side_effect=extract):
+            assert worker.process_batch() == 1
+
+        product = Product.query.filter_by(dmm_product_id="que-001").first()
+        assert Image.query.filter_by(product_id=product.id, image_type='movie').one().image_url == video_url("que-001")
+        assert VideoEnrichmentTask.query.filter_by(status='done').count() == 2
+        assert worker.pending_count() == 0
+
+    def test_prioritized_task_is_processed_first(self, app, db, make_item):
+        """詳細ページを開いた商品のタスクが先に処理されるかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001", "que-002", "que-003"])
+        worker = VideoEnrichmentService()
+        worker.init_app(app)
+        product = Product.query.filter_by(dmm_product_id="que-003").first()
+
+        assert worker.prioritize(product.id)
+        assert VideoEnrichmentTask.query.filter_by(product_id=product.id).one().priority == INTERACTIVE_PRIORITY
+
+        tasks = worker.claim_batch(limit=1)
+        assert [task.product_id for task in tasks] == [product.id]
+
+    def test_failed_batch_is_retried_then_marked_failed(self, app, db, make_item):
+        """抽出処理の例外で未処理に戻り、上限回数で失敗扱いになるかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001"])
+        worker = VideoEnrichmentService()
+        worker.init_app(app)
+        worker.max_attempts = 2
+
+        with patch.object(dmm_api_service, 'resolve_video_urls', side_effect=RuntimeError("boom")):
+            worker.process_batch()
+            assert VideoEnrichmentTask.query.one().status == 'pending'
+            worker.process_batch()
+
+        task = VideoEnrichmentTask.query.one()
+        assert task.status == 'failed'
+        assert task.attempts == 2
+        assert task.last_error == "boom"
+
+    def test_page_failure_is_retried_not_done(self, app, db, make_item):
+        """商品ページの取得に失敗したタスクは完了にせず、未処理に戻すかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001", "que-002"])
+        worker = VideoEnrichmentService()
+        worker.init_app(app)
+        worker.max_attempts = 2
+
+        def extract(page_url):
+            if page_url.endswith("que-001"):
+                raise VideoExtractionError("read timeout")
+            return None
+
+        with patch.object(dmm_api_service, 'extract_video_url_from_page', side_effect=extract):
+            assert worker.process_batch() == 0
+            failed = VideoEnrichmentTask.query.filter_by(page_url="https://example.com/page/que-001").one()
+            assert (failed.status, failed.attempts, failed.last_error) == ('pending', 1, "read timeout")
+            assert VideoEnrichmentTask.query.filter_by(status='done').count() == 1
+
+            worker.process_batch()
+
+        failed = VideoEnrichmentTask.query.filter_by(page_url="https://example.com/page/que-001").one()
+        assert (failed.status, failed.attempts) == ('failed', 2)
+
+    def test_claim_skips_tasks_taken_by_another_worker(self, app, db, make_item):
+        """選択後に別のワーカーが取り出したタスクを重ねて取り出さないかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001", "que-002"])
+        worker = VideoEnrichmentService()
+        worker.init_app(app)
+        taken = VideoEnrichmentTask.query.order_by(VideoEnrichmentTask.id).first().id
+
+        def other_worker(conn, cursor, statement, parameters, context, executemany):
+            # 取り出しのUPDATEの直前に、別のワーカーが先頭のタスクを処理中にする
+            if statement.startswith('UPDATE video_enrichment_tasks') and 'attempts' in statement:
+                cursor.execute("UPDATE video_enrichment_tasks SET status = 'running' WHERE id = ?", (taken,))
+
+        event.listen(db.engine, 'before_cursor_execute', other_worker)
+        try:
+            tasks = worker.claim_batch()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', other_worker)
+
+        assert taken not in [task.id for task in tasks]
+        assert len(tasks) == 1
+
+    def test_detail_page_writes_only_when_prioritizing(self, app, db, client, make_item):
+        """詳細ページの表示で、優先度を上げる必要がある場合だけ書き込むかテスト"""
+        self.ingest_deferred(app, make_item, ["que-001"])
+        product = Product.query.one()
+        writes = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('UPDATE', 'INSERT', 'DELETE')):
+                writes.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            with patch.object(video_enrichment_service, 'wake_up') as wake_up:
+                assert client.get(f'/products/{product.id}').status_code == 200
+                assert len(writes) == 1
+                assert client.get(f'/products/{product.id}').status_code == 200
+                assert len(writes) == 1
+            wake_up.assert_called_once()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert VideoEnrichmentTask.query.one().priority == INTERACTIVE_PRIORITY
+
+    def test_fetch_error_is_reported_not_negative_cached(self, app, tmp_path):
+        """通信エラーは「動画なし」と区別して例外で返し、ネガティブキャッシュしないかテスト"""
+        service = DMMAPIService()
+        service.init_app(app)
+        service.cache = HTTPCache(str(tmp_path / 'cache.db'))
+
+        with patch.object(service.http, 'get', side_effect=requests.ConnectionError("reset")):
+            with pytest.raises(VideoExtractionError):
+                service.extract_video_url_from_page('https://www.dmm.co.jp/a')
+            failures = {}
+            assert service.extract_video_urls(['https://www.dmm.co.jp/a'], failures) == {'https://www.dmm.co.jp/a': None}
+
+        assert failures == {'https://www.dmm.co.jp/a': 'reset'}
+        assert not service.cache.is_negative('https://www.dmm.co.jp/a')
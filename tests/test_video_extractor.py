@@ -0,0 +1,133 @@
+"""
+動画URL抽出モジュールのテスト
+"""
+import json
+
+from dmm_x_poster.services.video_extractor import (
+    extract_video_url, find_video_url_fast, find_video_url_soup, is_age_verification_page,
+    scan_stream, video_url_candidates
+)
+
+VIDEO = "https://cc3001.dmm.co.jp/litevideo/freepv/s/ssi/ssis00001/ssis00001_mhb_w.mp4"
+
+
+def jsonld_page(video_url=VIDEO):
+    """JSON-LDに動画URLを含むページ"""
+    data = {
+        "@context": "http://schema.org",
+        "@type": "Product",
+        "name": "テスト商品",
+        "subjectOf": {"@type": "VideoObject", "contentUrl": video_url},
+    }
+    return (
+        '<html><head><script type="text/javascript">var a = 1;</script>'
+        f'<script type="application/ld+json">{json.dumps(data)}</script>'
+        '</head><body><p>本文</p></body></html>'
+    ).encode('utf-8')
+
+
+class TestVideoExtractor:
+    """動画URL抽出のテストクラス"""
+
+    def test_jsonld(self):
+        """JSON-LDのVideoObjectからURLを抽出し_dm_w形式に変換するかテスト"""
+        assert extract_video_url(jsonld_page()) == VIDEO.replace('.mp4', '_dm_w.mp4')
+
+    def test_escaped_slashes_in_jsonld(self):
+        """JSON-LD内のエスケープされたスラッシュを正しく扱うかテスト"""
+        data = {"@type": "Product", "subjectOf": {"@type": "VideoObject", "contentUrl": VIDEO}}
+        block = json.dumps(data).replace('/', '\\/')
+        content = f'<script type="application/ld+json">{block}</script>'.encode('utf-8')
+        assert find_video_url_fast(content) == VIDEO
+
+    def test_script_pattern(self):
+        """通常のscript内の動画URLを抽出するかテスト"""
+        content = f'<html><script>player.load("{VIDEO}");</script></html>'.encode('utf-8')
+        assert find_video_url_fast(content) == VIDEO
+        assert extract_video_url(content) == VIDEO.replace('.mp4', '_dm_w.mp4')
+
+    def test_no_video(self):
+        """動画URLがないページではNoneを返すかテスト"""
+        assert extract_video_url(b'<html><script>var a = 1;</script></html>') is None
+
+    def test_fast_and_soup_agree(self):
+        """高速パスと従来のBeautifulSoup解析が同じ結果になるかテスト"""
+        pages = [
+            jsonld_page(),
+            f'<html><script>var v = {{"contentUrl": "{VIDEO}"}};</script></html>'.encode('utf-8'),
+            f'<html><body><a href="{VIDEO}">sample</a></body></html>'.encode('utf-8'),
+            b'<html><body>litevideo</body></html>',
+        ]
+        for page in pages:
+            assert find_video_url_fast(page) == find_video_url_soup(page.decode('utf-8'))
+
+    def test_age_verification_page(self):
+        """年齢認証ページを判定できるかテスト"""
+        page = '<html><h1>年齢確認</h1><p>あなたは18歳以上ですか？</p></html>'.encode('utf-8')
+        assert is_age_verification_page(page)
+        assert not is_age_verification_page(jsonld_page())
+
+    def test_candidates_from_api_payload(self):
+        """sampleMovieURLのcidを優先し、content_idからも候補を導出するかテスト"""
+        item = {
+            "content_id": "ssis00001",
+            "sampleMovieURL": {
+                "size_720_480": "https://www.dmm.co.jp/litevideo/-/part/=/cid=1ssis00001/size=720_480/affi_id=x-990/",
+                "size_476_306": "https://www.dmm.co.jp/litevideo/-/part/=/cid=1ssis00001/size=476_306/affi_id=x-990/",
+            },
+        }
+        assert video_url_candidates(item) == [
+            "https://cc3001.dmm.co.jp/litevideo/freepv/1/1ss/1ssis00001/1ssis00001_dm_w.mp4",
+            "https://cc3001.dmm.co.jp/litevideo/freepv/s/ssi/ssis00001/ssis00001_dm_w.mp4",
+        ]
+        assert video_url_candidates({"content_id": "ab"}) == []
+
+
+class TestScanStream:
+    """ストリーミング走査のテストクラス"""
+
+    @staticmethod
+    def chunked(content, size):
+        return [content[i:i + size] for i in range(0, len(content), size)]
+
+    def test_stops_after_jsonld_match(self):
+        """JSON-LDで動画URLが見つかったら残りを読まないかテスト"""
+        page = jsonld_page() + b'<div>filler</div>' * 5000
+        consumed = []
+
+        def chunks():
+            for chunk in self.chunked(page, 64):
+                consumed.append(chunk)
+                yield chunk
+
+        body, stopped = scan_stream(chunks())
+        assert stopped == 'match'
+        assert len(body) < 1024
+        assert len(consumed) * 64 < len(page)
+        assert extract_video_url(body) == extract_video_url(page)
+
+    def test_jsonld_split_across_chunks(self):
+        """チャンクの境界をまたぐJSON-LDも見つけるかテスト"""
+        page = jsonld_page() + b'<p>tail</p>' * 100
+        for size in (1, 7, 50):
+            body, stopped = scan_stream(self.chunked(page, size))
+            assert stopped == 'match'
+            assert extract_video_url(body) == VIDEO.replace('.mp4', '_dm_w.mp4')
+
+    def test_budget_and_eof(self):
+        """上限で打ち切り、見つからなければ最後まで読むかテスト"""
+        page = b'<html><body>' + b'<p>no video</p>' * 1000 + b'</body></html>'
+        body, stopped = scan_stream(self.chunked(page, 100), byte_budget=1000)
+        assert stopped == 'budget'
+        assert len(body) == 1000
+
+        body, stopped = scan_stream(self.chunked(page, 100))
+        assert stopped == 'eof'
+        assert body == page
+
+    def test_script_match_reads_to_end(self):
+        """JSON-LD以外の動画URLは全体を読んでから従来どおり抽出するかテスト"""
+        page = f'<html><script>player.init({{"src": "{VIDEO}"}});</script><p>x</p></html>'.encode('utf-8')
+        body, stopped = scan_stream(self.chunked(page, 16))
+        assert stopped == 'eof'
+        assert extract_video_url(body) == VIDEO.replace('.mp4', '_dm_w.mp4')